@@ -0,0 +1,480 @@
+"""
+Headless entry point for scheduled jobs.
+
+    python -m etf_portfolio_app.cli universe [--force]
+    python -m etf_portfolio_app.cli download  PORTFOLIO.csv ... [--currency EUR]
+    python -m etf_portfolio_app.cli backtest  PORTFOLIO.csv ... [--rebalancing Monthly] --out DIR
+    python -m etf_portfolio_app.cli sweep     PORTFOLIO.csv ... --out DIR
+    python -m etf_portfolio_app.cli optimize  PORTFOLIO.csv ... [--rebalancing Monthly] --out DIR
+    python -m etf_portfolio_app.cli compare   PORTFOLIO.csv ... [--rebalancing Monthly] --out DIR
+    python -m etf_portfolio_app.cli stress    PORTFOLIO.csv ... [--rebalancing Monthly] --out DIR
+    python -m etf_portfolio_app.cli simulate  PORTFOLIO.csv ... [--paths 10000] [--method bootstrap] --out DIR
+    python -m etf_portfolio_app.cli benchmark PORTFOLIO.csv ... [--against TICKER] [--top 10] --out DIR
+    python -m etf_portfolio_app.cli correlation TICKER ... [--top 10]
+    python -m etf_portfolio_app.cli overlap   TICKER ... [--top 10]
+    python -m etf_portfolio_app.cli screen    "sharpe_1y > 0.5, volatility_1y < 15%" [--sort sharpe_1y]
+
+Portfolios are the CSV files saved by the builder. Detailed fund data is read from
+(and downloads are written to) the fund data store given by ``--store``. Backtests
+run one portfolio per worker process; results are written as Parquet tables plus
+a JSON summary.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from . import config
+from .ishares.store import DEFAULT_STORE_DIR, FundDataStore
+from .portfolio.backtester import PortfolioBacktester, prepare_backtest_inputs
+from .portfolio.model import read_portfolio_csv
+from .portfolio.returns_panel import ReturnsPanel
+from .portfolio.risk import RISK_COLUMNS, risk_statistics
+
+STAT_COLUMNS = ["portfolio", "rebalancing", "variant", "period", "return", "std_dev", "sharpe"]
+
+
+# --------------------------------------------------------------------------- #
+# helpers
+# --------------------------------------------------------------------------- #
+
+def _rebalancing_code(name: str) -> str:
+    """Accepts a display name ('Monthly') or a period code ('m')."""
+    if name in config.REBALANCING_PERIODS:
+        return config.REBALANCING_PERIODS[name]
+    if name in config.REBALANCING_PERIODS.values():
+        return name
+    raise argparse.ArgumentTypeError(f"unknown rebalancing period '{name}'; choose from {', '.join(config.REBALANCING_PERIODS)}")
+
+
+def _read_portfolios(paths: list[Path]) -> dict[str, pd.DataFrame]:
+    portfolios = {}
+    for path in paths:
+        name = path.stem
+        if name in portfolios:
+            name = f"{name}_{len(portfolios)}"
+        portfolios[name] = read_portfolio_csv(path)
+    return portfolios
+
+
+def _stat_rows(portfolio: str, rebalancing: str, variant: str, statistics: dict) -> list[dict]:
+    return [{"portfolio": portfolio, "rebalancing": rebalancing, "variant": variant, "period": period, **stats}
+            for period, stats in statistics.items()]
+
+
+def _risk_rows(portfolio: str, rebalancing: str, variant: str, returns: pd.Series, risk_free_rate: float) -> list[dict]:
+    risk = risk_statistics(returns, risk_free_rate)
+    return [{"portfolio": portfolio, "rebalancing": rebalancing, "variant": variant, "period": period, **row}
+            for period, row in risk.to_dict("index").items()]
+
+
+def _risk_free_rate(args) -> float:
+    if args.risk_free_rate is not None:
+        return args.risk_free_rate
+    from .portfolio.backtest_cache import cached_risk_free_rate
+    return cached_risk_free_rate(args.currency)
+
+
+def _write_results(out_dir: Path, prefix: str, results: list[dict], summary: dict) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stats = pd.DataFrame([row for r in results for row in r.get("statistics", [])], columns=STAT_COLUMNS)
+    stats.to_parquet(out_dir / f"{prefix}_statistics.parquet", index=False)
+    risk = pd.DataFrame([row for r in results for row in r.get("risk", [])], columns=STAT_COLUMNS[:4] + RISK_COLUMNS)
+    risk.to_parquet(out_dir / f"{prefix}_risk.parquet", index=False)
+    returns = {key: series for r in results for key, series in r.get("returns", {}).items()}
+    if returns:
+        pd.DataFrame(returns).to_parquet(out_dir / f"{prefix}_returns.parquet")
+    weights = [row for r in results for row in r.get("weights", [])]
+    if weights:
+        pd.DataFrame(weights).to_parquet(out_dir / f"{prefix}_weights.parquet", index=False)
+    with open(out_dir / f"{prefix}_summary.json", "w") as f:
+        json.dump(summary, f, indent=4, default=str)
+
+
+# --------------------------------------------------------------------------- #
+# per-portfolio work (runs in worker processes)
+# --------------------------------------------------------------------------- #
+
+def _run_portfolio(task: dict) -> dict:
+    """Backtests (and optionally optimises) one portfolio. Must stay a top-level function for pickling."""
+    name, portfolio = task["name"], task["portfolio"]
+    result = {"portfolio": name, "statistics": [], "risk": [], "returns": {}, "weights": []}
+    try:
+        store = FundDataStore(task["store"])
+        panel = ReturnsPanel.for_store(store, task["currency"])    # synced by the parent process
+        asset_returns, weights = prepare_backtest_inputs(portfolio, store.mapping(), store.latest_prices(), panel=panel)
+        for rebalancing in task["rebalancing"]:
+            backtester = PortfolioBacktester(weights, asset_returns, rebalancing, task["currency"], risk_free_rate=task["risk_free_rate"])
+            result["statistics"] += _stat_rows(name, rebalancing, "original", backtester.calculate_statistics())
+            result["risk"] += _risk_rows(name, rebalancing, "original", backtester.portfolio_return_series, task["risk_free_rate"])
+            if task["keep_returns"]:
+                result["returns"][f"{name}:{rebalancing}:original"] = backtester.portfolio_return_series
+            if task["optimize"]:
+                from .portfolio.optimize import PortfolioOptimizer
+                optimized_weights = PortfolioOptimizer(backtester).maximize_sharpe()
+                optimized = PortfolioBacktester(optimized_weights, asset_returns, rebalancing, task["currency"], risk_free_rate=task["risk_free_rate"])
+                result["statistics"] += _stat_rows(name, rebalancing, "optimized", optimized.calculate_statistics())
+                result["risk"] += _risk_rows(name, rebalancing, "optimized", optimized.portfolio_return_series, task["risk_free_rate"])
+                if task["keep_returns"]:
+                    result["returns"][f"{name}:{rebalancing}:optimized"] = optimized.portfolio_return_series
+                result["weights"] += [{"portfolio": name, "rebalancing": rebalancing, "ticker": ticker,
+                                       "original": weights[ticker], "optimized": optimized_weights[ticker]} for ticker in weights.index]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _run_batch(args, rebalancing: list[str], optimize: bool, keep_returns: bool, prefix: str) -> int:
+    portfolios = _read_portfolios(args.portfolios)
+    risk_free_rate = _risk_free_rate(args)
+    # built once here so the workers only memory-map it
+    store = FundDataStore(args.store)
+    ReturnsPanel.for_store(store, args.currency).synced(store)
+    tasks = [{"name": name, "portfolio": portfolio, "store": args.store, "currency": args.currency,
+              "rebalancing": rebalancing, "risk_free_rate": risk_free_rate, "optimize": optimize,
+              "keep_returns": keep_returns} for name, portfolio in portfolios.items()]
+    started = time.perf_counter()
+    if args.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(_run_portfolio, tasks))
+    else:
+        results = [_run_portfolio(task) for task in tasks]
+
+    errors = {r["portfolio"]: r["error"] for r in results if "error" in r}
+    summary = {
+        "command": prefix, "currency": args.currency, "risk_free_rate": risk_free_rate, "rebalancing": rebalancing,
+        "portfolios": list(portfolios), "errors": errors, "seconds": round(time.perf_counter() - started, 3),
+    }
+    _write_results(args.out, prefix, results, summary)
+    for name, error in errors.items():
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"{prefix}: {len(results) - len(errors)}/{len(results)} portfolios written to {args.out}")
+    return 1 if errors else 0
+
+
+# --------------------------------------------------------------------------- #
+# commands
+# --------------------------------------------------------------------------- #
+
+def cmd_universe(args) -> int:
+    from .ishares import universe
+    df = universe.load_or_scrape(args.force, None, config.BRAVE_BROWSER_PATH, config.CHROMEDRIVER_PATH)
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(args.out, index=False)
+    print(f"universe: {len(df)} share classes")
+    return 0
+
+
+def cmd_download(args) -> int:
+    from .ishares.download import download_fund_details
+    portfolios = _read_portfolios(args.portfolios)
+    records = pd.concat(portfolios.values(), ignore_index=True).drop_duplicates("ticker").to_dict("records")
+    # one browser session per worker thread
+    chunks = [records[i::args.workers] for i in range(min(args.workers, len(records)))]
+    errors: dict[str, str] = {}
+    store = FundDataStore(args.store)
+    previous = store.mapping()    # stored histories are only extended by the new dates
+    with ThreadPoolExecutor(max_workers=max(len(chunks), 1)) as pool:
+        parts = pool.map(lambda chunk: download_fund_details(chunk, args.currency, previous=previous,
+                                                             on_error=lambda t, e: errors.__setitem__(t, str(e))), chunks)
+        downloaded = {ticker: data for part in parts for ticker, data in part.items()}
+
+    # only the downloaded funds are rewritten, the rest of the store is left untouched
+    store.write_many(downloaded, last_data_pull={"date": time.strftime("%Y-%m-%d %H:%M:%S"), "tickers": list(downloaded)})
+    for ticker, error in errors.items():
+        print(f"{ticker}: {error}", file=sys.stderr)
+    print(f"download: {len(downloaded)}/{len(records)} funds stored in {args.store}")
+    return 1 if errors else 0
+
+
+def cmd_backtest(args) -> int:
+    return _run_batch(args, [args.rebalancing], optimize=False, keep_returns=True, prefix="backtest")
+
+
+def cmd_sweep(args) -> int:
+    return _run_batch(args, list(dict.fromkeys(config.REBALANCING_PERIODS.values())), optimize=False, keep_returns=False, prefix="sweep")
+
+
+def cmd_optimize(args) -> int:
+    return _run_batch(args, [args.rebalancing], optimize=True, keep_returns=True, prefix="optimize")
+
+
+def cmd_compare(args) -> int:
+    from .portfolio.comparison import PortfolioComparison
+    portfolios = _read_portfolios(args.portfolios)
+    risk_free_rate = _risk_free_rate(args)
+    store = FundDataStore(args.store)
+    panel = ReturnsPanel.for_store(store, args.currency).synced(store)
+    started = time.perf_counter()
+    # every portfolio is backtested in one pass over a single selection from the panel
+    try:
+        comparison = PortfolioComparison(portfolios, store.mapping(), panel, args.rebalancing, store.latest_prices(), risk_free_rate)
+    except ValueError as e:
+        print(f"compare: {e}", file=sys.stderr)
+        return 1
+    ranking = comparison.ranking(sort_by=args.sort)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    ranking.to_parquet(args.out / "compare_ranking.parquet")
+    comparison.returns.to_parquet(args.out / "compare_returns.parquet")
+    comparison.risk_statistics().reset_index().to_parquet(args.out / "compare_risk.parquet", index=False)
+    summary = {
+        "command": "compare", "currency": args.currency, "risk_free_rate": risk_free_rate, "rebalancing": [args.rebalancing],
+        "portfolios": list(portfolios), "start": comparison.returns.index[0], "end": comparison.returns.index[-1],
+        "errors": comparison.skipped, "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(args.out / "compare_summary.json", "w") as f:
+        json.dump(summary, f, indent=4, default=str)
+    print(ranking.round(4).to_string())
+    for name, error in comparison.skipped.items():
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"compare: {len(ranking)}/{len(portfolios)} portfolios written to {args.out}")
+    return 1 if comparison.skipped else 0
+
+
+def cmd_stress(args) -> int:
+    from .portfolio.comparison import portfolio_weight_matrix
+    from .portfolio.stress import StressTester
+    portfolios = _read_portfolios(args.portfolios)
+    store = FundDataStore(args.store)
+    panel = ReturnsPanel.for_store(store, args.currency).synced(store)
+    tester = StressTester.for_panel(panel)
+    tester.update(panel)    # scenario windows are cut once per panel rebuild
+    started = time.perf_counter()
+    weights, skipped = portfolio_weight_matrix(portfolios, store.mapping(), panel, store.latest_prices())
+    results = tester.run(weights, args.rebalancing) if not weights.empty else pd.DataFrame()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    results.reset_index().to_parquet(args.out / "stress_results.parquet", index=False)
+    summary = {
+        "command": "stress", "currency": args.currency, "rebalancing": [args.rebalancing], "portfolios": list(portfolios),
+        "scenarios": {name: tester.scenarios[name] for name in tester.available},
+        "errors": skipped, "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(args.out / "stress_summary.json", "w") as f:
+        json.dump(summary, f, indent=4, default=str)
+    if not results.empty:
+        print((results["return"].unstack("scenario")[tester.available] * 100).round(2).to_string())
+    for name, error in skipped.items():
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"stress: {len(weights)}/{len(portfolios)} portfolios x {len(tester.available)} scenarios written to {args.out}")
+    return 1 if skipped else 0
+
+
+def cmd_simulate(args) -> int:
+    from .portfolio.simulation import PortfolioSimulator
+    portfolios = _read_portfolios(args.portfolios)
+    risk_free_rate = _risk_free_rate(args)
+    store = FundDataStore(args.store)
+    panel = ReturnsPanel.for_store(store, args.currency).synced(store)
+    started = time.perf_counter()
+    paths, summaries, errors = [], {}, {}
+    for name, portfolio in portfolios.items():
+        try:
+            asset_returns, weights = prepare_backtest_inputs(portfolio, store.mapping(), store.latest_prices(), panel=panel)
+            simulator = PortfolioSimulator(weights, asset_returns, args.rebalancing, risk_free_rate, method=args.method,
+                                           horizon=round(args.years * 252) if args.years else None,
+                                           block_size=args.block_size, seed=args.seed)
+            # the chunks of paths, not the portfolios, are spread over the workers
+            result = simulator.run(args.paths, workers=args.workers)
+        except Exception as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+            continue
+        paths.append(result.reset_index().assign(portfolio=name))
+        summaries[name] = PortfolioSimulator.summarize(result).to_dict("index")
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    if paths:
+        pd.concat(paths, ignore_index=True).to_parquet(args.out / "simulate_paths.parquet", index=False)
+    summary = {
+        "command": "simulate", "currency": args.currency, "risk_free_rate": risk_free_rate, "rebalancing": [args.rebalancing],
+        "method": args.method, "paths": args.paths, "block_size": args.block_size, "seed": args.seed,
+        "portfolios": list(portfolios), "distributions": summaries, "errors": errors,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(args.out / "simulate_summary.json", "w") as f:
+        json.dump(summary, f, indent=4, default=str)
+    for name, error in errors.items():
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"simulate: {len(summaries)}/{len(portfolios)} portfolios written to {args.out}")
+    return 1 if errors else 0
+
+
+def cmd_benchmark(args) -> int:
+    from .portfolio.benchmark import BENCHMARK_COLUMNS, BenchmarkAnalyzer, relative_statistics
+    from .portfolio.risk import weighted_returns
+    portfolios = _read_portfolios(args.portfolios)
+    risk_free_rate = _risk_free_rate(args)
+    store = FundDataStore(args.store)
+    panel = ReturnsPanel.for_store(store, args.currency).synced(store)
+    analyzer = BenchmarkAnalyzer(panel)
+    if args.against and args.against not in panel:
+        print(f"benchmark: {args.against} has no return data in {args.store} for {args.currency}", file=sys.stderr)
+        return 1
+    benchmark = analyzer.fund_returns(args.against) if args.against else None
+    started = time.perf_counter()
+    tables, errors = [], {}
+    for name, portfolio in portfolios.items():
+        try:
+            asset_returns, weights = prepare_backtest_inputs(portfolio, store.mapping(), store.latest_prices(), panel=panel)
+            returns = weighted_returns(asset_returns, weights.to_frame(name).T, args.rebalancing)[name]
+        except Exception as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+            continue
+        if benchmark is not None:
+            relative = relative_statistics(returns, benchmark, risk_free_rate)
+            tables.append(relative.assign(portfolio=name, relation="against", benchmark=args.against, rank=pd.NA))
+        # every fund of the panel against the portfolio, one pass over the panel per portfolio
+        closest = analyzer.rank(returns, n=args.top, risk_free_rate=risk_free_rate)
+        tables.append(closest.assign(portfolio=name, relation="closest", benchmark=name, rank=range(1, len(closest) + 1)))
+
+    columns = ["portfolio", "relation", "rank", "name", "benchmark"] + BENCHMARK_COLUMNS
+    results = (pd.concat([t.rename_axis("name").reset_index() for t in tables], ignore_index=True)[columns]
+               if tables else pd.DataFrame(columns=columns))
+    results["rank"] = results["rank"].astype("Int64")
+    args.out.mkdir(parents=True, exist_ok=True)
+    results.to_parquet(args.out / "benchmark_relative.parquet", index=False)
+    summary = {
+        "command": "benchmark", "currency": args.currency, "risk_free_rate": risk_free_rate, "rebalancing": [args.rebalancing],
+        "against": args.against, "portfolios": list(portfolios), "errors": errors, "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(args.out / "benchmark_summary.json", "w") as f:
+        json.dump(summary, f, indent=4, default=str)
+    for name, table in results.groupby("portfolio", sort=False):
+        print(f"{name}:\n{table.drop(columns='portfolio').round(4).to_string(index=False)}\n")
+    for name, error in errors.items():
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"benchmark: {len(portfolios) - len(errors)}/{len(portfolios)} portfolios written to {args.out}")
+    return 1 if errors else 0
+
+
+def cmd_correlation(args) -> int:
+    from .portfolio.correlation import CorrelationEngine
+    store = FundDataStore(args.store)
+    panel = ReturnsPanel.for_store(store, args.currency).synced(store)
+    engine = CorrelationEngine.for_panel(panel)
+    engine.update(panel)    # only new days and changed funds are computed
+    missing = [t for t in args.tickers if t not in engine]
+    for ticker in args.tickers:
+        if ticker in missing:
+            continue
+        most = engine.most_correlated(ticker, args.top).round(3)
+        least = engine.least_correlated(ticker, args.top).round(3)
+        table = pd.concat([most.rename("corr").rename_axis("most correlated").reset_index(),
+                           least.rename("corr").rename_axis("least correlated").reset_index()], axis=1)
+        print(f"{ticker}:\n{table.to_string(index=False)}\n")
+    for ticker in missing:
+        print(f"{ticker}: no return data in {args.store} for {args.currency}", file=sys.stderr)
+    return 1 if missing else 0
+
+
+def cmd_overlap(args) -> int:
+    from .portfolio.overlap import OverlapMatrix
+    from .portfolio.security_master import SecurityMaster
+    matrix = OverlapMatrix.for_store(FundDataStore(args.store), master=SecurityMaster.load())
+    missing = [t for t in args.tickers if t not in matrix]
+    for ticker in args.tickers:
+        if ticker not in missing:
+            print(f"{ticker}:\n{matrix.top_overlaps(ticker, args.top).round(3).to_string()}\n")
+    for ticker in missing:
+        print(f"{ticker}: no holdings in {args.store}", file=sys.stderr)
+    return 1 if missing else 0
+
+
+def cmd_screen(args) -> int:
+    from .portfolio.screener import Screener, build_metrics_table, PERCENT_COLUMNS
+    screener = Screener(build_metrics_table(FundDataStore(args.store), args.currency, args.risk_free_rate))
+    try:
+        tickers = screener.screen(args.expression, sort_by=args.sort)
+    except ValueError as e:
+        print(f"screen: {e}", file=sys.stderr)
+        return 2
+    table = screener.frame(tickers[:args.top] if args.top else tickers)
+    for col in PERCENT_COLUMNS & set(table.columns):
+        table[col] *= 100
+    print(table.round(2).to_string())
+    print(f"screen: {len(tickers)}/{len(screener)} funds pass")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="etf_portfolio_app.cli", description="Headless ETF portfolio jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("universe", help="refresh the cached fund universe")
+    p.add_argument("--force", action="store_true", help="scrape even if the cache is recent")
+    p.add_argument("--out", type=Path, help="also write the universe to this Parquet file")
+    p.set_defaults(func=cmd_universe)
+
+    def portfolio_command(name: str, help_text: str, func, needs_out: bool = True, rebalancing: bool = False):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("portfolios", nargs="+", type=Path, help="portfolio CSV files saved by the builder")
+        p.add_argument("--store", type=Path, default=DEFAULT_STORE_DIR, help="fund data store (default: %(default)s)")
+        p.add_argument("--currency", default=config.PORTFOLIO_CURRENCIES[0], choices=config.PORTFOLIO_CURRENCIES)
+        p.add_argument("--workers", type=int, default=4, help="parallel worker processes / browser sessions")
+        if needs_out:
+            p.add_argument("--out", type=Path, required=True, help="output directory")
+            p.add_argument("--risk-free-rate", type=float, default=None, help="annual rate as a fraction; fetched if omitted")
+        if rebalancing:
+            p.add_argument("--rebalancing", type=_rebalancing_code, default=list(config.REBALANCING_PERIODS.values())[0],
+                           help="rebalancing period name or code (default: %(default)s)")
+        p.set_defaults(func=func)
+        return p
+
+    portfolio_command("download", "download detailed data for every fund in the portfolios", cmd_download, needs_out=False)
+    portfolio_command("backtest", "backtest each portfolio", cmd_backtest, rebalancing=True)
+    portfolio_command("sweep", "backtest each portfolio under every rebalancing period", cmd_sweep)
+    portfolio_command("optimize", "maximise the Sharpe ratio of each portfolio", cmd_optimize, rebalancing=True)
+    p = portfolio_command("compare", "rank the portfolios over their common history", cmd_compare, rebalancing=True)
+    p.add_argument("--sort", default="sharpe", choices=["return", "annual_return", "std_dev", "sharpe", "sortino", "calmar", "max_drawdown"],
+                   help="ranking metric, highest first (default: %(default)s)")
+    portfolio_command("stress", "replay historical stress scenarios against each portfolio", cmd_stress, rebalancing=True)
+    p = portfolio_command("simulate", "distribution of outcomes over simulated return paths", cmd_simulate, rebalancing=True)
+    p.add_argument("--paths", type=int, default=10_000, help="simulated paths per portfolio (default: %(default)s)")
+    p.add_argument("--method", default="bootstrap", choices=["bootstrap", "parametric"])
+    p.add_argument("--years", type=float, default=None, help="simulated horizon (default: length of the common history)")
+    p.add_argument("--block-size", type=int, default=20, help="days per bootstrap block (default: %(default)s)")
+    p.add_argument("--seed", type=int, default=None, help="seed for reproducible paths")
+
+    p = portfolio_command("benchmark", "tracking error, beta and capture ratios against a benchmark", cmd_benchmark, rebalancing=True)
+    p.add_argument("--against", default=None, help="benchmark fund ticker; without it only the closest funds are listed")
+    p.add_argument("--top", type=int, default=10, help="funds tracking each portfolio most closely to list (default: %(default)s)")
+
+    p = sub.add_parser("correlation", help="most and least correlated funds across the store")
+    p.add_argument("tickers", nargs="+", help="fund tickers to query")
+    p.add_argument("--store", type=Path, default=DEFAULT_STORE_DIR, help="fund data store (default: %(default)s)")
+    p.add_argument("--currency", default=config.PORTFOLIO_CURRENCIES[0], choices=config.PORTFOLIO_CURRENCIES)
+    p.add_argument("--top", type=int, default=10, help="funds to list per side (default: %(default)s)")
+    p.set_defaults(func=cmd_correlation)
+
+    p = sub.add_parser("overlap", help="funds whose holdings overlap most with the given ones")
+    p.add_argument("tickers", nargs="+", help="fund tickers to query")
+    p.add_argument("--store", type=Path, default=DEFAULT_STORE_DIR, help="fund data store (default: %(default)s)")
+    p.add_argument("--top", type=int, default=10, help="funds to list (default: %(default)s)")
+    p.set_defaults(func=cmd_overlap)
+
+    from .portfolio.screener import METRIC_COLUMNS
+    p = sub.add_parser("screen", help="stored funds passing a metrics screen")
+    p.add_argument("expression", nargs="?", default="", help="predicates such as 'sharpe_1y > 0.5, volatility_1y < 15%%'")
+    p.add_argument("--sort", choices=METRIC_COLUMNS, help="metric to sort by, highest first")
+    p.add_argument("--top", type=int, default=None, help="funds to list (default: all)")
+    p.add_argument("--store", type=Path, default=DEFAULT_STORE_DIR, help="fund data store (default: %(default)s)")
+    p.add_argument("--currency", default=config.PORTFOLIO_CURRENCIES[0], choices=config.PORTFOLIO_CURRENCIES)
+    p.add_argument("--risk-free-rate", type=float, default=0.0, help="annual rate as a fraction for the Sharpe ratio")
+    p.set_defaults(func=cmd_screen)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    config.ensure_data_dirs()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
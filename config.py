@@ -22,12 +22,13 @@ DATA_DIR = Path(os.getenv("PORTFOLIO_APP_DATA", "./data")).expanduser()
 # Specific subdirectories for raw downloads and cached data.
 RAW_DATA_DIR = DATA_DIR / "raw"
 CACHE_DIR = DATA_DIR / "cache"
-TEMP_DIR = DATA_DIR / "temp" # For temporary files like HTML charts
+TEMP_DIR = DATA_DIR / "temp" # For temporary files
 
-# Create these directories when the config is loaded to ensure they exist.
-RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
-TEMP_DIR.mkdir(parents=True, exist_ok=True)
+
+def ensure_data_dirs() -> None:
+    """Creates the data directories. Called at startup and before anything writes to them."""
+    for directory in (RAW_DATA_DIR, CACHE_DIR, TEMP_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
 
 
 # --- Fund Provider Prefixes ---
@@ -40,7 +41,24 @@ FUND_LIST_UPDATE_PERIOD = timedelta(days=90)
 
 # --- Dashboard Settings ---
 # Number of top holdings to display in the dashboard table.
-TOP_N_HOLDINGS = 200
+# None shows the full look-through list (the table only renders visible rows).
+TOP_N_HOLDINGS = None
+
+# Backtest results kept on disk for instant re-runs; the least recently used go first.
+BACKTEST_CACHE_ENTRIES = 64
+# How long a fetched risk-free rate is reused before it is fetched again.
+RISK_FREE_RATE_MAX_AGE = timedelta(hours=12)
+# After a failed fetch the fallback rate is used for this long before the fetch is retried.
+RISK_FREE_RATE_RETRY_AFTER = timedelta(minutes=15)
+
+# Historical stress scenarios replayed against portfolios: name -> (first day, last day).
+STRESS_SCENARIOS = {
+    "2008 Financial Crisis": ("2008-09-01", "2009-03-09"),
+    "2011 Euro Debt Crisis": ("2011-07-22", "2011-10-03"),
+    "2018 Q4 Sell-Off": ("2018-09-21", "2018-12-24"),
+    "COVID Crash (Mar 2020)": ("2020-02-19", "2020-03-23"),
+    "2022 Rate Shock": ("2022-01-03", "2022-10-12"),
+}
 
 # Selectable currencies for the portfolio's base currency.
 PORTFOLIO_CURRENCIES = ["USD", "EUR", "GBP", "CHF", "JPY", "SGD"]
@@ -58,4 +76,3 @@ REBALANCING_PERIODS = {
     "None": "none",  # No rebalancing
 }
 
-print(f"Config loaded. Data directory set to: {DATA_DIR.resolve()}")
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Iterable, Mapping
+
+import pandas as pd
+from .utils import get_logger
+from .. import config
+
+LOG = get_logger(__name__)
+
+
+def _valid_link(link) -> bool:
+    return isinstance(link, str) and link.startswith("http")
+
+
+def fund_detail_entry(sheets, xls_path: Path, master=None) -> dict:
+    """The per-ticker dict kept in ``detailed_fund_data`` for one parsed workbook."""
+    holdings = sheets.holdings if sheets.holdings is not None else pd.DataFrame()
+    return {
+        "holdings": master.encode_holdings(holdings) if master is not None and not holdings.empty else holdings,
+        "historical": sheets.historical.copy() if sheets.historical is not None else pd.DataFrame(),
+        "distributions": sheets.distributions.copy() if sheets.distributions is not None else pd.DataFrame(),
+        "source_xls": str(xls_path),
+        "portfolio_currency": sheets.portfolio_currency,
+    }
+
+
+def _previous_history(previous: Mapping | None, ticker: str, portfolio_currency: str) -> pd.DataFrame | None:
+    """Stored history to extend, if it was derived for the same portfolio currency."""
+    entry = previous.get(ticker) if previous is not None else None
+    if entry is None or entry.get("portfolio_currency") != portfolio_currency:
+        return None
+    return entry.get("historical")
+
+
+def download_fund_details(records: Iterable[dict], portfolio_currency: str, master=None,
+                          on_progress: Callable[[float, str], None] | None = None,
+                          on_error: Callable[[str, Exception], None] | None = None,
+                          should_stop: Callable[[], bool] | None = None,
+                          browser_binary_path: str | None = None,
+                          chrome_driver_path: str | None = None,
+                          previous: Mapping | None = None) -> dict[str, dict]:
+    """
+    Downloads and parses the product workbook of every fund in *records* over one
+    browser session.
+
+    Args:
+        records: Portfolio rows with at least ``ticker``, ``link`` and ``currency``.
+        portfolio_currency: Currency the returns are converted to.
+        master: Optional SecurityMaster used to dictionary-encode the holdings.
+        on_progress: Called with (fraction done, ticker) after every fund.
+        on_error: Called with (ticker, exception) when a fund fails; the run continues.
+        should_stop: Polled before every fund; returning True ends the run early.
+        previous: Stored ``detailed_fund_data``; a fund's history is then only extended
+            by the new dates unless the provider restated it.
+
+    Returns:
+        dict: ``{ticker: {"holdings", "historical", "distributions", "source_xls"}}``
+        for the funds that were processed successfully.
+    """
+    from .fetch import IsharesSession    # selenium/bs4 are only imported once a download starts
+    from .parse import FundSheets
+
+    records = list(records)
+    results: dict[str, dict] = {}
+    if not records:
+        return results
+    with IsharesSession(chrome_binary=browser_binary_path or config.BRAVE_BROWSER_PATH,
+                        chromedriver_path=chrome_driver_path or config.CHROMEDRIVER_PATH) as sess:
+        for i, record in enumerate(records):
+            if should_stop is not None and should_stop():
+                LOG.info("Download cancelled.")
+                break
+            ticker = record.get("ticker", f"unk_{i}")
+            link = record.get("link")
+            if not _valid_link(link):
+                LOG.warning("Skipping %s: invalid or missing link (%r).", ticker, link)
+            else:
+                try:
+                    LOG.info("Downloading data for %s (%s)", ticker, link)
+                    xls_path = sess.download_xls(sess.xls_link_from_product_page(link), overwrite=True)
+                    sheets = FundSheets(xls_path, fund_currency=record.get("currency"), portfolio_currency=portfolio_currency,
+                                        previous_historical=_previous_history(previous, ticker, portfolio_currency))
+                    results[ticker] = fund_detail_entry(sheets, xls_path, master)
+                except Exception as e:
+                    LOG.error("Error downloading/parsing %s: %s", ticker, e)
+                    if on_error is not None:
+                        on_error(ticker, e)
+            if on_progress is not None:
+                on_progress((i + 1) / len(records), ticker)
+    return results
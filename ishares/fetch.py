@@ -17,7 +17,6 @@ LOG = get_logger(__name__)
 ROOT_URL   = "https://www.ishares.com"
 COOKIE_URL = f"{ROOT_URL}/uk/professional/en"
 CACHE_DIR  = config.CACHE_DIR
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
 GATE_RE = re.compile(r'direct-url-screen', re.I)
 
 class IsharesSession:
@@ -30,6 +29,7 @@ class IsharesSession:
         cache_dir: Path = CACHE_DIR,
     ):
         self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
         self._req = requests.Session()
 
         # ── grab cookie via a quick Selenium spin‑up ──────────────────────────
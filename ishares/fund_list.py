@@ -8,7 +8,6 @@ from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException
-import matplotlib.pyplot as plt
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -15,6 +15,85 @@ LOG = get_logger(__name__)
 XML_NS = {"ss": "urn:schemas-microsoft-com:office:spreadsheet"}
 HOLDINGS_SKIPROWS = 7
 PARSE_SHEET_NAMES = ["holdings", "historical", "distributions"]
+# columns derived by FundSheets; everything else in the historical sheet comes from the provider
+DERIVED_HISTORY_COLUMNS = ["fx_rate", "Return", "Log Return", "ccy_adj_return", "ccy_adj_log_return"]
+
+
+# ------------------------- Historical helpers ------------------------------
+
+def _read_historical(csv_path: Path) -> pd.DataFrame:
+    """The raw historical sheet, indexed by date, without fx rates or returns."""
+    historical = pd.read_csv(csv_path, encoding="utf-8-sig")
+    historical["As Of"] = historical["As Of"].str.replace("Sept", "Sep", case=False)
+    historical.columns = [str(c).strip() for c in historical.columns]
+
+    if "As Of" in historical.columns:
+        historical["As Of"] = pd.to_datetime(historical["As Of"], format="%d/%b/%Y", errors="coerce")
+
+    for col in historical.columns:
+        if col not in ["As Of", "Currency"]:
+            historical[col] = pd.to_numeric(historical[col], errors='coerce')
+
+    historical.rename(columns={"As Of": "date", "Currency":"currency"}, inplace=True)
+    return historical.set_index("date")
+
+
+def _join_fx_rates(historical: pd.DataFrame, fund_currency: str, portfolio_currency: str) -> pd.DataFrame:
+    historical = historical.join(fetch_currency_data(
+        fund_currency = fund_currency,
+        portfolio_currency = portfolio_currency,
+        start_date = min(historical.index),
+        end_date = max(historical.index) ) )
+    historical['fx_rate'] = historical['fx_rate'].ffill()
+    return historical
+
+
+def merge_historical(previous: pd.DataFrame, fresh: pd.DataFrame, fund_currency: str, portfolio_currency: str) -> pd.DataFrame | None:
+    """
+    Appends the dates of *fresh* (a raw historical sheet) that are newer than *previous*
+    (a stored, fully derived history), fetching fx rates and computing returns for those
+    dates only. The last stored row anchors the first new return.
+
+    Returns:
+        pd.DataFrame | None: The merged history, newest first like FundSheets.historical,
+        or None if the provider restated the overlapping history and the whole sheet
+        has to be re-derived.
+    """
+    previous = previous.sort_index()
+    fresh = fresh[fresh.index.notna()].sort_index()
+    last = previous.index.max()
+
+    # every stored date inside the sheet's range must still be there with the same values
+    expected = previous.index[previous.index >= fresh.index.min()]
+    overlap = expected.intersection(fresh.index)
+    if last not in fresh.index or len(overlap) != len(expected) or not fresh.index.is_unique:
+        return None
+    raw_columns = [c for c in fresh.columns if c in previous.columns and c not in DERIVED_HISTORY_COLUMNS]
+    for col in raw_columns:
+        old, new = previous.loc[overlap, col], fresh.loc[overlap, col]
+        if pd.api.types.is_numeric_dtype(new):
+            if not np.allclose(old.to_numpy(dtype=float), new.to_numpy(dtype=float), rtol=1e-9, equal_nan=True):
+                return None
+        elif not old.astype(str).equals(new.astype(str)):
+            return None
+
+    new_rows = fresh[fresh.index > last]
+    if new_rows.empty:
+        return previous.sort_index(ascending=False)
+
+    tail = pd.concat([previous.loc[[last], raw_columns + ["fx_rate"]], new_rows])
+    try:
+        fx = fetch_currency_data(fund_currency=fund_currency, portfolio_currency=portfolio_currency,
+                                 start_date=last, end_date=new_rows.index.max())
+        tail = tail.drop(columns="fx_rate").join(fx).fillna({"fx_rate": tail["fx_rate"]})
+    except ValueError as e:
+        # no quotes yet for the new days (e.g. a holiday): carry the last stored rate forward
+        LOG.warning("No fx rates for the new dates, carrying the last rate forward: %s", e)
+    tail["fx_rate"] = tail["fx_rate"].ffill()
+    FundSheets._calculate_returns(tail)
+    merged = pd.concat([tail.drop(index=last), previous])
+    return merged[list(dict.fromkeys([*previous.columns, *tail.columns]))].sort_index(ascending=False)
+
 
 # ------------------------- Main Façade -------------------------------------
 
@@ -22,11 +101,18 @@ class FundSheets:
     """
     Loads data from iShares' XML-based .xls files by converting worksheets to 
     temporary CSVs and then parsing them with pandas.
+
+    Pass the stored history of the fund as *previous_historical* to only derive the
+    dates added since; ``incremental`` tells whether that worked or the sheet was
+    re-derived in full because earlier values were restated.
     """
-    def __init__(self, xls_path: Path, fund_currency: str, portfolio_currency: str):
+    def __init__(self, xls_path: Path, fund_currency: str, portfolio_currency: str,
+                 previous_historical: pd.DataFrame | None = None):
         self.xls_path = xls_path
         self.portfolio_currency = portfolio_currency
         self.fund_currency = fund_currency
+        self.previous_historical = previous_historical
+        self.incremental = False
         self.holdings: pd.DataFrame | None = None
         self.historical: pd.DataFrame | None = None
         self.distributions: pd.DataFrame | None = None
@@ -76,27 +162,16 @@ class FundSheets:
                     self.holdings = pd.read_csv(csv_path, skiprows=HOLDINGS_SKIPROWS, encoding="utf-8-sig")
                 else:
                     if name == "historical":
-                        self.historical = pd.read_csv(csv_path, encoding="utf-8-sig")
-                        self.historical["As Of"] = self.historical["As Of"].str.replace("Sept", "Sep", case=False)
-                        self.historical.columns = [str(c).strip() for c in self.historical.columns]
-
-                        if "As Of" in self.historical.columns:
-                            self.historical["As Of"] = pd.to_datetime(self.historical["As Of"], format="%d/%b/%Y", errors="coerce")
-                    
-                        for col in self.historical.columns:
-                            if col not in ["As Of", "Currency"]:
-                                self.historical[col] = pd.to_numeric(self.historical[col], errors='coerce')
-                        
-                        self.historical.rename(columns={"As Of": "date", "Currency":"currency"}, inplace=True)
-                        self.historical.set_index("date", inplace=True)
-
-                        self.historical = self.historical.join( fetch_currency_data(
-                            fund_currency = self.fund_currency, 
-                            portfolio_currency = self.portfolio_currency, 
-                            start_date = min(self.historical.index), 
-                            end_date = max(self.historical.index ) ) )
-                        self.historical['fx_rate'].ffill(inplace=True)
-                        self._calculate_returns(self.historical)
+                        raw = _read_historical(csv_path)
+                        previous = self.previous_historical
+                        if previous is not None and not previous.empty and "fx_rate" in previous.columns:
+                            self.historical = merge_historical(previous, raw, self.fund_currency, self.portfolio_currency)
+                            self.incremental = self.historical is not None
+                            if not self.incremental:
+                                LOG.info("History of %s was restated, re-deriving it in full.", xls_path.name)
+                        if not self.incremental:
+                            self.historical = _join_fx_rates(raw, self.fund_currency, self.portfolio_currency)
+                            self._calculate_returns(self.historical)
                         
                     elif name == "distributions":
                         self.distributions = pd.read_csv(csv_path, encoding="utf-8-sig")
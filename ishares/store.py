@@ -0,0 +1,386 @@
+from __future__ import annotations
+import json
+import os
+import re
+import shutil
+import threading
+from collections.abc import Mapping, MutableMapping
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pandas as pd
+from .utils import get_logger
+from .. import config
+
+LOG = get_logger(__name__)
+DEFAULT_STORE_DIR = config.DATA_DIR / "fund_data"
+DATA_KINDS = ("holdings", "historical", "distributions")
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "index.parquet"
+META_NAME = "store.json"
+# per-ticker values of detailed_fund_data that live in the index rather than in a frame
+INFO_KEYS = ("source_xls", "portfolio_currency")
+INDEX_COLUMNS = (["ticker", "file", *INFO_KEYS, "updated_at"] + [f"{kind}_rows" for kind in DATA_KINDS]
+                 + ["first_date", "last_date", "last_nav", "last_fx_rate"])
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+# --------------------------------------------------------------------------- #
+# legacy layout: <ticker>_<kind>.parquet + manifest.json
+# --------------------------------------------------------------------------- #
+
+def _historical_from_parquet(path: Path) -> pd.DataFrame:
+    hist_df = pd.read_parquet(path)
+    if "date" in hist_df.columns:
+        hist_df["date"] = pd.to_datetime(hist_df["date"])
+        hist_df = hist_df.set_index("date")
+    return hist_df
+
+
+def load_detailed_data(directory: Path, master=None, tickers: Iterable[str] | None = None,
+                       kinds: Iterable[str] = DATA_KINDS) -> tuple[dict, dict]:
+    """
+    Reads data saved in the legacy layout (one file per ticker and kind plus ``manifest.json``).
+
+    Args:
+        directory: Folder containing ``manifest.json``.
+        master: Optional SecurityMaster; holdings are dictionary-encoded through it.
+        tickers: Only load these tickers (default: all in the manifest).
+        kinds: Only load these data kinds; the others are left as empty frames.
+
+    Returns:
+        tuple: ``(detailed_fund_data, manifest)``.
+    """
+    directory = Path(directory)
+    manifest_p = directory / MANIFEST_NAME
+    if not manifest_p.exists():
+        raise FileNotFoundError(f"{MANIFEST_NAME} not found in {directory}")
+    with open(manifest_p, "r") as f:
+        manifest = json.load(f)
+    wanted = manifest.get("tickers", [])
+    if tickers is not None:
+        tickers = set(tickers)
+        wanted = [t for t in wanted if t in tickers]
+    kinds = set(kinds)
+    loaded_data = {}
+    for tkr in wanted:
+        hld_p, hist_p, dist_p = directory / f"{tkr}_holdings.parquet", directory / f"{tkr}_historical.parquet", directory / f"{tkr}_distributions.parquet"
+        holdings = pd.read_parquet(hld_p) if "holdings" in kinds and hld_p.exists() else pd.DataFrame()
+        loaded_data[tkr] = {
+            "holdings": master.encode_holdings(holdings) if master is not None else holdings,
+            "historical": _historical_from_parquet(hist_p) if "historical" in kinds and hist_p.exists() else pd.DataFrame(),
+            "distributions": pd.read_parquet(dist_p) if "distributions" in kinds and dist_p.exists() else pd.DataFrame(),
+        }
+    return loaded_data, manifest
+
+
+# --------------------------------------------------------------------------- #
+# partitioned store
+# --------------------------------------------------------------------------- #
+
+class FundDataStore:
+    """
+    Detailed fund data on disk, partitioned by data kind and ticker.
+
+    Layout::
+
+        <root>/index.parquet                  one row per ticker: files, row counts, date range, latest NAV
+        <root>/store.json                     store-level metadata (last data pull)
+        <root>/<kind>/<ticker>.parquet        holdings / historical / distributions
+
+    Opening a store only reads the small index. Frames are read one ticker and kind
+    at a time, and writes replace single files atomically, so the archive can grow
+    without slowing down start-up or saves.
+    """
+    def __init__(self, root: Path = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        index_p = self.root / INDEX_NAME
+        index = pd.read_parquet(index_p).reindex(columns=INDEX_COLUMNS) if index_p.exists() else pd.DataFrame(columns=INDEX_COLUMNS)
+        self._index: pd.DataFrame = index.set_index("ticker", drop=False)
+        meta_p = self.root / META_NAME
+        self.meta: dict = json.loads(meta_p.read_text()) if meta_p.exists() else {}
+
+    @staticmethod
+    def is_store(directory: Path) -> bool:
+        return (Path(directory) / INDEX_NAME).exists()
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self._index.index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def tickers(self) -> list[str]:
+        return self._index.index.tolist()
+
+    @property
+    def index(self) -> pd.DataFrame:
+        """One row per ticker (see ``INDEX_COLUMNS``); do not mutate."""
+        return self._index
+
+    def info(self, ticker: str) -> dict:
+        return self._index.loc[ticker].to_dict()
+
+    def _path(self, kind: str, file_stem: str) -> Path:
+        return self.root / kind / f"{file_stem}.parquet"
+
+    # ------------------------------------------------------------------ #
+    # reading
+    # ------------------------------------------------------------------ #
+
+    def read(self, ticker: str, kind: str, columns: list[str] | None = None) -> pd.DataFrame:
+        """One data kind of one ticker, optionally only some *columns*; an empty frame if it was never stored."""
+        index = self._index
+        if ticker not in index.index or not index.at[ticker, f"{kind}_rows"]:
+            return pd.DataFrame()
+        path = self._path(kind, index.at[ticker, "file"])
+        if not path.exists():
+            return pd.DataFrame()
+        if columns is not None:
+            import pyarrow.parquet as pq    # pandas' parquet engine
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, columns=columns)
+
+    def latest_prices(self, tickers: Iterable[str] | None = None) -> pd.DataFrame:
+        """Latest NAV, fx rate and as-of date per ticker, straight from the index."""
+        from ..portfolio.combined_holdings import PRICE_INDEX_COLUMNS
+        index = self._index if tickers is None else self._index.reindex([t for t in tickers if t in self._index.index])
+        index = index[index["last_nav"].notna()]
+        prices = pd.DataFrame({"NAV": index["last_nav"].astype(float), "fx_rate": index["last_fx_rate"].fillna(1.0).astype(float),
+                               "as_of": pd.to_datetime(index["last_date"])}, index=index.index)
+        prices.index.name = None
+        return prices[PRICE_INDEX_COLUMNS]
+
+    # ------------------------------------------------------------------ #
+    # writing
+    # ------------------------------------------------------------------ #
+
+    def _write_frame(self, frame: pd.DataFrame, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".parquet.tmp")
+        frame.to_parquet(tmp, index=isinstance(frame.index, (pd.DatetimeIndex, pd.MultiIndex)))
+        os.replace(tmp, path)
+
+    def _save_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (INDEX_NAME + ".tmp")
+        self._index.reset_index(drop=True).to_parquet(tmp, index=False)
+        os.replace(tmp, self.root / INDEX_NAME)
+
+    def write(self, ticker: str, data: Mapping, master=None, save_index: bool = True) -> None:
+        """
+        Stores the frames of one ticker, replacing what was stored before.
+        Encoded holdings are decoded through *master* so the files are self-contained.
+        """
+        from ..portfolio.combined_holdings import build_latest_price_index
+        file_stem = _UNSAFE_FILENAME_RE.sub("_", str(ticker))
+        row = {"ticker": ticker, "file": file_stem, "updated_at": pd.Timestamp.now(), **{key: data.get(key) for key in INFO_KEYS}}
+        for kind in DATA_KINDS:
+            frame = data.get(kind)
+            if frame is not None and kind == "holdings" and master is not None:
+                frame = master.decode_holdings(frame)
+            path = self._path(kind, file_stem)
+            if frame is None or frame.empty:
+                path.unlink(missing_ok=True)
+                row[f"{kind}_rows"] = 0
+                continue
+            self._write_frame(frame, path)
+            row[f"{kind}_rows"] = len(frame)
+
+        hist = data.get("historical")
+        latest = build_latest_price_index({ticker: {"historical": hist}}) if hist is not None else pd.DataFrame()
+        has_dates = hist is not None and not hist.empty and isinstance(hist.index, pd.DatetimeIndex)
+        row.update({
+            "first_date": hist.index.min() if has_dates else pd.NaT,
+            "last_date": hist.index.max() if has_dates else pd.NaT,
+            "last_nav": latest["NAV"].iloc[0] if not latest.empty else None,
+            "last_fx_rate": latest["fx_rate"].iloc[0] if not latest.empty else None,
+        })
+        with self._lock:
+            others = self._index.drop(index=ticker, errors="ignore")
+            new_row = pd.DataFrame([row], columns=INDEX_COLUMNS).set_index("ticker", drop=False)
+            self._index = pd.concat([others, new_row]) if len(others) else new_row
+            if save_index:
+                self._save_index()
+
+    def write_many(self, detailed_fund_data: Mapping, master=None, last_data_pull: dict | None = None) -> None:
+        for ticker, data in detailed_fund_data.items():
+            self.write(ticker, data, master, save_index=False)
+        with self._lock:
+            self._save_index()
+        if last_data_pull is not None:
+            self.set_last_data_pull(last_data_pull)
+
+    def delete(self, ticker: str) -> None:
+        with self._lock:
+            if ticker not in self._index.index:
+                return
+            file_stem = self._index.at[ticker, "file"]
+            for kind in DATA_KINDS:
+                self._path(kind, file_stem).unlink(missing_ok=True)
+            self._index = self._index.drop(index=ticker)
+            self._save_index()
+
+    def set_last_data_pull(self, info: dict | None) -> None:
+        self.meta["last_data_pull"] = info
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / META_NAME).write_text(json.dumps(self.meta, indent=4, default=str))
+
+    def export(self, directory: Path) -> "FundDataStore":
+        """Copies the store to *directory* file by file, without loading any frame."""
+        directory = Path(directory)
+        for kind in DATA_KINDS:
+            if (self.root / kind).exists():
+                shutil.copytree(self.root / kind, directory / kind, dirs_exist_ok=True)
+        for name in (INDEX_NAME, META_NAME):
+            if (self.root / name).exists():
+                shutil.copy2(self.root / name, directory / name)
+        return FundDataStore(directory)
+
+    def import_store(self, source: "FundDataStore") -> list[str]:
+        """
+        Copies every ticker of *source* into this store file by file, replacing what
+        was stored for it here, without loading any frame. *source* is only read.
+        """
+        rows = []
+        for ticker, info in source.index.iterrows():
+            file_stem = _UNSAFE_FILENAME_RE.sub("_", str(ticker))
+            for kind in DATA_KINDS:
+                src, dst = source._path(kind, info["file"]), self._path(kind, file_stem)
+                if info[f"{kind}_rows"] and src.exists():
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = dst.with_suffix(".parquet.tmp")
+                    shutil.copy2(src, tmp)
+                    os.replace(tmp, dst)
+                else:
+                    dst.unlink(missing_ok=True)
+            # a new timestamp, so whatever was derived from the replaced files is rebuilt
+            rows.append({**info.to_dict(), "file": file_stem, "updated_at": pd.Timestamp.now()})
+        if rows:
+            with self._lock:
+                imported = pd.DataFrame(rows, columns=INDEX_COLUMNS).set_index("ticker", drop=False)
+                others = self._index.drop(index=imported.index, errors="ignore")
+                self._index = pd.concat([others, imported]) if len(others) else imported
+                self._save_index()
+        if source.meta.get("last_data_pull") is not None:
+            self.set_last_data_pull(source.meta["last_data_pull"])
+        return [row["ticker"] for row in rows]
+
+    def import_legacy(self, directory: Path) -> list[str]:
+        """Converts a manifest-based save into this store, one ticker at a time; *directory* is only read."""
+        _, manifest = load_detailed_data(directory, tickers=[])
+        for ticker in manifest.get("tickers", []):
+            data, _ = load_detailed_data(directory, tickers=[ticker])
+            if ticker in data:
+                self.write(ticker, data[ticker], save_index=False)
+        with self._lock:
+            self._save_index()
+        self.set_last_data_pull(manifest.get("last_data_pull"))
+        return manifest.get("tickers", [])
+
+    def mapping(self, master=None) -> "LazyFundData":
+        return LazyFundData(self, master)
+
+
+class LazyFundEntry(Mapping):
+    """The ``detailed_fund_data`` dict of one ticker; frames are read on first access, ``INFO_KEYS`` come from the index."""
+    def __init__(self, owner: "LazyFundData", ticker: str, cache: dict | None = None):
+        self._owner = owner
+        self.ticker = ticker
+        self._cache: dict = dict(cache or {})
+
+    def __getitem__(self, kind: str):
+        if kind in self._cache:
+            return self._cache[kind]
+        store, master = self._owner.store, self._owner.master
+        if kind in DATA_KINDS:
+            frame = store.read(self.ticker, kind)
+            if kind == "holdings" and master is not None:
+                frame = master.encode_holdings(frame)
+            self._cache[kind] = frame
+            return frame
+        if kind in INFO_KEYS and self.ticker in store:
+            value = store.info(self.ticker).get(kind)
+            return None if pd.isna(value) else value
+        raise KeyError(kind)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(DATA_KINDS + INFO_KEYS)
+
+    def __len__(self) -> int:
+        return len(DATA_KINDS) + len(INFO_KEYS)
+
+    def release(self, kinds: Iterable[str] = DATA_KINDS) -> None:
+        for kind in kinds:
+            self._cache.pop(kind, None)
+
+
+class LazyFundData(MutableMapping):
+    """
+    Drop-in replacement for the ``detailed_fund_data`` dict, backed by a FundDataStore.
+
+    Iterating or checking membership only touches the store index; a ticker's frames
+    are read when first accessed and cached until :meth:`release`. Assigning a ticker
+    writes it through to the store.
+    """
+    def __init__(self, store: FundDataStore, master=None):
+        self.store = store
+        self.master = master
+        self._entries: dict[str, LazyFundEntry] = {}
+
+    def __getitem__(self, ticker: str) -> LazyFundEntry:
+        if ticker not in self.store:
+            raise KeyError(ticker)
+        entry = self._entries.get(ticker)
+        if entry is None:
+            entry = self._entries[ticker] = LazyFundEntry(self, ticker)
+        return entry
+
+    def __setitem__(self, ticker: str, data: Mapping) -> None:
+        self.store.write(ticker, data, self.master)
+        self._entries[ticker] = LazyFundEntry(self, ticker, cache={k: v for k, v in data.items() if k in DATA_KINDS})
+
+    def __delitem__(self, ticker: str) -> None:
+        if ticker not in self.store:
+            raise KeyError(ticker)
+        self.store.delete(ticker)
+        self._entries.pop(ticker, None)
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self.store
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.tickers())
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def update_many(self, detailed_fund_data: Mapping) -> None:
+        """Writes several tickers with a single index rewrite."""
+        self.store.write_many(detailed_fund_data, self.master)
+        for ticker, data in detailed_fund_data.items():
+            self._entries[ticker] = LazyFundEntry(self, ticker, cache={k: v for k, v in data.items() if k in DATA_KINDS})
+
+    def release(self, kinds: Iterable[str] = DATA_KINDS, tickers: Iterable[str] | None = None) -> None:
+        """Drops cached frames; they are read from disk again on next access."""
+        for ticker in (list(self._entries) if tickers is None else tickers):
+            if ticker in self._entries:
+                self._entries[ticker].release(kinds)
+
+    def latest_prices(self, tickers: Iterable[str] | None = None) -> pd.DataFrame:
+        return self.store.latest_prices(tickers)
+
+
+def open_fund_data(directory: Path = DEFAULT_STORE_DIR, master=None) -> Mapping:
+    """
+    Detailed fund data in *directory*: a lazy mapping over a partitioned store, or an
+    eagerly loaded dict for a legacy manifest-based save.
+    """
+    directory = Path(directory)
+    if not FundDataStore.is_store(directory) and (directory / MANIFEST_NAME).exists():
+        LOG.info("%s uses the legacy manifest layout; loading it eagerly.", directory)
+        return load_detailed_data(directory, master)[0]
+    return FundDataStore(directory).mapping(master)
@@ -5,16 +5,15 @@ from typing import Callable
 import time
 
 import pandas as pd
-from .fund_list import etf_list_getter
 from .. import config
 
 _CACHE = config.CACHE_DIR / "universe.parquet"
-_CACHE.parent.mkdir(parents=True, exist_ok=True)
 
 
 def _scrape(headless: bool = True,
             browser_binary_path: str = None,
             chrome_driver_path: str = None) -> pd.DataFrame:
+    from .fund_list import etf_list_getter      # selenium is only needed when scraping
     getter = etf_list_getter(
         browser_binary_path,
         chrome_driver_path
@@ -52,6 +51,7 @@ def load_or_scrape(force: bool = False,
                 df = _scrape(headless=True,
                             browser_binary_path=browser_binary_path,
                             chrome_driver_path=chrome_driver_path)
+                _CACHE.parent.mkdir(parents=True, exist_ok=True)
                 df.to_parquet(_CACHE, index=False)
                 print(f"Saved universe to {_CACHE}")
                 q.put(df)
@@ -3,7 +3,6 @@ from .. import config
 import logging, os
 
 CACHE_DIR = config.RAW_DATA_DIR
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 def get_logger(name: str) -> logging.Logger:
     log = logging.getLogger(name)
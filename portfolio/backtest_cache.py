@@ -0,0 +1,162 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from .. import config
+from .backtester import PortfolioBacktester, return_statistics
+from .risk import risk_statistics
+
+BACKTEST_DIR_NAME = "backtests"
+RISK_FREE_RATES_FILE = "risk_free_rates.json"
+
+
+class BacktestCache:
+    """
+    Results of earlier backtest and optimisation runs, kept next to the fund data store.
+
+    An entry is keyed by a hash of what the simulated returns depend on: the weights,
+    the fingerprint of the funds' returns in the panel, the rebalancing code, the
+    currency and the kind of run. Re-downloading a fund changes the key of the runs
+    holding it and leaves all other entries valid. Each entry is a directory of
+    Parquet frames plus ``meta.json``; its modification time is the last use, and the
+    least recently used entries beyond *max_entries* are removed whenever a new one
+    is stored.
+
+    The risk-free rate is refetched regularly, so it is stored with the entry rather
+    than keyed on: an entry's ``returns`` frame holds one column per portfolio, and
+    its ``statistics`` (in ``meta``, per column) and ``risk`` frame are recomputed
+    from them when :meth:`get` asks for another rate.
+    """
+    def __init__(self, directory: Path, max_entries: int = config.BACKTEST_CACHE_ENTRIES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+
+    @classmethod
+    def for_store(cls, store, max_entries: int = config.BACKTEST_CACHE_ENTRIES) -> "BacktestCache":
+        return cls(Path(store.root) / BACKTEST_DIR_NAME, max_entries)
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    @staticmethod
+    def key(weights: pd.Series, panel, rebalancing_period: str, kind: str = "backtest") -> str:
+        parts = [kind, panel.currency, rebalancing_period, panel.fingerprint(weights.index)]
+        parts += [f"{ticker}={weight:.12g}" for ticker, weight in sorted(weights.items())]
+        return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+    def _entries(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        # entries still being written are hidden ".<key>-*" directories
+        return [p for p in self.directory.iterdir() if p.is_dir() and not p.name.startswith(".") and (p / "meta.json").exists()]
+
+    def get(self, key: str, risk_free_rate: float | None = None) -> tuple[dict, dict[str, pd.DataFrame]] | None:
+        """The stored ``(meta, frames)`` of *key*, restated at *risk_free_rate* if given, or None."""
+        entry = self.directory / key
+        meta_p = entry / "meta.json"
+        if not meta_p.exists():
+            return None
+        try:
+            meta = json.loads(meta_p.read_text())
+            frames = {name: pd.read_parquet(entry / f"{name}.parquet") for name in meta["frames"]}
+        except Exception as e:
+            print(f"Discarding unreadable backtest cache entry {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        os.utime(entry)    # mark as recently used
+        if risk_free_rate is not None and meta.get("risk_free_rate") != risk_free_rate:
+            meta, frames = self._restated(meta, frames, risk_free_rate)
+        return meta, frames
+
+    @staticmethod
+    def _restated(meta: dict, frames: dict[str, pd.DataFrame], risk_free_rate: float) -> tuple[dict, dict[str, pd.DataFrame]]:
+        returns = frames["returns"]
+        meta = {**meta, "risk_free_rate": risk_free_rate}
+        if "statistics" in meta:
+            meta["statistics"] = {col: return_statistics(returns[col], risk_free_rate) for col in returns.columns}
+        if "risk" in frames:
+            frames = {**frames, "risk": risk_statistics(returns, risk_free_rate).reset_index()}
+        return meta, frames
+
+    def put(self, key: str, meta: dict, frames: dict[str, pd.DataFrame], panel=None, tickers=None) -> None:
+        """
+        Stores an entry. With *panel* and *tickers* the entry records what it was
+        computed from, so :meth:`prune` can drop it once those returns change.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=self.directory, prefix=f".{key}-"))
+        try:
+            for name, frame in frames.items():
+                frame.to_parquet(tmp / f"{name}.parquet")
+            meta = {**meta, "frames": list(frames), "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+            if panel is not None and tickers is not None:
+                meta.update(currency=panel.currency, tickers=list(tickers), fingerprint=panel.fingerprint(tickers))
+            (tmp / "meta.json").write_text(json.dumps(meta, default=float))
+            entry = self.directory / key
+            shutil.rmtree(entry, ignore_errors=True)
+            try:
+                os.replace(tmp, entry)
+            except OSError:
+                pass    # another run stored the same result in between, which is as good as ours
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_entries:]:
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def prune(self, panel) -> int:
+        """Removes the entries of *panel*'s currency whose fund returns have changed since. Returns how many."""
+        removed = 0
+        for entry in self._entries():
+            try:
+                meta = json.loads((entry / "meta.json").read_text())
+            except Exception:
+                meta = {}
+            if meta.get("currency") == panel.currency and "tickers" in meta and panel.fingerprint(meta["tickers"]) != meta.get("fingerprint"):
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def cached_risk_free_rate(currency: str, maturity: str = 'overnight', max_age=config.RISK_FREE_RATE_MAX_AGE,
+                          path: Path | None = None, retry_after=config.RISK_FREE_RATE_RETRY_AFTER) -> float:
+    """
+    :meth:`PortfolioBacktester.get_risk_free_rate` as a fraction, fetched at most once
+    per *max_age* and currency. If a fetch fails the last known rate is used, or 0,
+    and the failure is recorded so the fetch is retried only after *retry_after*.
+    """
+    path = Path(path) if path is not None else config.CACHE_DIR / RISK_FREE_RATES_FILE
+    try:
+        rates = json.loads(path.read_text()) if path.exists() else {}
+    except Exception:
+        rates = {}
+    cache_key = f"{currency}:{maturity}"
+    cached = rates.get(cache_key)
+    if cached is not None:
+        age = (retry_after if cached.get("failed") else max_age).total_seconds()
+        if time.time() - cached["fetched"] < age:
+            return cached["rate"]
+
+    rate = PortfolioBacktester.get_risk_free_rate(currency=currency, maturity=maturity)
+    if rate is None or pd.isna(rate):
+        rates[cache_key] = {"rate": cached["rate"] if cached is not None else 0.0, "fetched": time.time(), "failed": True}
+    else:
+        rates[cache_key] = {"rate": float(rate) / 100.0, "fetched": time.time()}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    with os.fdopen(fd, "w") as f:
+        f.write(json.dumps(rates, indent=4))
+    os.replace(tmp, path)
+    return rates[cache_key]["rate"]
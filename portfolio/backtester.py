@@ -1,128 +1,225 @@
 import pandas as pd
 import numpy as np
-import requests
 import datetime
-import pandas_datareader.data as web
-import xml.etree.ElementTree as ET
+from .combined_holdings import calculate_portfolio_weights
+
+
+def prepare_backtest_inputs(portfolio: pd.DataFrame, detailed_fund_data: dict,
+                            price_index: pd.DataFrame | None = None, panel=None) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Currency-adjusted daily returns of the portfolio's funds over their common history,
+    and the matching start weights.
+
+    Args:
+        panel (ReturnsPanel, optional): Synced returns panel; the returns are then a column
+            selection from it instead of being assembled from each fund's history.
+
+    Raises:
+        ValueError: If no fund has return data or the funds share no dates.
+    """
+    if panel is not None:
+        asset_returns_df = panel.select(portfolio["ticker"])
+        valid_portfolio_df = portfolio[portfolio['ticker'].isin(asset_returns_df.columns)]
+        weights_dict, _ = calculate_portfolio_weights(valid_portfolio_df, detailed_fund_data, price_index)
+        return asset_returns_df.align(pd.Series(weights_dict, dtype=float), axis=1, join='inner')
+
+    all_returns_series = []
+    valid_tickers_for_backtest = []
+    inception_date = []
+
+    for ticker in dict.fromkeys(portfolio["ticker"]):
+        data = detailed_fund_data.get(ticker)
+        hist_data = data.get("historical") if data is not None else None
+        if hist_data is not None and 'ccy_adj_return' in hist_data.columns and hist_data['ccy_adj_return'].notna().any():
+            return_series = hist_data['ccy_adj_return'].rename(ticker)
+            inception_date.append(return_series.index.min())
+            all_returns_series.append(return_series)
+            valid_tickers_for_backtest.append(ticker)
+
+    if not all_returns_series:
+        raise ValueError("No currency-adjusted return data available for funds in the portfolio.")
+
+    # histories are stored newest first, and a single series is not re-sorted by concat
+    asset_returns_df = pd.concat(all_returns_series, axis=1).sort_index()
+    latest_start_date = max(inception_date)
+    asset_returns_df = asset_returns_df.loc[latest_start_date:]
+    asset_returns_df = asset_returns_df.fillna(0)
+    if asset_returns_df.empty:
+        raise ValueError("No common date range found for all assets in the portfolio.")
+
+    valid_portfolio_df = portfolio[portfolio['ticker'].isin(valid_tickers_for_backtest)]
+    weights_dict, _ = calculate_portfolio_weights(valid_portfolio_df, detailed_fund_data, price_index)
+    return asset_returns_df.align(pd.Series(weights_dict, dtype=float), axis=1, join='inner')
+
+
+# Define periods using pandas DateOffset for accurate calendar math
+STATISTICS_PERIODS = {
+    "30 Days": pd.DateOffset(days=30),
+    "3 Months": pd.DateOffset(months=3),
+    "6 Months": pd.DateOffset(months=6),
+    "1 Year": pd.DateOffset(years=1),
+    "2 Years": pd.DateOffset(years=2),
+    "3 Years": pd.DateOffset(years=3),
+    "5 Years": pd.DateOffset(years=5),
+    "7 Years": pd.DateOffset(years=7),
+    "10 Years": pd.DateOffset(years=10),
+}
+
+
+def period_risk_free_rate(risk_free_rate: float, n_days: int) -> float:
+    """
+    The annual *risk_free_rate* over a window of *n_days* trading days. Windows shorter
+    than a year report their total rather than an annualised return, so the rate is
+    compounded over the window for them.
+    """
+    num_years = n_days / 252.0
+    return (1 + risk_free_rate) ** num_years - 1 if num_years < 1 else risk_free_rate
+
+
+def statistics_windows(dates: pd.DatetimeIndex) -> dict[str, int | None]:
+    """
+    First row of every trailing window of ``STATISTICS_PERIODS`` in the ascending
+    *dates* (None where the history is too short), plus the whole history.
+    """
+    first_date, end_date = dates.min(), dates.max()
+    windows = {}
+    for name, offset in STATISTICS_PERIODS.items():
+        start_date = end_date - offset
+        windows[name] = None if start_date < first_date else int(dates.searchsorted(start_date))
+    first_date_str = datetime.datetime.strftime(first_date, "%d-%m-%Y")
+    end_date_str = datetime.datetime.strftime(end_date, "%d-%m-%Y")
+    windows[f"Since Inception ({first_date_str} - {end_date_str})"] = 0
+    return windows
+
+
+def rebalance_markers(dates: pd.DatetimeIndex, rebalancing_period: str) -> np.ndarray | None:
+    """
+    Period label of every date; the weights are reset whenever the label changes.
+    None for 'none', where the weights drift for the whole history.
+    """
+    period_markers_map = {
+        'd': lambda: np.arange(len(dates)),
+        'w': lambda: dates.isocalendar().week.to_numpy(),
+        'bw': lambda: ((dates - dates[0]).days // 14).to_numpy(),
+        'm': lambda: dates.month.to_numpy(),
+        'q': lambda: dates.quarter.to_numpy(),
+        'sa': lambda: ((dates.month - 1) // 6).to_numpy(),
+        'y': lambda: dates.year.to_numpy(),
+        'none': lambda: None,
+    }
+    if rebalancing_period not in period_markers_map:
+        raise ValueError("rebalancing_period must be one of 'd', 'w', 'bw', 'm', 'q', 'sa', 'y', 'none'")
+    return period_markers_map[rebalancing_period]()
+
+
+def rebalanced_returns(returns: np.ndarray, weights: np.ndarray, markers: np.ndarray | None) -> np.ndarray:
+    """
+    Daily portfolio returns of *returns* (``... x days x assets``) held at *weights*,
+    drifting with the asset returns and reset to *weights* at each change of *markers*.
+
+    Any leading axes of *returns* (paths) or *weights* (``... x assets``, weight
+    vectors) are independent portfolios that are run together, so many paths or
+    weightings cost one pass over the days with every step vectorised across them.
+    """
+    n_days = returns.shape[-2]
+    resets = np.zeros(n_days, dtype=bool)
+    if markers is not None:
+        resets[1:] = markers[1:] != markers[:-1]
+    if n_days < 2 or resets[1:].all():
+        # daily rebalancing keeps the weights constant
+        return returns @ weights if weights.ndim == 1 else np.einsum("...da,...a->...d", returns, weights)
+
+    batch_shape = np.broadcast_shapes(returns.shape[:-2], weights.shape[:-1])
+    portfolio_returns_np = np.empty(batch_shape + (n_days,))
+    current_weights_np = np.broadcast_to(weights, batch_shape + weights.shape[-1:]).copy()
+    for i in range(n_days):
+        day_returns = returns[..., i, :]
+        portfolio_returns_np[..., i] = np.sum(current_weights_np * day_returns, axis=-1)
+
+        if i < n_days - 1:
+            if resets[i + 1]:
+                current_weights_np[...] = weights
+            else:
+                new_values = current_weights_np * (1 + day_returns)
+                total_value = np.sum(new_values, axis=-1, keepdims=True)
+                # a path whose value fell to zero keeps its weights
+                current_weights_np = np.where(total_value != 0, new_values / np.where(total_value != 0, total_value, 1.0), current_weights_np)
+    return portfolio_returns_np
+
+
+def period_stats(returns_period: pd.Series, risk_free_rate: float) -> dict:
+    """Total return, annualised standard deviation and Sharpe ratio of one window of daily returns."""
+    if returns_period.empty or len(returns_period) < 2:
+        return {'return': np.nan, 'std_dev': np.nan, 'sharpe': np.nan}
+
+    total_return = (1 + returns_period).prod() - 1
+
+    annualized_std = returns_period.std() * np.sqrt(252)
+
+    num_years = len(returns_period) / 252.0
+    annualized_return = ((1 + total_return) ** (1 / num_years)) - 1 if num_years > 1 else total_return
+
+    adj_rf = period_risk_free_rate(risk_free_rate, len(returns_period))
+    excess_return = annualized_return - adj_rf
+    sharpe_ratio = excess_return / annualized_std if annualized_std > 0 else np.nan
+
+    return {
+        'return': total_return,
+        'std_dev': annualized_std,
+        'sharpe': sharpe_ratio
+    }
+
+
+def return_statistics(portfolio_returns: pd.Series, risk_free_rate: float) -> dict:
+    """:func:`period_stats` of a daily return series over every window of :func:`statistics_windows`."""
+    stats = {}
+    # Sort chronologically for calculations
+    returns = portfolio_returns.sort_index(ascending=True)
+    for name, start_row in statistics_windows(returns.index).items():
+        if start_row is None:
+            stats[name] = {'return': np.nan, 'std_dev': np.nan, 'sharpe': np.nan}
+            continue
+        period_returns = returns.iloc[start_row:]
+        if not period_returns.empty:
+            stats[name] = period_stats(period_returns, risk_free_rate)
+        else:
+            stats[name] = {'return': np.nan, 'std_dev': np.nan, 'sharpe': np.nan}
+    return stats
+
 
 class PortfolioBacktester:
-    def __init__(self, portfolio_weights: pd.Series, asset_returns: pd.DataFrame, rebalancing_period: str, portfolio_currency: str):
+    def __init__(self, portfolio_weights: pd.Series, asset_returns: pd.DataFrame, rebalancing_period: str, portfolio_currency: str,
+                 risk_free_rate: float | None = None):
         self.portfolio_weights = portfolio_weights
         self.asset_returns = asset_returns
         self.rebalancing_period = rebalancing_period
         self.portfolio_currency = portfolio_currency
-        self.risk_free_rate = (self.get_risk_free_rate(currency=portfolio_currency, maturity='overnight') or 0.0) / 100.0
+        # pass a known rate (as a fraction) to skip the network fetch
+        if risk_free_rate is None:
+            risk_free_rate = (self.get_risk_free_rate(currency=portfolio_currency, maturity='overnight') or 0.0) / 100.0
+        self.risk_free_rate = risk_free_rate
         self.portfolio_return_series = self.calculate_portfolio_return_timeseries()
 
     def calculate_portfolio_return_timeseries(self) -> pd.Series:
         """
         Calculate the portfolio return time series based on the portfolio weights and asset returns.
         """
-        returns_np = self.asset_returns.to_numpy()
-        weights_np = self.portfolio_weights.to_numpy()
-        n_days, n_assets = returns_np.shape
-
-        if self.rebalancing_period == "d":
-            portfolio_return = self.portfolio_weights.dot(self.asset_returns.T)
-            return portfolio_return
-
-        portfolio_returns_np = np.empty(n_days)
-        current_weights_np = np.copy(weights_np)
-
-        period_markers_map = {
-            'w': self.asset_returns.index.isocalendar().week,
-            'bw': (self.asset_returns.index - self.asset_returns.index[0]).days // 14,
-            'm': self.asset_returns.index.month,
-            'q': self.asset_returns.index.quarter,
-            'sa': (self.asset_returns.index.month - 1) // 6,
-            'y': self.asset_returns.index.year,
-            'none': None
-        }
-
-        if self.rebalancing_period not in period_markers_map:
-            raise ValueError("rebalancing_period must be one of 'd', 'w', 'bw', 'm', 'q', 'sa', 'y', 'none'")
-
-        period_markers = period_markers_map[self.rebalancing_period]
-        if period_markers is not None:
-            period_markers = period_markers.to_numpy()
-
-        for i in range(n_days):
-            day_return = np.sum(current_weights_np * returns_np[i])
-            portfolio_returns_np[i] = day_return
-
-            if i < n_days - 1:
-                if period_markers is not None and period_markers[i+1] != period_markers[i]:
-                    current_weights_np = np.copy(weights_np)
-                    
-                else:
-                    new_values = current_weights_np * (1 + returns_np[i])
-                    total_value = np.sum(new_values)
-                    if total_value != 0:
-                        current_weights_np = new_values / total_value
-
+        markers = rebalance_markers(self.asset_returns.index, self.rebalancing_period)
+        portfolio_returns_np = rebalanced_returns(self.asset_returns.to_numpy(dtype=float), self.portfolio_weights.to_numpy(dtype=float), markers)
         return pd.Series(portfolio_returns_np, index=self.asset_returns.index)
 
     def calculate_period_stats(self, returns_period: pd.Series) -> dict:
         """Helper to calculate stats for a given period of returns."""
-        if returns_period.empty or len(returns_period) < 2:
-            return {'return': np.nan, 'std_dev': np.nan, 'sharpe': np.nan}
-
-        total_return = (1 + returns_period).prod() - 1
-
-        annualized_std = returns_period.std() * np.sqrt(252)
-
-        num_years = len(returns_period) / 252.0
-        annualized_return = ((1 + total_return) ** (1 / num_years)) - 1 if num_years > 1 else total_return
-
-        adj_rf = ((self.risk_free_rate + 1) ** len(returns_period) / 365.0) - 1 if num_years < 1 else self.risk_free_rate
-        excess_return = annualized_return - adj_rf
-        sharpe_ratio = excess_return / annualized_std if annualized_std > 0 else np.nan
-        
-        return {
-            'return': total_return,
-            'std_dev': annualized_std,
-            'sharpe': sharpe_ratio
-        }
+        return period_stats(returns_period, self.risk_free_rate)
 
     def calculate_statistics(self) -> dict:
         """Calculates performance statistics for various time windows."""
-        stats = {}
-        # Sort chronologically for calculations
-        returns = self.portfolio_return_series.sort_index(ascending=True)
-        first_date = returns.index.min()
-        end_date = returns.index.max()
-
-        # Define periods using pandas DateOffset for accurate calendar math
-        periods = {
-            "30 Days": pd.DateOffset(days=30),
-            "3 Months": pd.DateOffset(months=3),
-            "6 Months": pd.DateOffset(months=6),
-            "1 Year": pd.DateOffset(years=1),
-            "2 Years": pd.DateOffset(years=2),
-            "3 Years": pd.DateOffset(years=3),
-            "5 Years": pd.DateOffset(years=5),
-            "7 Years": pd.DateOffset(years=7),
-            "10 Years": pd.DateOffset(years=10),
-        }
+        return return_statistics(self.portfolio_return_series, self.risk_free_rate)
 
-        for name, offset in periods.items():
-            start_date = end_date - offset
-            if start_date < first_date:
-                stats[name] = {'return': np.nan, 'std_dev': np.nan, 'sharpe': np.nan}
-                continue
-            period_returns = returns[start_date:]
-            if not period_returns.empty:
-                stats[name] = self.calculate_period_stats(period_returns)
-            else:
-                stats[name] = {'return': np.nan, 'std_dev': np.nan, 'sharpe': np.nan}
-        
-        first_date_str = datetime.datetime.strftime(first_date, "%d-%m-%Y")
-        end_date_str = datetime.datetime.strftime(end_date, "%d-%m-%Y")
-        stats[f"Since Inception ({first_date_str} - {end_date_str})"] = self.calculate_period_stats(returns)
-        
-        return stats
-
-    def get_snb_rate_from_rss(self, rate_name='SARON'):
+    @staticmethod
+    def get_snb_rate_from_rss(rate_name='SARON'):
+        import requests
+        import xml.etree.ElementTree as ET
         url = "https://www.snb.ch/public/en/rss/interestRates"
         try:
             response = requests.get(url); response.raise_for_status(); root = ET.fromstring(response.content)
@@ -135,8 +232,10 @@ class PortfolioBacktester:
         except Exception as e:
             print(f"Error with SNB RSS feed: {e}"); return None
 
-    def get_risk_free_rate(self, currency='USD', maturity='overnight'):
-        if currency == 'CHF': return self.get_snb_rate_from_rss()
+    @staticmethod
+    def get_risk_free_rate(currency='USD', maturity='overnight'):
+        """Latest overnight rate in percent, or None if it cannot be fetched."""
+        if currency == 'CHF': return PortfolioBacktester.get_snb_rate_from_rss()
         fred_series_map = {
             'USD': {'overnight': 'DFF'}, 'EUR': {'overnight': 'ECBESTRVOL'},
             'GBP': {'overnight': 'IUDSOIA'}, 'JPY': {'overnight': 'IRSTCI01JPM156N'},
@@ -145,6 +244,7 @@ class PortfolioBacktester:
         if currency in fred_series_map and maturity in fred_series_map[currency]:
             series_id = fred_series_map[currency][maturity]
             try:
+                import pandas_datareader.data as web
                 end_date = datetime.date.today(); start_date = end_date - datetime.timedelta(days=365)
                 rate_data = web.DataReader(series_id, 'fred', start_date, end_date)
                 return rate_data[series_id].ffill().iloc[-1]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+from typing import Iterable
+
+import pandas as pd
+import numpy as np
+from .correlation import BLOCK_SIZE, MIN_PERIODS
+from .returns_panel import ReturnsPanel
+
+TRADING_DAYS = 252
+BENCHMARK_COLUMNS = ["days", "tracking_error", "beta", "alpha", "information_ratio", "correlation",
+                     "up_capture", "down_capture"]
+
+
+def _relative(x: np.ndarray, m: np.ndarray, b: np.ndarray, bm: np.ndarray, risk_free_rate: float,
+              min_periods: int) -> np.ndarray:
+    """
+    ``BENCHMARK_COLUMNS x funds`` of the returns *x* (``days x funds``, zero where the
+    mask *m* is False) against the benchmark *b* (zero where *bm* is False). Only the
+    days both report count, and every statistic is built from a few masked sums, each
+    one matrix-vector product over the block.
+    """
+    both = m & bm[:, None]
+    xb = np.where(both, x, 0.0)
+    mf = both.astype(np.float64)
+    up, down = (b > 0) & bm, (b < 0) & bm
+
+    n = mf.sum(axis=0)
+    sx, sxx = xb.sum(axis=0), (xb * xb).sum(axis=0)
+    sb, sbb = b @ mf, (b * b) @ mf
+    sxb = b @ xb
+    sx_up, sb_up = up @ xb, (b * up) @ mf
+    sx_down, sb_down = down @ xb, (b * down) @ mf
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x, mean_b = sx / n, sb / n
+        var_x = (sxx - sx * mean_x) / (n - 1)
+        var_b = (sbb - sb * mean_b) / (n - 1)
+        cov = (sxb - sx * mean_b) / (n - 1)
+        var_active = var_x + var_b - 2 * cov
+        tracking_error = np.sqrt(np.maximum(var_active, 0.0)) * np.sqrt(TRADING_DAYS)
+        beta = cov / var_b
+        rf_daily = risk_free_rate / TRADING_DAYS
+        alpha = (mean_x - rf_daily - beta * (mean_b - rf_daily)) * TRADING_DAYS
+        information_ratio = (mean_x - mean_b) * TRADING_DAYS / tracking_error
+        correlation = cov / np.sqrt(var_x * var_b)
+        up_capture = sx_up / sb_up
+        down_capture = sx_down / sb_down
+
+    stats = np.vstack([n, tracking_error, beta, alpha, information_ratio, correlation, up_capture, down_capture])
+    stats[1:, n < max(min_periods, 2)] = np.nan
+    return stats
+
+
+def relative_statistics(returns: pd.DataFrame | pd.Series, benchmark: pd.Series, risk_free_rate: float = 0.0,
+                        min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """
+    ``BENCHMARK_COLUMNS`` of every column of *returns* (daily returns, NaN where a
+    series has no value) against the daily *benchmark* returns.
+
+    Tracking error, alpha and the information ratio are annualised; alpha is Jensen's
+    alpha at *risk_free_rate*; up and down capture compare the average return on the
+    days the benchmark rose or fell.
+    """
+    frame = returns.to_frame() if isinstance(returns, pd.Series) else returns
+    dates = frame.index.union(benchmark.index)
+    x = frame.reindex(dates).to_numpy(dtype=float)
+    b = benchmark.reindex(dates).to_numpy(dtype=float)
+    stats = _relative(np.nan_to_num(x), ~np.isnan(x), np.nan_to_num(b), ~np.isnan(b), risk_free_rate, min_periods)
+    return pd.DataFrame(stats.T, index=frame.columns, columns=BENCHMARK_COLUMNS)
+
+
+class BenchmarkAnalyzer:
+    """
+    Benchmark-relative statistics of funds in a returns panel.
+
+    The benchmark is any daily return series: a fund from the panel (see
+    :meth:`fund_returns`) or a backtested portfolio. :meth:`against` evaluates every
+    fund of the panel against it in blocks of ``BLOCK_SIZE`` columns, so ranking the
+    whole universe by tracking error to a portfolio is a single pass over the panel
+    with bounded memory.
+    """
+    def __init__(self, panel: ReturnsPanel, min_periods: int = MIN_PERIODS):
+        self.panel = panel
+        self.min_periods = min_periods
+
+    def fund_returns(self, ticker: str) -> pd.Series:
+        """Daily returns of *ticker* on the days it reports."""
+        if ticker not in self.panel:
+            raise KeyError(f"{ticker} has no return data in the {self.panel.currency} panel")
+        returns, present = self.panel.columns([ticker])
+        present = present[:, 0]
+        return pd.Series(returns[present, 0], index=self.panel.dates[present], name=ticker)
+
+    def against(self, benchmark: pd.Series, tickers: Iterable[str] | None = None, risk_free_rate: float = 0.0) -> pd.DataFrame:
+        """``BENCHMARK_COLUMNS`` of *tickers* (default: every fund in the panel) against *benchmark*."""
+        panel = self.panel
+        tickers = panel.tickers if tickers is None else [t for t in dict.fromkeys(tickers) if t in panel]
+
+        # the benchmark on the panel's date axis; its days the panel lacks cannot pair with any fund
+        benchmark = benchmark.dropna()
+        rows = panel.dates.get_indexer(benchmark.index)
+        b = np.zeros(len(panel.dates))
+        bm = np.zeros(len(panel.dates), dtype=bool)
+        b[rows[rows >= 0]] = benchmark.to_numpy(dtype=float)[rows >= 0]
+        bm[rows[rows >= 0]] = True
+
+        stats = np.empty((len(BENCHMARK_COLUMNS), len(tickers)))
+        for start in range(0, len(tickers), BLOCK_SIZE):
+            x, m = panel.columns(tickers[start:start + BLOCK_SIZE])
+            stats[:, start:start + BLOCK_SIZE] = _relative(np.asarray(x), np.asarray(m), b, bm, risk_free_rate, self.min_periods)
+        return pd.DataFrame(stats.T, index=pd.Index(tickers, name="ticker"), columns=BENCHMARK_COLUMNS)
+
+    def rank(self, benchmark: pd.Series, by: str = "tracking_error", n: int | None = 10, ascending: bool = True,
+             exclude: Iterable[str] = (), risk_free_rate: float = 0.0) -> pd.DataFrame:
+        """The *n* funds with the lowest (``ascending``) *by* against *benchmark*, e.g. the closest trackers of a portfolio."""
+        table = self.against(benchmark, risk_free_rate=risk_free_rate).drop(index=list(exclude), errors="ignore")
+        table = table.dropna(subset=[by]).sort_values(by, ascending=ascending)
+        return table if n is None else table.head(n)
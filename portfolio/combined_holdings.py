@@ -1,56 +1,73 @@
 import pandas as pd
 import numpy as np
+from .lookthrough import LookThroughEngine
 
-def calculate_portfolio_weights(portfolio: pd.DataFrame, detailed_fund_data: dict) -> dict:
-    total = None
-    if "shares" in portfolio.columns:
-        abs_value_dict = {
-            ticker: detailed_fund_data[ticker]["historical"].iloc[0]["NAV"] * detailed_fund_data[ticker]["historical"].iloc[0]["fx_rate"] *
-            portfolio.loc[portfolio["ticker"] == ticker, "shares"].values[0]
-            for ticker in portfolio["ticker"]
-        }
-        total = sum(abs_value_dict.values())
-        relative_value_dict = { ticker: abs_value_dict[ticker]/total for ticker in abs_value_dict.keys() }
+PRICE_INDEX_COLUMNS = ["NAV", "fx_rate", "as_of"]
+
+def build_latest_price_index(detailed_fund_data: dict, tickers=None) -> pd.DataFrame:
+    """
+    Latest NAV, fx rate and as-of date for each fund, indexed by ticker.
+
+    Args:
+        detailed_fund_data (dict): Dictionary containing detailed fund data with keys as fund tickers.
+        tickers (iterable, optional): Only index these tickers. Defaults to all funds.
+
+    Returns:
+        pd.DataFrame: One row per fund with a usable NAV history.
+    """
+    rows = {}
+    for ticker in (detailed_fund_data.keys() if tickers is None else tickers):
+        data = detailed_fund_data.get(ticker)
+        hist = data.get("historical") if data is not None else None
+        if hist is None or hist.empty or "NAV" not in hist.columns:
+            continue
+        latest_pos = int(np.argmax(hist.index)) if isinstance(hist.index, pd.DatetimeIndex) else 0
+        latest = hist.iloc[latest_pos]
+        fx_rate = latest["fx_rate"] if "fx_rate" in hist.columns and pd.notna(latest["fx_rate"]) else 1.0
+        rows[ticker] = (latest["NAV"], fx_rate, hist.index[latest_pos])
+    return pd.DataFrame.from_dict(rows, orient="index", columns=PRICE_INDEX_COLUMNS)
 
-    else:
-        relative_value_dict = dict()
-        for row in portfolio.index:
-            relative_value_dict[portfolio.iloc[row]["ticker"]] = portfolio.iloc[row]["weight"]/100
+def calculate_position_amounts(portfolio: pd.DataFrame, detailed_fund_data: dict,
+                               price_index: pd.DataFrame | None = None, dropna: bool = False) -> pd.Series:
+    """
+    Amount held per ticker: market value in portfolio currency for share-based portfolios,
+    weight as a fraction otherwise. Duplicate lines of the same ticker are added up.
+    """
+    if "shares" in portfolio.columns:
+        shares = portfolio.groupby("ticker", sort=False)["shares"].sum()
+        if price_index is None:
+            price_index = build_latest_price_index(detailed_fund_data, shares.index)
+        prices = price_index.reindex(shares.index)
+        amounts = shares * prices["NAV"] * prices["fx_rate"]
+        if not dropna and amounts.isna().any():
+            raise KeyError(f"No latest NAV for {amounts.index[amounts.isna()].tolist()}")
+        return amounts.dropna()
+    return portfolio.groupby("ticker", sort=False)["weight"].sum() / 100
 
-    return relative_value_dict, total
+def calculate_portfolio_weights(portfolio: pd.DataFrame, detailed_fund_data: dict,
+                                price_index: pd.DataFrame | None = None) -> tuple[dict, float | None]:
+    amounts = calculate_position_amounts(portfolio, detailed_fund_data, price_index)
+    if "shares" in portfolio.columns:
+        total = amounts.sum()
+        return (amounts / total).to_dict(), total
+    return amounts.to_dict(), None
 
-def calculate_combined_holdings(portfolio: pd.DataFrame, detailed_fund_data: dict) -> pd.DataFrame:
+def calculate_combined_holdings(portfolio: pd.DataFrame, detailed_fund_data: dict,
+                                engine: LookThroughEngine | None = None, top_n: int | None = None) -> pd.DataFrame:
     """
     Calculate combined holdings for a portfolio based on detailed fund data.
     
     Args:
         portfolio (pd.DataFrame): DataFrame containing the portfolio holdings.
         detailed_fund_data (dict): Dictionary containing detailed fund data with keys as fund tickers.
+        engine (LookThroughEngine, optional): Prebuilt look-through engine for *detailed_fund_data*.
+            Built on the fly if not given.
+        top_n (int, optional): Only return the *top_n* largest holdings.
         
     Returns:
         pd.DataFrame: DataFrame with combined holdings.
     """
-    combined_holdings = pd.DataFrame()
+    if engine is None:
+        engine = LookThroughEngine(detailed_fund_data)
     weights, _ = calculate_portfolio_weights(portfolio, detailed_fund_data)
-    for ticker in detailed_fund_data.keys():
-        try:
-            ticker_data = detailed_fund_data[ticker]["holdings"][["Issuer Ticker", "Name", "Sector", "Weight (%)"]]
-            ticker_data.rename(columns={"Weight (%)": "Weight"}, inplace=True)
-            ticker_data["Weight"] *= weights[ticker]
-            combined_holdings = pd.concat( [
-                combined_holdings,
-                ticker_data
-                ], ignore_index=True)
-            
-        except KeyError as e:
-
-            print(f"KeyError for ticker {ticker}: {e}")
-            continue
-
-    combined_holdings = combined_holdings.groupby(
-        ["Issuer Ticker", "Sector"], as_index=False).agg({"Weight": "sum", "Name": "first"})
-    
-    result_df = combined_holdings.sort_values(
-        by=["Weight"], ascending=False, inplace=False)
-    return result_df
-    
\ No newline at end of file
+    return engine.combined_holdings(weights, top_n=top_n)
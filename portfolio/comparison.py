@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import pandas as pd
+import numpy as np
+from .combined_holdings import calculate_portfolio_weights
+from .backtester import statistics_windows, period_risk_free_rate
+from .risk import TRADING_DAYS, risk_statistics, weighted_returns
+
+RANKING_COLUMNS = ["return", "annual_return", "std_dev", "sharpe", "sortino", "calmar", "max_drawdown", "cvar_hist"]
+
+
+def portfolio_weight_matrix(portfolios: dict[str, pd.DataFrame], detailed_fund_data, panel,
+                            price_index: pd.DataFrame | None = None) -> tuple[pd.DataFrame, dict[str, str]]:
+    """
+    ``portfolios x funds`` start weights of the funds with returns in *panel*, computed
+    like :func:`prepare_backtest_inputs`, and the reason for every portfolio left out.
+    """
+    weights, skipped = {}, {}
+    for name, portfolio in portfolios.items():
+        valid_portfolio_df = portfolio[portfolio["ticker"].map(lambda ticker: ticker in panel)]
+        if valid_portfolio_df.empty:
+            skipped[name] = "No currency-adjusted return data available for funds in the portfolio."
+            continue
+        try:
+            weights_dict, _ = calculate_portfolio_weights(valid_portfolio_df, detailed_fund_data, price_index)
+        except Exception as e:
+            skipped[name] = str(e)
+            continue
+        weights[name] = pd.Series(weights_dict, dtype=float)
+    matrix = pd.DataFrame(weights).T.fillna(0.0) if weights else pd.DataFrame(dtype=float)
+    matrix.index.name = "portfolio"
+    return matrix, skipped
+
+
+class PortfolioComparison:
+    """
+    Backtests many portfolios against one returns matrix.
+
+    The returns of every fund held by any of the portfolios are selected from the
+    returns panel once, so all portfolios are compared over the same dates: the
+    history common to all their funds. Each portfolio becomes one row of a
+    ``portfolios x funds`` weight matrix, and all of them are rebalanced in a single
+    pass over the days. Portfolios without any return data are listed in ``skipped``.
+    """
+    def __init__(self, portfolios: dict[str, pd.DataFrame], detailed_fund_data, panel, rebalancing_period: str,
+                 price_index: pd.DataFrame | None = None, risk_free_rate: float = 0.0):
+        self.rebalancing_period = rebalancing_period
+        self.risk_free_rate = risk_free_rate
+        self.weights, self.skipped = portfolio_weight_matrix(portfolios, detailed_fund_data, panel, price_index)
+        if self.weights.empty:
+            raise ValueError("None of the portfolios has return data to compare.")
+        self.asset_returns = panel.select(self.weights.columns)
+        self.weights = self.weights[self.asset_returns.columns]
+        self.returns = weighted_returns(self.asset_returns, self.weights, rebalancing_period)
+        self._risk: pd.DataFrame | None = None
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def cumulative_performance(self) -> pd.DataFrame:
+        return (1 + self.returns).cumprod()
+
+    def periods(self) -> list[str]:
+        return list(statistics_windows(self.returns.index))
+
+    def risk_statistics(self) -> pd.DataFrame:
+        """:func:`risk_statistics` of every portfolio, indexed by (portfolio, period)."""
+        if self._risk is None:
+            self._risk = risk_statistics(self.returns, self.risk_free_rate)
+        return self._risk
+
+    def ranking(self, period: str | None = None, sort_by: str = "sharpe", ascending: bool = False) -> pd.DataFrame:
+        """
+        ``RANKING_COLUMNS`` of every portfolio over *period* (one of :meth:`periods`,
+        default the whole common history), best first, with a ``rank`` column.
+        Return, volatility and the Sharpe ratio follow :meth:`PortfolioBacktester.calculate_period_stats`.
+        """
+        windows = statistics_windows(self.returns.index)
+        period = period or list(windows)[-1]
+        start_row = windows[period]
+        window = self.returns.iloc[start_row:] if start_row is not None else self.returns.iloc[:0]
+        values = window.to_numpy(dtype=float)
+        n_days = len(values)
+
+        table = pd.DataFrame(index=self.returns.columns, columns=RANKING_COLUMNS, dtype=float)
+        if n_days >= 2:
+            total_return = np.prod(1 + values, axis=0) - 1
+            num_years = n_days / TRADING_DAYS
+            annual_return = (1 + total_return) ** (1 / num_years) - 1 if num_years > 1 else total_return
+            std_dev = values.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+            adj_rf = period_risk_free_rate(self.risk_free_rate, n_days)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sharpe = np.where(std_dev > 0, (annual_return - adj_rf) / std_dev, np.nan)
+            risk = self.risk_statistics().xs(period, level="period")
+            table["return"], table["annual_return"], table["std_dev"], table["sharpe"] = total_return, annual_return, std_dev, sharpe
+            for col in ("sortino", "calmar", "max_drawdown", "cvar_hist"):
+                table[col] = risk[col].reindex(table.index).to_numpy()
+
+        table = table.sort_values(sort_by, ascending=ascending, na_position="last")
+        table.insert(0, "rank", np.arange(1, len(table) + 1))
+        return table
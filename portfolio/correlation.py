@@ -0,0 +1,205 @@
+from __future__ import annotations
+import json
+import time
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+import numpy as np
+from .returns_panel import ReturnsPanel, new_generation, publish_generation
+
+BLOCK_SIZE = 512          # funds per tile; a tile pair holds 2 x dates x BLOCK_SIZE values in memory
+MIN_PERIODS = 20          # fewer common days than this leaves the pair's correlation undefined
+STAT_NAMES = ("n", "sx", "sxx", "sxy")
+RESULT_NAMES = ("corr", "cov")
+_FILES = tuple(f"{name}.npy" for name in STAT_NAMES + RESULT_NAMES)
+
+
+class CorrelationEngine:
+    """
+    Pairwise correlation and covariance of every fund in a returns panel.
+
+    Missing data is handled pairwise: for funds *i* and *j* only the days both report
+    count. The engine keeps the sufficient statistics of every pair on disk,
+
+        n[i, j]    days both report            sx[i, j]   sum of r_i over those days
+        sxx[i, j]  sum of r_i ** 2 over them   sxy[i, j]  sum of r_i * r_j
+
+    and, because they are plain sums, new days are added to the stored values instead
+    of recomputing the history. Funds that are new to the panel or whose history was
+    restated are recomputed in full. Everything is done in tiles of ``BLOCK_SIZE``
+    funds, written straight to memory-mapped ``.npy`` files, so memory stays bounded
+    for thousands of funds. Correlation and (daily) covariance are materialised as
+    well, so a query is a single row read. Like the panel, every update is written to
+    a new generation directory, so an engine opened earlier keeps reading its own
+    files.
+    """
+    def __init__(self, directory: Path, min_periods: int = MIN_PERIODS):
+        self.directory = Path(directory)
+        self.min_periods = min_periods
+        self.tickers: list[str] = []
+        self.last_date: pd.Timestamp | None = None
+        self.generation = ""
+        self._index: dict[str, int] = {}
+        self._arrays: dict[str, np.ndarray] = {}
+        self._load()
+
+    @classmethod
+    def for_panel(cls, panel: ReturnsPanel, min_periods: int = MIN_PERIODS) -> "CorrelationEngine":
+        return cls(panel.directory / "correlation", min_periods)
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self._index
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def _load(self) -> None:
+        meta_p = self.directory / "meta.json"
+        if not meta_p.exists():
+            return
+        meta = json.loads(meta_p.read_text())
+        self.tickers = meta["tickers"]
+        self.last_date = pd.Timestamp(meta["last_date"]) if meta["last_date"] else None
+        self.min_periods = meta.get("min_periods", self.min_periods)
+        self.generation = meta.get("generation", "")
+        files = self.directory / self.generation
+        self._index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._arrays = {name: np.load(files / f"{name}.npy", mmap_mode="r") for name in STAT_NAMES + RESULT_NAMES}
+
+    # ------------------------------------------------------------------ #
+    # building
+    # ------------------------------------------------------------------ #
+
+    def _unchanged(self, panel: ReturnsPanel, candidates: list[str], end_row: int) -> list[str]:
+        """Funds whose panel columns up to *end_row* still add up to the stored diagonal."""
+        if not candidates or not end_row:
+            return []
+        old = np.array([self._index[t] for t in candidates], dtype=np.intp)
+        x, m = panel.columns(candidates, stop=end_row)
+        same = (np.isclose(m.sum(axis=0), self._arrays["n"][old, old])
+                & np.isclose(x.sum(axis=0), self._arrays["sx"][old, old], rtol=1e-9, atol=1e-12)
+                & np.isclose((x * x).sum(axis=0), self._arrays["sxx"][old, old], rtol=1e-9, atol=1e-12))
+        return [t for t, ok in zip(candidates, same) if ok]
+
+    def update(self, panel: ReturnsPanel) -> bool:
+        """
+        Brings the statistics in line with *panel* (which should be synced first).
+        Returns True if anything was recomputed; this engine then reads the new
+        generation.
+        """
+        new_start = int(panel.dates.searchsorted(self.last_date, side="right")) if self.last_date is not None else 0
+        kept = self._unchanged(panel, [t for t in self.tickers if t in panel], new_start) if self.last_date is not None else []
+        kept_set = set(kept)
+        dirty = [t for t in panel.tickers if t not in kept_set]
+        if not dirty and len(kept) == len(self.tickers) and new_start == len(panel.dates):
+            return False
+
+        tickers = kept + dirty
+        n, n_kept = len(tickers), len(kept)
+        old_pos = np.array([self._index[t] for t in kept], dtype=np.intp)
+
+        build = new_generation(self.directory)
+        out = {name: np.lib.format.open_memmap(build / f"{name}.npy", mode="w+", dtype=np.float64, shape=(n, n))
+               for name in STAT_NAMES}
+        out.update({name: np.lib.format.open_memmap(build / f"{name}.npy", mode="w+", dtype=np.float32, shape=(n, n))
+                    for name in RESULT_NAMES})
+
+        # tiles never straddle the kept/dirty boundary, so a tile is either extended by the new days or computed in full
+        blocks = [slice(s, min(s + BLOCK_SIZE, n_kept)) for s in range(0, n_kept, BLOCK_SIZE)]
+        blocks += [slice(s, min(s + BLOCK_SIZE, n)) for s in range(n_kept, n, BLOCK_SIZE)]
+
+        def load(block: slice, start: int) -> tuple[np.ndarray, np.ndarray]:
+            x, m = panel.columns(tickers[block], start)
+            return np.asarray(x), np.asarray(m, dtype=np.float64)
+
+        for bi, a in enumerate(blocks):
+            a_kept = a.start < n_kept
+            cache: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+            for b in blocks[bi:]:
+                extend = a_kept and b.start < n_kept
+                start = new_start if extend else 0
+                if start not in cache:
+                    cache[start] = load(a, start)
+                xa, ma = cache[start]
+                xb, mb = (xa, ma) if b == a else load(b, start)
+                # every term is oriented a x b; "_ba" sums the b fund's returns over the pair's days
+                tile = {
+                    "n": ma.T @ mb,
+                    "sx_ab": xa.T @ mb, "sx_ba": ma.T @ xb,
+                    "sxx_ab": (xa * xa).T @ mb, "sxx_ba": ma.T @ (xb * xb),
+                    "sxy": xa.T @ xb,
+                }
+                if extend:
+                    # extend the stored sums of two kept blocks by the new days
+                    oa, ob = old_pos[a], old_pos[b]
+                    old = {name: np.asarray(self._arrays[name][np.ix_(oa, ob)]) for name in STAT_NAMES}
+                    old_t = {name: np.asarray(self._arrays[name][np.ix_(ob, oa)]).T for name in ("sx", "sxx")}
+                    tile["n"] += old["n"]; tile["sxy"] += old["sxy"]
+                    tile["sx_ab"] += old["sx"]; tile["sx_ba"] += old_t["sx"]
+                    tile["sxx_ab"] += old["sxx"]; tile["sxx_ba"] += old_t["sxx"]
+                self._write_tile(out, a, b, tile)
+            del cache
+
+        for array in out.values():
+            array.flush()
+        del out
+        last_date = panel.dates[-1] if len(panel.dates) else None
+        meta = {"tickers": tickers, "last_date": str(last_date) if last_date is not None else None,
+                "min_periods": self.min_periods, "panel_version": panel.version,
+                "built_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        # the generation this engine reads stays for whoever still holds it
+        publish_generation(self.directory, build, meta, keep=[self.generation], legacy_files=_FILES)
+        self._arrays = {}
+        self._load()
+        return True
+
+    def _write_tile(self, out: dict, a: slice, b: slice, tile: dict) -> None:
+        n, sxy = tile["n"], tile["sxy"]
+        sx_ab, sx_ba, sxx_ab, sxx_ba = tile["sx_ab"], tile["sx_ba"], tile["sxx_ab"], tile["sxx_ba"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            co = sxy - sx_ab * sx_ba / n
+            var_a = sxx_ab - sx_ab * sx_ab / n
+            var_b = sxx_ba - sx_ba * sx_ba / n
+            cov = co / (n - 1)
+            corr = np.clip(co / np.sqrt(var_a * var_b), -1.0, 1.0)
+        undefined = n < max(self.min_periods, 2)
+        cov[undefined], corr[undefined] = np.nan, np.nan
+
+        for name, value_ab, value_ba in (("n", n, n.T), ("sx", sx_ab, sx_ba.T), ("sxx", sxx_ab, sxx_ba.T),
+                                         ("sxy", sxy, sxy.T), ("cov", cov, cov.T), ("corr", corr, corr.T)):
+            out[name][a, b] = value_ab
+            out[name][b, a] = value_ba
+
+    # ------------------------------------------------------------------ #
+    # queries
+    # ------------------------------------------------------------------ #
+
+    def _row(self, name: str, ticker: str) -> pd.Series:
+        if ticker not in self._index:
+            raise KeyError(f"{ticker} is not in the correlation matrix")
+        row = pd.Series(np.asarray(self._arrays[name][self._index[ticker]], dtype=float), index=self.tickers)
+        return row.drop(index=ticker).dropna()
+
+    def correlation(self, a: str, b: str) -> float:
+        return float(self._arrays["corr"][self._index[a], self._index[b]])
+
+    def covariance(self, a: str, b: str) -> float:
+        return float(self._arrays["cov"][self._index[a], self._index[b]])
+
+    def common_days(self, a: str, b: str) -> int:
+        return int(self._arrays["n"][self._index[a], self._index[b]])
+
+    def most_correlated(self, ticker: str, n: int = 10) -> pd.Series:
+        """The *n* funds with the highest correlation to *ticker*."""
+        return self._row("corr", ticker).nlargest(n)
+
+    def least_correlated(self, ticker: str, n: int = 10) -> pd.Series:
+        """The *n* funds with the lowest correlation to *ticker* (the best diversifiers)."""
+        return self._row("corr", ticker).nsmallest(n)
+
+    def matrix(self, tickers: Iterable[str], kind: str = "corr") -> pd.DataFrame:
+        """The correlation (``kind="corr"``) or covariance (``"cov"``) matrix of *tickers*."""
+        tickers = [t for t in dict.fromkeys(tickers) if t in self._index]
+        pos = np.array([self._index[t] for t in tickers], dtype=np.intp)
+        return pd.DataFrame(np.asarray(self._arrays[kind][np.ix_(pos, pos)], dtype=float), index=tickers, columns=tickers)
@@ -1,9 +1,9 @@
-import yfinance as yf
+from __future__ import annotations
 from datetime import timedelta
 import pandas as pd
 import numpy as np
 
-def fetch_currency_data(fund_currency: str, portfolio_currency: str, start_date: str, end_date: str) -> yf.Ticker:
+def fetch_currency_data(fund_currency: str, portfolio_currency: str, start_date: str, end_date: str) -> pd.DataFrame:
     """
     Fetch currency data for the specified fund and portfolio currencies.
 
@@ -14,12 +14,13 @@ def fetch_currency_data(fund_currency: str, portfolio_currency: str, start_date:
         end_date (str): The end date for fetching data.
 
     Returns:
-        yf.Ticker: A yfinance Ticker object containing the currency data.
+        pd.DataFrame: The daily ``fx_rate`` of the currency pair, indexed by date.
     """
     if fund_currency == portfolio_currency:
         date_range = pd.date_range(start=start_date, end=end_date, freq="D").tz_localize(None)
         return pd.DataFrame(np.zeros(len(date_range))+1, index=date_range, columns=["fx_rate"])
 
+    import yfinance as yf
     ticker_symbol = f"{fund_currency}{portfolio_currency}=X"
     ticker = yf.Ticker(ticker_symbol)
     ticker_data = ticker.history(start=start_date-timedelta(days=1), end=end_date+timedelta(days=1), interval="1d")
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of *n_out* points that preserve the visual
+    shape of the line (x, y). x must be sorted; first and last points are always kept.
+
+    Each bucket keeps the point spanning the largest triangle with the previously
+    kept point and the mean of the next bucket, so peaks and drawdowns survive.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    # bucket i covers [bounds[i], bounds[i + 1]); the extra n closes the last "next" bucket (the final point)
+    bounds = np.append((np.arange(n_out - 1) * every).astype(np.int64) + 1, n)
+    cum_x = np.concatenate(([0.0], np.cumsum(x, dtype=float)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y, dtype=float)))
+    next_lo, next_hi = bounds[1:], bounds[2:]
+    next_lo = next_lo[:len(next_hi)]
+    mean_x = (cum_x[next_hi] - cum_x[next_lo]) / (next_hi - next_lo)
+    mean_y = (cum_y[next_hi] - cum_y[next_lo]) / (next_hi - next_lo)
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    kept = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        ax, ay = x[kept], y[kept]
+        area = np.abs((ax - mean_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (mean_y[i] - ay))
+        kept = lo + int(np.argmax(area))
+        out[i + 1] = kept
+    return out
+
+
+def visible_slice(x: np.ndarray, x_min: float, x_max: float) -> slice:
+    """Index range covering [x_min, x_max] plus one point either side, so lines reach the edges."""
+    lo = max(int(np.searchsorted(x, x_min, side="left")) - 1, 0)
+    hi = min(int(np.searchsorted(x, x_max, side="right")) + 1, len(x))
+    return slice(lo, hi)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, n_out: int, x_range: tuple[float, float] | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The points of (x, y) to draw at a resolution of *n_out* points, restricted to
+    *x_range*. Only the visible slice is looked at, so zooming in on a long history
+    brings back the detail LTTB dropped at full extent.
+    """
+    if x_range is not None:
+        window = visible_slice(x, *x_range)
+        x, y = x[window], y[window]
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    keep = lttb_indices(x, y, n_out)
+    return x[keep], y[keep]
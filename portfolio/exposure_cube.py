@@ -0,0 +1,92 @@
+import pandas as pd
+import numpy as np
+from .lookthrough import LookThroughEngine
+from .security_master import ATTRIBUTE_COLUMNS
+
+CUBE_DIMENSIONS = tuple(ATTRIBUTE_COLUMNS)
+UNCLASSIFIED = "Unclassified"
+
+
+class ExposureCube:
+    """
+    Look-through exposure aggregated by sector x country x currency x asset class.
+
+    The fund x cell matrix is built once per data refresh from the look-through
+    engine, so the portfolio cube for the current positions is one sparse product
+    and every breakdown or drill-down afterwards is a slice-and-sum over a small
+    dense array instead of a scan over raw holdings.
+    """
+    def __init__(self, engine: LookThroughEngine):
+        self.engine = engine
+        self.labels: dict[str, list[str]] = {}
+        codes = []
+        for dim in CUBE_DIMENSIONS:
+            column = engine.securities.get(ATTRIBUTE_COLUMNS[dim])
+            values = column.astype(object).where(column.notna(), UNCLASSIFIED) if column is not None \
+                else pd.Series(UNCLASSIFIED, index=engine.securities.index, dtype=object)
+            dim_codes, dim_labels = pd.factorize(values)
+            codes.append(dim_codes)
+            self.labels[dim] = [str(label) for label in dim_labels]
+        self.shape = tuple(max(len(self.labels[dim]), 1) for dim in CUBE_DIMENSIONS)
+        # security -> cube cell, and each fund's exposure per cell
+        self.security_codes = np.vstack(codes) if codes and len(codes[0]) else np.zeros((len(CUBE_DIMENSIONS), 0), dtype=np.intp)
+        self.security_cells = np.ravel_multi_index(self.security_codes, self.shape) if engine.n_securities else np.zeros(0, dtype=np.intp)
+        from scipy import sparse
+        cell_map = sparse.csr_matrix(
+            (np.ones(engine.n_securities), (np.arange(engine.n_securities), self.security_cells)),
+            shape=(engine.n_securities, int(np.prod(self.shape))),
+        )
+        self.fund_cells = (engine.matrix @ cell_map).tocsr()
+
+    def portfolio_cube(self, normalize: bool = False) -> np.ndarray:
+        """Dense cube (in %) for the engine's current positions."""
+        positions = self.engine.positions
+        if normalize:
+            total = positions.sum()
+            positions = positions / total if total else np.zeros_like(positions)
+        return np.asarray(self.fund_cells.T @ positions).reshape(self.shape)
+
+    def _dim_indices(self, dim: str, filters: dict | None) -> np.ndarray:
+        wanted = (filters or {}).get(dim)
+        if wanted is None:
+            return np.arange(len(self.labels[dim]))
+        wanted = {wanted} if isinstance(wanted, str) else set(wanted)
+        return np.array([code for code, label in enumerate(self.labels[dim]) if label in wanted], dtype=np.intp)
+
+    def exposure(self, by: str | tuple[str, ...] = "sector", filters: dict | None = None,
+                 cube: np.ndarray | None = None, normalize: bool = False) -> pd.Series:
+        """
+        Portfolio exposure grouped by one or more dimensions, restricted to *filters*
+        ({dimension: label or list of labels}). Pass a precomputed *cube* to reuse it across views.
+        """
+        by = (by,) if isinstance(by, str) else tuple(by)
+        if self.engine.n_securities == 0:
+            return pd.Series(dtype=float, name="Weight")
+        if cube is None:
+            cube = self.portfolio_cube(normalize=normalize)
+        indices = [self._dim_indices(dim, filters) for dim in CUBE_DIMENSIONS]
+        kept = [i for i, dim in enumerate(CUBE_DIMENSIONS) if dim in by]
+        summed = cube[np.ix_(*indices)].sum(axis=tuple(i for i in range(len(CUBE_DIMENSIONS)) if i not in kept))
+        index = pd.MultiIndex.from_product(
+            [np.asarray(self.labels[CUBE_DIMENSIONS[i]], dtype=object)[indices[i]] for i in kept],
+            names=[CUBE_DIMENSIONS[i] for i in kept],
+        )
+        result = pd.Series(summed.ravel(), index=index, name="Weight")
+        if len(by) == 1:
+            result.index = result.index.get_level_values(0)
+        else:
+            result = result.reorder_levels(list(by))
+        result = result[result != 0]
+        return result.sort_values(ascending=False)
+
+    def securities(self, filters: dict | None = None, top_n: int | None = None, normalize: bool = False) -> pd.DataFrame:
+        """Drill-down to the individual securities of one cube slice."""
+        mask = np.ones(self.engine.n_securities, dtype=bool)
+        for i, dim in enumerate(CUBE_DIMENSIONS):
+            if (filters or {}).get(dim) is not None:
+                mask &= np.isin(self.security_codes[i], self._dim_indices(dim, filters))
+        exposure = self.engine.live_exposure
+        if normalize:
+            total = self.engine.positions.sum()
+            exposure = exposure / total if total else np.zeros_like(exposure)
+        return self.engine.holdings_frame(np.where(mask, exposure, 0.0), top_n)
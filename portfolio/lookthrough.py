@@ -0,0 +1,207 @@
+import pandas as pd
+import numpy as np
+from .security_master import SecurityMaster
+
+HOLDING_KEY_COLUMNS = ["Issuer Ticker", "Sector"]
+HOLDING_WEIGHT_COLUMN = "Weight (%)"
+
+
+class LookThroughEngine:
+    """
+    Sparse fund x security weight matrix used to look through a portfolio of ETFs.
+
+    Securities are encoded as integer ids once when the engine is built, so
+    combined exposure for any set of fund weights is a single sparse
+    matrix-vector product instead of a concat + string-keyed groupby. With a
+    :class:`SecurityMaster` the ids are the master's canonical ids, so the same
+    company held by different funds lands in one column. :meth:`add_funds` encodes
+    further funds later, so the engine can follow a portfolio instead of covering
+    every stored fund up front.
+    """
+    def __init__(self, detailed_fund_data: dict, positions: dict | None = None, master: SecurityMaster | None = None):
+        self.master = master
+        self.fund_tickers: list[str] = []
+        self.fund_index: dict[str, int] = {}
+        self.security_ids = np.empty(0, dtype=np.int64)
+        self.securities: pd.DataFrame = pd.DataFrame(columns=HOLDING_KEY_COLUMNS + ["Name"])
+        self._without_holdings: set[str] = set()
+        self._build(self._fund_frames(detailed_fund_data))
+        # live state: position amount per fund row and the aggregated exposure it produces
+        self.positions = np.zeros(len(self.fund_tickers))
+        self.live_exposure = np.zeros(self.n_securities)
+        if positions:
+            self.reset_positions(positions)
+
+    def _fund_frame(self, ticker: str, holdings: pd.DataFrame) -> pd.DataFrame | None:
+        try:
+            if "security_id" in holdings.columns:
+                if self.master is None:
+                    raise KeyError("encoded holdings need a security master")
+                return holdings[["security_id", HOLDING_WEIGHT_COLUMN]]
+            if self.master is not None:
+                return pd.DataFrame({"security_id": self.master.resolve_frame(holdings),
+                                     HOLDING_WEIGHT_COLUMN: holdings[HOLDING_WEIGHT_COLUMN]})
+            return holdings[HOLDING_KEY_COLUMNS + ["Name", HOLDING_WEIGHT_COLUMN]]
+        except KeyError as e:
+            print(f"KeyError for ticker {ticker}: {e}")
+            return None
+
+    def _fund_frames(self, detailed_fund_data: dict) -> dict[str, pd.DataFrame]:
+        frames = {}
+        for ticker, data in detailed_fund_data.items():
+            holdings = data.get("holdings")
+            frame = self._fund_frame(ticker, holdings) if holdings is not None and not holdings.empty else None
+            if frame is None:
+                self._without_holdings.add(ticker)
+                continue
+            frames[ticker] = frame
+        return frames
+
+    def _stored_frames(self) -> dict[str, pd.DataFrame]:
+        """The encoded rows of every fund, in the form :meth:`_fund_frame` returns."""
+        coo = self.matrix.tocoo()
+        frames = {}
+        for row, ticker in enumerate(self.fund_tickers):
+            cols, weights = coo.col[coo.row == row], coo.data[coo.row == row]
+            if self.master is not None:
+                frames[ticker] = pd.DataFrame({"security_id": self.security_ids[cols], HOLDING_WEIGHT_COLUMN: weights})
+            else:
+                frame = self.securities.iloc[cols][HOLDING_KEY_COLUMNS + ["Name"]].reset_index(drop=True)
+                frames[ticker] = frame.assign(**{HOLDING_WEIGHT_COLUMN: weights})
+        return frames
+
+    def _build(self, fund_frames: dict[str, pd.DataFrame]):
+        from scipy import sparse    # deferred: only needed once detailed data is loaded
+        self.matrix = sparse.csr_matrix((0, 0))
+        self.fund_tickers, self.fund_index = [], {}
+        frames, fund_ids = [], []
+        for ticker, frame in fund_frames.items():
+            self.fund_index[ticker] = len(self.fund_tickers)
+            self.fund_tickers.append(ticker)
+            frames.append(frame)
+            fund_ids.append(np.full(len(frame), self.fund_index[ticker], dtype=np.int32))
+
+        if not frames:
+            return
+
+        # one concat for all funds, rows without a key are dropped like the groupby used to
+        all_rows = pd.concat(frames, ignore_index=True)
+        fund_idx = np.concatenate(fund_ids)
+        if self.master is not None:
+            valid = (all_rows["security_id"] >= 0).to_numpy()
+        else:
+            valid = all_rows[HOLDING_KEY_COLUMNS].notna().all(axis=1).to_numpy()
+        all_rows, fund_idx = all_rows[valid], fund_idx[valid]
+        weights = pd.to_numeric(all_rows[HOLDING_WEIGHT_COLUMN], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+        if self.master is not None:
+            self.security_ids, security_idx = np.unique(all_rows["security_id"].to_numpy(), return_inverse=True)
+            self.securities = self.master.security_frame(self.security_ids)
+        else:
+            keys = pd.MultiIndex.from_frame(all_rows[HOLDING_KEY_COLUMNS])
+            security_idx, uniques = pd.factorize(keys)
+            self.security_ids = np.arange(len(uniques))
+            first_rows = pd.Series(np.arange(len(security_idx))).groupby(security_idx).first().to_numpy()
+            self.securities = pd.DataFrame(uniques.tolist(), columns=HOLDING_KEY_COLUMNS)
+            self.securities["Name"] = all_rows["Name"].to_numpy()[first_rows]
+
+        # coo -> csr sums duplicate (fund, security) entries
+        self.matrix = sparse.csr_matrix(
+            (weights, (fund_idx, security_idx)),
+            shape=(len(self.fund_tickers), len(self.security_ids)),
+        )
+
+    @property
+    def n_securities(self) -> int:
+        return self.matrix.shape[1]
+
+    def fund_weight_vector(self, weights: dict) -> np.ndarray:
+        """Dense vector of fund weights aligned with the matrix rows. Unknown tickers are ignored."""
+        vector = np.zeros(len(self.fund_tickers))
+        for ticker, weight in weights.items():
+            idx = self.fund_index.get(ticker)
+            if idx is not None:
+                vector[idx] = weight
+        return vector
+
+    def exposure(self, weights: dict) -> np.ndarray:
+        """Combined weight (in %) of every security for the given fund weights."""
+        if self.n_securities == 0:
+            return np.zeros(0)
+        return self.matrix.T @ self.fund_weight_vector(weights)
+
+    @staticmethod
+    def top_n_indices(values: np.ndarray, n: int | None) -> np.ndarray:
+        """Indices of the *n* largest values in descending order, using partial selection."""
+        if n is None or n >= len(values):
+            return np.argsort(-values, kind="stable")
+        if n <= 0:
+            return np.empty(0, dtype=np.intp)
+        top = np.argpartition(-values, n - 1)[:n]
+        return top[np.argsort(-values[top], kind="stable")]
+
+    def holdings_frame(self, exposure: np.ndarray, top_n: int | None = None) -> pd.DataFrame:
+        """Combined holdings as a DataFrame sorted by weight, optionally limited to the top *n*."""
+        # securities only held by funds outside the portfolio have no exposure
+        held = np.flatnonzero(exposure)
+        idx = held[self.top_n_indices(exposure[held], top_n)]
+        result_df = self.securities.iloc[idx].copy()
+        result_df["Weight"] = exposure[idx]
+        result_df.index = idx
+        return result_df[HOLDING_KEY_COLUMNS + ["Weight", "Name"]]
+
+    def combined_holdings(self, weights: dict, top_n: int | None = None) -> pd.DataFrame:
+        return self.holdings_frame(self.exposure(weights), top_n)
+
+    # ------------------------------------------------------------------ #
+    # incremental updates
+    # ------------------------------------------------------------------ #
+
+    def add_funds(self, detailed_fund_data: dict) -> list[str]:
+        """
+        Encodes the funds of *detailed_fund_data* that the engine does not know yet,
+        keeping the current positions. Only their holdings are read; the encoded rows
+        of the other funds are reused. Returns the funds added.
+        """
+        fresh = {ticker: data for ticker, data in detailed_fund_data.items()
+                 if ticker not in self.fund_index and ticker not in self._without_holdings}
+        frames = self._fund_frames(fresh)
+        if not frames:
+            return []
+        positions = dict(zip(self.fund_tickers, self.positions))
+        self._build({**self._stored_frames(), **frames})
+        self.reset_positions(positions)
+        return list(frames)
+
+    def reset_positions(self, positions: dict):
+        """Replaces all positions. *positions* maps ticker -> amount (weight fraction or value)."""
+        self.positions = self.fund_weight_vector(positions)
+        self.live_exposure = self.matrix.T @ self.positions if self.n_securities else np.zeros(0)
+
+    def set_position(self, ticker: str, amount: float) -> bool:
+        """
+        Sets the amount held in one fund and applies the difference to the live exposure.
+        Only touches the holdings of that fund. Returns False if the fund has no holdings loaded.
+        """
+        idx = self.fund_index.get(ticker)
+        if idx is None:
+            return False
+        delta = amount - self.positions[idx]
+        if delta != 0:
+            start, end = self.matrix.indptr[idx], self.matrix.indptr[idx + 1]
+            self.live_exposure[self.matrix.indices[start:end]] += delta * self.matrix.data[start:end]
+            self.positions[idx] = amount
+        return True
+
+    def live_holdings(self, top_n: int | None = None, normalize: bool = False) -> pd.DataFrame:
+        """
+        Combined holdings for the current positions. With *normalize* the positions are
+        treated as values and scaled to fractions of their total.
+        """
+        exposure = self.live_exposure
+        if normalize:
+            total = self.positions.sum()
+            exposure = exposure / total if total else np.zeros_like(exposure)
+        # drop float noise left behind by removed positions
+        exposure = np.where(np.abs(exposure) < 1e-12, 0.0, exposure)
+        return self.holdings_frame(exposure, top_n)
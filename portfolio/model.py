@@ -0,0 +1,157 @@
+from __future__ import annotations
+from typing import Callable, Iterable
+
+import pandas as pd
+
+# change kinds passed to listeners as (kind, ticker); ticker is None for "reset"
+ADDED, REMOVED, RESET = "added", "removed", "reset"
+
+REQUIRED_COLUMNS = ["name", "ticker", "currency", "hedging", "distribution", "link"]
+SAVED_COLUMNS = REQUIRED_COLUMNS + ["provider", "weight", "shares"]
+
+
+def _is_missing(value) -> bool:
+    return value is None or (pd.api.types.is_scalar(value) and pd.isna(value))
+
+
+def read_portfolio_csv(path) -> pd.DataFrame:
+    """
+    Reads a portfolio saved by the builder.
+
+    Raises:
+        ValueError: If a required column or both amount columns (weight/shares) are missing.
+    """
+    portfolio = pd.read_csv(path)
+    missing = [c for c in REQUIRED_COLUMNS if c not in portfolio.columns]
+    if missing or not ("weight" in portfolio.columns or "shares" in portfolio.columns):
+        raise ValueError(f"File missing: {', '.join(missing) if missing else 'weight/shares'}.")
+    return portfolio
+
+
+class PortfolioModel:
+    """
+    The positions of the portfolio being built, stored column by column.
+
+    Each column is a plain list, so adding a position appends one value per column
+    and removing one pops a single index. The DataFrame view that the analytics code
+    consumes is built once and cached until the next mutation. Listeners registered
+    with :meth:`subscribe` are called as ``listener(kind, ticker)`` after every change.
+
+    A column only exists once some position has a value for it, so ``"shares" in
+    model.columns`` tells a share-based portfolio from a weight-based one, just like
+    the concatenated frame did.
+    """
+    def __init__(self):
+        self._columns: dict[str, list] = {}
+        self._size = 0
+        self._frame: pd.DataFrame | None = None
+        self._listeners: list[Callable[[str, str | None], None]] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._columns)
+
+    @property
+    def is_share_based(self) -> bool:
+        return "shares" in self._columns
+
+    # ------------------------------------------------------------------ #
+    # change events
+    # ------------------------------------------------------------------ #
+
+    def subscribe(self, listener: Callable[[str, str | None], None]) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str, str | None], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _changed(self, kind: str, ticker: str | None) -> None:
+        self._frame = None
+        for listener in list(self._listeners):
+            listener(kind, ticker)
+
+    # ------------------------------------------------------------------ #
+    # mutation
+    # ------------------------------------------------------------------ #
+
+    def _append(self, record: dict) -> None:
+        for col, value in record.items():
+            if col not in self._columns:
+                if _is_missing(value):
+                    continue
+                self._columns[col] = [None] * self._size
+            self._columns[col].append(value)
+        self._size += 1
+        for values in self._columns.values():
+            if len(values) < self._size:
+                values.append(None)
+
+    def add(self, record: dict | pd.Series | pd.DataFrame) -> int:
+        """Appends one position (a dict, Series or one-row frame) and returns its index."""
+        if isinstance(record, pd.DataFrame):
+            record = record.iloc[0]
+        record = dict(record)
+        self._append(record)
+        self._changed(ADDED, record.get("ticker"))
+        return self._size - 1
+
+    def remove(self, index: int) -> dict:
+        """Removes the position at *index* and returns it."""
+        if not -self._size <= index < self._size:
+            raise IndexError(f"Portfolio position {index} out of range")
+        removed = {col: values.pop(index) for col, values in self._columns.items()}
+        self._size -= 1
+        # drop columns no remaining position has a value for, so e.g. removing the
+        # last share-based position turns the portfolio back into a weight-based one
+        if self._size == 0:
+            self._columns = {}
+        else:
+            self._columns = {col: values for col, values in self._columns.items()
+                             if not all(_is_missing(v) for v in values)}
+        self._changed(REMOVED, removed.get("ticker"))
+        return removed
+
+    def replace(self, records: pd.DataFrame | Iterable[dict]) -> None:
+        """Replaces all positions at once (e.g. when loading a file) with a single reset event."""
+        self._columns, self._size = {}, 0
+        if isinstance(records, pd.DataFrame):
+            records = records.dropna(axis=1, how="all").to_dict("records")
+        for record in records:
+            self._append(record)
+        self._changed(RESET, None)
+
+    def clear(self) -> None:
+        self.replace([])
+
+    # ------------------------------------------------------------------ #
+    # views
+    # ------------------------------------------------------------------ #
+
+    def column(self, name: str) -> list:
+        """Values of one column (None where a position has no value); do not mutate."""
+        return self._columns.get(name, [None] * self._size)
+
+    @property
+    def tickers(self) -> list:
+        return self.column("ticker")
+
+    def record(self, index: int) -> dict:
+        """One position as a dict, without the columns it has no value for."""
+        return {col: values[index] for col, values in self._columns.items() if not _is_missing(values[index])}
+
+    def records(self) -> list[dict]:
+        """Snapshot of all positions, safe to hand to a worker thread."""
+        return [self.record(i) for i in range(self._size)]
+
+    def frame(self) -> pd.DataFrame:
+        """Positions as a DataFrame. Cached until the next change, so treat it as read-only."""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self._columns, index=pd.RangeIndex(self._size))
+        return self._frame
@@ -1,4 +1,3 @@
-import scipy.optimize as opt
 import numpy as np
 import pandas as pd
 from .backtester import PortfolioBacktester
@@ -14,14 +13,17 @@ class PortfolioOptimizer:
 
         return -self.backtester.calculate_period_stats(returns)['sharpe']
 
-    def optimize_portfolio(self, bounds: list, constraints: list):
+    def optimize_portfolio(self, bounds: list, constraints: list, callback=None):
+        """*callback* is called with the current weights after each iteration; raising from it aborts the run."""
+        import scipy.optimize as opt
         initial_weights = self.backtester.portfolio_weights.to_numpy()
         result = opt.minimize(
             self.sharpe_objective_function,
             initial_weights,
             method='SLSQP',
             bounds=bounds,
-            constraints=constraints
+            constraints=constraints,
+            callback=callback
         )
 
         if result.success:
@@ -29,4 +31,11 @@ class PortfolioOptimizer:
             self.backtester.portfolio_weights = optimized_weights
             return optimized_weights
         else:
-            raise ValueError("Optimization failed: " + result.message)
\ No newline at end of file
+            raise ValueError("Optimization failed: " + result.message)
+
+    def maximize_sharpe(self, callback=None) -> pd.Series:
+        """Long-only, fully invested weights with the highest Sharpe ratio."""
+        n_assets = len(self.backtester.portfolio_weights)
+        bounds = [(0, 1) for _ in range(n_assets)]
+        constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1}]
+        return self.optimize_portfolio(bounds=bounds, constraints=constraints, callback=callback)
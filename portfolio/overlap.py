@@ -0,0 +1,162 @@
+from __future__ import annotations
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+import numpy as np
+from .lookthrough import LookThroughEngine
+
+OVERLAP_DIR_NAME = "overlap"
+
+
+def holdings_fingerprint(store) -> str:
+    """Changes whenever a fund's holdings are added, removed or re-downloaded."""
+    index = store.index
+    rows = index[index["holdings_rows"].fillna(0) > 0] if not index.empty else index
+    parts = [f"{ticker}|{info['updated_at']}|{info['holdings_rows']}" for ticker, info in rows.sort_index().iterrows()]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+class OverlapMatrix:
+    """
+    Weighted holdings overlap between every pair of funds in a look-through engine.
+
+    Each fund's long holdings are scaled to sum to one, so the overlap of two funds is
+    ``sum(min(w_a, w_b))`` over the securities both hold: 0 for disjoint funds, 1 for
+    identical ones. The pairs that share anything at all come from one sparse product
+    of the binary fund x security matrix with its transpose, which also gives the
+    number of shared holdings; the exact min-sum is then evaluated for those pairs
+    only. Both matrices are kept sparse, so queries are a row lookup.
+    """
+    def __init__(self, tickers: list[str], overlap, shared):
+        self.tickers = tickers
+        self.index = {ticker: i for i, ticker in enumerate(tickers)}
+        self.overlap = overlap    # csr, symmetric, diagonal 1 for funds with holdings
+        self.shared = shared      # csr, number of securities both funds hold
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self.index
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    # ------------------------------------------------------------------ #
+    # building
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def from_engine(cls, engine: LookThroughEngine) -> "OverlapMatrix":
+        from scipy import sparse
+        weights = engine.matrix.tocsr(copy=True)
+        weights.data = np.where(weights.data > 0, weights.data, 0.0)
+        weights.eliminate_zeros()
+        totals = np.asarray(weights.sum(axis=1)).ravel()
+        weights = sparse.diags(np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)) @ weights
+        weights = weights.tocsr()
+        weights.sort_indices()
+
+        held = weights.copy()
+        held.data = np.ones_like(held.data)
+        shared = (held @ held.T).tocsr()
+        shared.sort_indices()
+
+        # exact sum of minima, only for the pairs the product says share something
+        rows, cols, values = [], [], []
+        for a in range(weights.shape[0]):
+            start, end = shared.indptr[a], shared.indptr[a + 1]
+            partners = shared.indices[start:end]
+            partners = partners[partners >= a]
+            if not len(partners):
+                continue
+            a_cols = weights.indices[weights.indptr[a]:weights.indptr[a + 1]]
+            a_weights = weights.data[weights.indptr[a]:weights.indptr[a + 1]]
+            # partners restricted to fund a's securities; column k of sub is a_cols[k]
+            sub = weights[partners][:, a_cols].tocsr()
+            sub.data = np.minimum(sub.data, a_weights[sub.indices])
+            rows.append(np.full(len(partners), a)); cols.append(partners)
+            values.append(np.asarray(sub.sum(axis=1)).ravel())
+        n = weights.shape[0]
+        if rows:
+            rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+        else:
+            rows = cols = np.zeros(0, dtype=np.intp); values = np.zeros(0)
+        upper = sparse.coo_matrix((values, (rows, cols)), shape=(n, n))
+        overlap = (upper + sparse.triu(upper, k=1).T).tocsr()
+        return cls(list(engine.fund_tickers), overlap, shared.astype(np.int32))
+
+    # ------------------------------------------------------------------ #
+    # persistence
+    # ------------------------------------------------------------------ #
+
+    def save(self, directory: Path, fingerprint: str = "") -> None:
+        from scipy import sparse
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(directory / "overlap.npz", self.overlap)
+        sparse.save_npz(directory / "shared.npz", self.shared)
+        (directory / "meta.json").write_text(json.dumps({"tickers": self.tickers, "fingerprint": fingerprint}))
+
+    @classmethod
+    def load(cls, directory: Path, fingerprint: str | None = None) -> "OverlapMatrix | None":
+        """The saved matrix, or None if there is none or it was built from other holdings."""
+        from scipy import sparse
+        directory = Path(directory)
+        meta_p = directory / "meta.json"
+        if not meta_p.exists():
+            return None
+        meta = json.loads(meta_p.read_text())
+        if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+            return None
+        return cls(meta["tickers"], sparse.load_npz(directory / "overlap.npz").tocsr(),
+                   sparse.load_npz(directory / "shared.npz").tocsr())
+
+    @classmethod
+    def for_store(cls, store, engine: LookThroughEngine | None = None, master=None) -> "OverlapMatrix":
+        """
+        The overlap matrix of every fund in *store*, from the on-disk cache when the
+        holdings have not changed since it was built.
+        """
+        directory = Path(store.root) / OVERLAP_DIR_NAME
+        fingerprint = holdings_fingerprint(store)
+        cached = cls.load(directory, fingerprint)
+        if cached is not None:
+            return cached
+        if engine is None:
+            engine = LookThroughEngine(store.mapping(master), master=master)
+        matrix = cls.from_engine(engine)
+        matrix.save(directory, fingerprint)
+        return matrix
+
+    # ------------------------------------------------------------------ #
+    # queries
+    # ------------------------------------------------------------------ #
+
+    def overlap_of(self, a: str, b: str) -> float:
+        return float(self.overlap[self.index[a], self.index[b]])
+
+    def shared_holdings(self, a: str, b: str) -> int:
+        return int(self.shared[self.index[a], self.index[b]])
+
+    def top_overlaps(self, ticker: str, n: int | None = 10) -> pd.DataFrame:
+        """Funds overlapping most with *ticker*: overlap (0-1) and number of shared holdings."""
+        if ticker not in self.index:
+            raise KeyError(f"{ticker} has no holdings in the overlap matrix")
+        i = self.index[ticker]
+        start, end = self.overlap.indptr[i], self.overlap.indptr[i + 1]
+        partners, values = self.overlap.indices[start:end], self.overlap.data[start:end]
+        keep = partners != i
+        partners, values = partners[keep], values[keep]
+        top = LookThroughEngine.top_n_indices(values, n)
+        partners = partners[top]
+        return pd.DataFrame({
+            "overlap": values[top],
+            "shared_holdings": np.asarray(self.shared[i, partners].todense()).ravel().astype(int),
+        }, index=pd.Index([self.tickers[j] for j in partners], name="ticker"))
+
+    def frame(self, tickers: Iterable[str] | None = None) -> pd.DataFrame:
+        """Dense overlap matrix of *tickers* (default: all funds)."""
+        tickers = self.tickers if tickers is None else [t for t in dict.fromkeys(tickers) if t in self.index]
+        pos = np.array([self.index[t] for t in tickers], dtype=np.intp)
+        return pd.DataFrame(self.overlap[pos][:, pos].toarray(), index=tickers, columns=tickers)
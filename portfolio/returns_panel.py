@@ -0,0 +1,248 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+import numpy as np
+
+PANEL_DIR_NAME = "panels"
+RETURN_COLUMN = "ccy_adj_return"
+_FILES = ("returns.npy", "present.npy", "dates.npy")
+
+
+def _fund_fingerprint(info: dict) -> str:
+    """Changes whenever the stored history of a fund is rewritten."""
+    return f"{info.get('updated_at')}|{info.get('historical_rows')}|{info.get('last_date')}"
+
+
+# --------------------------------------------------------------------------- #
+# generations
+# --------------------------------------------------------------------------- #
+
+def new_generation(directory: Path) -> Path:
+    """A fresh private directory under *directory* to write the arrays of a rebuild into."""
+    directory.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(dir=directory, prefix=".build-"))
+
+
+def publish_generation(directory: Path, build: Path, meta: dict, keep: Iterable[str] = (),
+                       legacy_files: Iterable[str] = ()) -> str:
+    """
+    Makes the rebuild in *build* current: it is renamed to a ``gen-*`` directory and
+    ``meta.json`` is replaced in one step to point at it. Files are never replaced
+    while something may have them mapped; older generations other than *keep*
+    ("" keeps the *legacy_files* written directly into *directory* before there
+    were generations) are removed where that is possible, and otherwise left for a
+    later rebuild.
+    """
+    name = "gen-" + build.name.removeprefix(".build-")
+    os.replace(build, directory / name)
+    tmp = directory / f"meta.json.{name}.tmp"
+    tmp.write_text(json.dumps({**meta, "generation": name}))
+    os.replace(tmp, directory / "meta.json")
+    # a concurrent rebuild may have published after us; never remove what meta.json points at
+    current = json.loads((directory / "meta.json").read_text()).get("generation", "")
+    keep = {name, current, *keep}
+    for path in directory.glob("gen-*"):
+        if path.name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+    if "" not in keep:
+        for file_name in legacy_files:
+            try:
+                (directory / file_name).unlink(missing_ok=True)
+            except OSError:
+                pass
+    return name
+
+
+class ReturnsPanel:
+    """
+    Currency-adjusted daily returns of every stored fund on one ascending date axis.
+
+    The panel lives next to the fund data store (``<store>/panels/<currency>/``) as a
+    column-major ``dates x funds`` float array plus a boolean array marking the dates
+    each fund actually reports. Both are memory-mapped, so selecting the funds of a
+    portfolio only touches their columns, however many funds are stored. Returns are
+    zero where a fund has no value, and ``first_valid`` holds the row of each fund's
+    first reported date.
+
+    A panel is never modified once opened. :meth:`synced` rebuilds the arrays when
+    funds were added, removed or re-downloaded, reading only the histories that
+    changed, into a new generation directory, and returns a new panel over it, so
+    jobs still reading the old one are unaffected. ``version`` is bumped on every
+    rebuild.
+    """
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.tickers: list[str] = []
+        self.first_valid = np.zeros(0, dtype=np.int64)
+        self.fingerprints: dict[str, str] = {}
+        self.version = 0
+        self.generation = ""
+        self.dates = pd.DatetimeIndex([], name="date")
+        self._returns = np.zeros((0, 0))
+        self._present = np.zeros((0, 0), dtype=bool)
+        self._column: dict[str, int] = {}
+        self._load()
+
+    @classmethod
+    def for_store(cls, store, currency: str) -> "ReturnsPanel":
+        return cls(Path(store.root) / PANEL_DIR_NAME / currency)
+
+    @property
+    def currency(self) -> str:
+        return self.directory.name
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self._column
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def _load(self) -> None:
+        meta_p = self.directory / "meta.json"
+        if not meta_p.exists():
+            return
+        meta = json.loads(meta_p.read_text())
+        self.tickers = meta["tickers"]
+        self.first_valid = np.asarray(meta["first_valid"], dtype=np.int64)
+        self.fingerprints = meta["fingerprints"]
+        self.version = meta["version"]
+        self.generation = meta.get("generation", "")
+        files = self.directory / self.generation
+        self.dates = pd.DatetimeIndex(np.load(files / "dates.npy"), name="date")
+        self._returns = np.load(files / "returns.npy", mmap_mode="r")
+        self._present = np.load(files / "present.npy", mmap_mode="r")
+        self._column = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    # ------------------------------------------------------------------ #
+    # building
+    # ------------------------------------------------------------------ #
+
+    def fund_fingerprints(self, store) -> dict[str, str]:
+        """Fingerprints of the stored funds whose returns were derived for this currency."""
+        index = store.index
+        if index.empty:
+            return {}
+        # entries saved before the portfolio currency was recorded are taken as they are
+        currency_ok = index["portfolio_currency"].isna() | (index["portfolio_currency"] == self.currency)
+        usable = index[currency_ok & (index["historical_rows"].fillna(0) > 0)]
+        return {ticker: _fund_fingerprint(info) for ticker, info in usable.to_dict("index").items()}
+
+    def is_stale(self, store) -> bool:
+        return self.fund_fingerprints(store) != self.fingerprints
+
+    def synced(self, store) -> "ReturnsPanel":
+        """The panel in line with *store*: this one if nothing changed, otherwise a new panel."""
+        wanted = self.fund_fingerprints(store)
+        if wanted == self.fingerprints:
+            return self
+
+        kept = [t for t in self.tickers if self.fingerprints.get(t) == wanted.get(t)]
+        fresh: dict[str, pd.Series] = {}
+        for ticker in wanted:
+            if ticker in kept or self.fingerprints.get(ticker) == wanted[ticker]:
+                continue    # unchanged, including funds known to have no returns
+            hist = store.read(ticker, "historical")
+            if RETURN_COLUMN in hist.columns and hist[RETURN_COLUMN].notna().any():
+                series = hist[RETURN_COLUMN]
+                fresh[ticker] = series[series.index.notna()].sort_index()
+
+        old_cols = np.array([self._column[t] for t in kept], dtype=np.intp)
+        old_rows = np.flatnonzero(self._present[:, old_cols].any(axis=1)) if len(kept) else np.zeros(0, dtype=np.intp)
+        dates = self.dates[old_rows]
+        for series in fresh.values():
+            dates = dates.union(series.index)
+        dates = pd.DatetimeIndex(dates).sort_values()
+
+        tickers = kept + list(fresh)
+        build = new_generation(self.directory)
+        tmp = {name: build / name for name in _FILES}
+        shape = (len(dates), len(tickers))
+        returns = np.lib.format.open_memmap(tmp["returns.npy"], mode="w+", dtype=np.float64, shape=shape, fortran_order=True)
+        present = np.lib.format.open_memmap(tmp["present.npy"], mode="w+", dtype=bool, shape=shape, fortran_order=True)
+        returns[:], present[:] = 0.0, False
+
+        if len(kept):
+            new_rows = dates.get_indexer(self.dates[old_rows])
+            for j, col in enumerate(old_cols):
+                returns[new_rows, j] = self._returns[old_rows, col]
+                present[new_rows, j] = self._present[old_rows, col]
+        for j, series in enumerate(fresh.values(), start=len(kept)):
+            rows = dates.get_indexer(series.index)
+            returns[rows, j] = np.nan_to_num(series.to_numpy(dtype=float), nan=0.0)
+            present[rows, j] = True
+        first_valid = present.argmax(axis=0) if len(tickers) else np.zeros(0, dtype=np.int64)
+        returns.flush(); present.flush()
+        del returns, present
+        with open(tmp["dates.npy"], "wb") as f:
+            np.save(f, dates.as_unit("ns").to_numpy())
+
+        meta = {"tickers": tickers, "first_valid": [int(r) for r in first_valid], "fingerprints": wanted,
+                "version": self.version + 1, "built_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        # the generation this panel reads stays for whoever still holds it
+        publish_generation(self.directory, build, meta, keep=[self.generation], legacy_files=_FILES)
+        return ReturnsPanel(self.directory)
+
+    # ------------------------------------------------------------------ #
+    # selection
+    # ------------------------------------------------------------------ #
+
+    def fingerprint(self, tickers: Iterable[str]) -> str:
+        """Identifies the returns of *tickers*; changes when any of their histories does."""
+        parts = [f"{self.currency}"] + [f"{t}={self.fingerprints.get(t)}" for t in sorted(set(tickers))]
+        return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+    def _positions(self, tickers: list[str]) -> slice | np.ndarray:
+        """Panel columns of *tickers*; a run of adjacent columns as a slice, so indexing with it gives a view."""
+        cols = np.array([self._column[t] for t in tickers], dtype=np.intp)
+        if len(cols) and (np.diff(cols) == 1).all():
+            return slice(int(cols[0]), int(cols[-1]) + 1)
+        return cols
+
+    @staticmethod
+    def _gather(array: np.ndarray, rows: slice | np.ndarray, cols: slice | np.ndarray) -> np.ndarray:
+        """``array[rows, cols]`` as a view when both are slices, otherwise in a single copy."""
+        if isinstance(rows, slice) or isinstance(cols, slice):
+            return array[rows, cols]
+        return array[np.ix_(rows, cols)]
+
+    def columns(self, tickers: Iterable[str], start: int = 0, stop: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        ``(returns, present)`` of *tickers* on the rows *start* to *stop*, each
+        ``rows x tickers``: views of the memory-mapped arrays for adjacent panel
+        columns, otherwise one copy. Raises KeyError for a fund not in the panel.
+        """
+        cols = self._positions(list(tickers))
+        rows = slice(start, stop)
+        return self._gather(self._returns, rows, cols), self._gather(self._present, rows, cols)
+
+    def select(self, tickers: Iterable[str]) -> pd.DataFrame:
+        """
+        Returns of *tickers* (those in the panel, in the given order) from the latest
+        first reported date among them, on the dates at least one of them reports.
+
+        The frame is a read-only view of the memory-mapped panel when the funds are
+        adjacent panel columns and report on every date of the range; otherwise their
+        columns are gathered in one copy, which never touches the other funds.
+
+        Raises:
+            ValueError: If none of the funds has return data or they share no dates.
+        """
+        tickers = [t for t in dict.fromkeys(tickers) if t in self._column]
+        if not tickers:
+            raise ValueError("No currency-adjusted return data available for funds in the portfolio.")
+        cols = self._positions(tickers)
+        start = int(self.first_valid[cols].max())
+        present = self._gather(self._present, slice(start, None), cols).any(axis=1)
+        rows = slice(start, None) if present.all() else np.flatnonzero(present) + start
+        values = self._gather(self._returns, rows, cols)
+        if not len(values):
+            raise ValueError("No common date range found for all assets in the portfolio.")
+        return pd.DataFrame(values, index=self.dates[rows], columns=tickers, copy=False)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import pandas as pd
+import numpy as np
+from .backtester import statistics_windows, rebalance_markers, rebalanced_returns, period_risk_free_rate
+
+TRADING_DAYS = 252
+CONFIDENCE = 0.95
+RISK_COLUMNS = ["var_hist", "cvar_hist", "var_param", "cvar_param", "max_drawdown", "drawdown_days", "sortino", "calmar"]
+
+
+def weighted_returns(asset_returns: pd.DataFrame, weights: pd.DataFrame, rebalancing_period: str) -> pd.DataFrame:
+    """
+    Daily returns of every weighting in *weights* (one row of asset weights per
+    portfolio) over *asset_returns*, rebalanced like :class:`PortfolioBacktester`.
+    All weightings are run in the same pass over the days.
+    """
+    weights = weights.reindex(columns=asset_returns.columns, fill_value=0.0)
+    markers = rebalance_markers(asset_returns.index, rebalancing_period)
+    values = rebalanced_returns(asset_returns.to_numpy(dtype=float), weights.to_numpy(dtype=float), markers)
+    return pd.DataFrame(values.T, index=asset_returns.index, columns=weights.index)
+
+
+def _annualized(total_return: np.ndarray, n_days: int) -> np.ndarray:
+    # same convention as PortfolioBacktester.calculate_period_stats
+    num_years = n_days / TRADING_DAYS
+    return (1 + total_return) ** (1 / num_years) - 1 if num_years > 1 else total_return
+
+
+def _window_risk(window: np.ndarray, risk_free_rate: float, confidence: float) -> np.ndarray:
+    """``len(RISK_COLUMNS) x portfolios`` for one window of a ``days x portfolios`` array."""
+    from scipy.stats import norm
+    n_days, tail = window.shape[0], 1 - confidence
+
+    # historical: the worst n - floor(n * confidence) days, VaR is the best of them,
+    # CVaR their mean (counted exactly: 1 - 0.95 is not 0.05 in floating point)
+    k = max(1, n_days - int(np.floor(n_days * confidence + 1e-9)))
+    worst = np.partition(window, k - 1, axis=0)[:k] if k < n_days else window
+    var_hist = -worst.max(axis=0)
+    cvar_hist = -worst.mean(axis=0)
+
+    # parametric: normal with the window's mean and standard deviation
+    mean, std = window.mean(axis=0), window.std(axis=0, ddof=1)
+    z = norm.ppf(tail)
+    var_param = -(mean + z * std)
+    cvar_param = -(mean - std * norm.pdf(z) / tail)
+
+    # drawdowns from the window's starting value, which counts as a peak
+    wealth = np.cumprod(1 + window, axis=0)
+    peaks = np.maximum(np.maximum.accumulate(wealth, axis=0), 1.0)
+    max_drawdown = (wealth / peaks - 1).min(axis=0)
+    underwater = wealth < peaks
+    days = np.arange(n_days)[:, None]
+    last_peak = np.maximum.accumulate(np.where(underwater, -1, days), axis=0)
+    drawdown_days = (days - last_peak).max(axis=0).astype(float)
+
+    annual_return = _annualized(wealth[-1] - 1, n_days)
+    adj_rf = period_risk_free_rate(risk_free_rate, n_days)
+    downside = np.sqrt(np.mean(np.minimum(window, 0.0) ** 2, axis=0)) * np.sqrt(TRADING_DAYS)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sortino = np.where(downside > 0, (annual_return - adj_rf) / downside, np.nan)
+        calmar = np.where(max_drawdown < 0, annual_return / -max_drawdown, np.nan)
+    return np.vstack([var_hist, cvar_hist, var_param, cvar_param, max_drawdown, drawdown_days, sortino, calmar])
+
+
+def risk_statistics(portfolio_returns: pd.Series | pd.DataFrame, risk_free_rate: float = 0.0,
+                    confidence: float = CONFIDENCE) -> pd.DataFrame:
+    """
+    ``RISK_COLUMNS`` over every window of :meth:`PortfolioBacktester.calculate_statistics`.
+
+    VaR and CVaR are one-day losses at *confidence* (positive numbers), historical
+    and under a normal fit; ``max_drawdown`` is negative and ``drawdown_days`` is the
+    longest stretch of trading days spent below a previous peak. Sortino and Calmar
+    use the annualised return of the window.
+
+    A DataFrame holds one portfolio per column (e.g. from :func:`weighted_returns`);
+    every window is then evaluated for all of them in one set of array operations.
+    The result is indexed by period, or by (portfolio, period) for a DataFrame.
+    """
+    single = isinstance(portfolio_returns, pd.Series)
+    frame = portfolio_returns.to_frame() if single else portfolio_returns
+    frame = frame.sort_index()
+    values = frame.to_numpy(dtype=float)
+
+    blocks = {}
+    for name, start_row in statistics_windows(frame.index).items():
+        window = values[start_row:] if start_row is not None else values[:0]
+        if len(window) < 2:
+            blocks[name] = np.full((len(RISK_COLUMNS), values.shape[1]), np.nan)
+        else:
+            blocks[name] = _window_risk(window, risk_free_rate, confidence)
+
+    periods = list(blocks)
+    stacked = np.stack([blocks[p] for p in periods])    # periods x metrics x portfolios
+    index = pd.MultiIndex.from_product([frame.columns, periods], names=["portfolio", "period"])
+    result = pd.DataFrame(stacked.transpose(2, 0, 1).reshape(-1, len(RISK_COLUMNS)), index=index, columns=RISK_COLUMNS)
+    return result.droplevel("portfolio") if single else result
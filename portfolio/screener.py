@@ -0,0 +1,162 @@
+from __future__ import annotations
+import operator
+import re
+
+import pandas as pd
+import numpy as np
+from .returns_panel import ReturnsPanel
+
+TRADING_DAYS = 252
+METRIC_COLUMNS = ["return_1y", "return_3y", "volatility_1y", "sharpe_1y", "max_drawdown_3y",
+                  "distribution_yield", "holdings_count"]
+# shown in percent and accepted with a '%' suffix in screens
+PERCENT_COLUMNS = {"return_1y", "return_3y", "volatility_1y", "max_drawdown_3y", "distribution_yield"}
+METRICS_FILE = "metrics.parquet"
+HISTORY_COLUMNS = ["ccy_adj_return", "NAV", "Ex-Dividends"]
+
+_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+              "=": operator.eq, "==": operator.eq, "!=": operator.ne}
+_PREDICATE_RE = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(<=|>=|==|!=|<|>|=)\s*(-?\d+(?:\.\d+)?)\s*(%?)\s*$")
+_SEPARATOR_RE = re.compile(r",|;|\band\b", re.IGNORECASE)
+
+
+# --------------------------------------------------------------------------- #
+# metrics table
+# --------------------------------------------------------------------------- #
+
+def _window_start(dates: pd.DatetimeIndex, years: int) -> int | None:
+    """First row of the trailing *years* window, or None if the history is shorter."""
+    start_date = dates[-1] - pd.DateOffset(years=years)
+    if start_date < dates[0]:
+        return None
+    return int(dates.searchsorted(start_date))
+
+
+def fund_metrics(historical: pd.DataFrame, risk_free_rate: float = 0.0) -> dict:
+    """
+    Trailing metrics of one fund from its stored history, ending at its last reported
+    date. Windows longer than the history are left as NaN.
+    """
+    metrics = dict.fromkeys(METRIC_COLUMNS[:-1], np.nan)
+    if historical.empty or "ccy_adj_return" not in historical.columns:
+        return metrics
+    hist = historical.sort_index()
+    dates = hist.index
+    returns = hist["ccy_adj_return"].to_numpy(dtype=float)
+
+    start_1y, start_3y = _window_start(dates, 1), _window_start(dates, 3)
+    if start_1y is not None:
+        window = returns[start_1y:]
+        window = window[~np.isnan(window)]
+        if len(window) >= 2:
+            metrics["return_1y"] = np.prod(1 + window) - 1
+            metrics["volatility_1y"] = window.std(ddof=1) * np.sqrt(TRADING_DAYS)
+            if metrics["volatility_1y"] > 0:
+                metrics["sharpe_1y"] = (metrics["return_1y"] - risk_free_rate) / metrics["volatility_1y"]
+    if start_3y is not None:
+        wealth = np.cumprod(1 + np.nan_to_num(returns[start_3y:]))
+        metrics["return_3y"] = wealth[-1] ** (1 / 3) - 1
+        metrics["max_drawdown_3y"] = (wealth / np.maximum.accumulate(wealth) - 1).min()
+
+    if "NAV" in hist.columns and "Ex-Dividends" in hist.columns and start_1y is not None:
+        nav = hist["NAV"].iloc[-1]
+        paid = pd.to_numeric(hist["Ex-Dividends"].iloc[start_1y:], errors="coerce").fillna(0).sum()
+        metrics["distribution_yield"] = paid / nav if nav else np.nan
+    return metrics
+
+
+def build_metrics_table(store, currency: str, risk_free_rate: float = 0.0) -> pd.DataFrame:
+    """
+    One row of ``METRIC_COLUMNS`` per stored fund whose returns are in *currency*.
+
+    The table is kept next to the returns panel of that currency and recomputed only
+    for funds whose stored history changed since; a different *risk_free_rate* just
+    re-derives the Sharpe column.
+    """
+    panel = ReturnsPanel.for_store(store, currency)
+    path = panel.directory / METRICS_FILE
+    fingerprints = panel.fund_fingerprints(store)
+    previous = pd.read_parquet(path) if path.exists() else pd.DataFrame(columns=METRIC_COLUMNS + ["fingerprint"])
+
+    unchanged = previous[previous["fingerprint"] == previous.index.map(fingerprints)]
+    rows = {ticker: {**fund_metrics(store.read(ticker, "historical", columns=HISTORY_COLUMNS), risk_free_rate),
+                     "fingerprint": fingerprint}
+            for ticker, fingerprint in fingerprints.items() if ticker not in unchanged.index}
+    frames = [frame for frame in (unchanged, pd.DataFrame.from_dict(rows, orient="index")) if len(frame)]
+    table = pd.concat(frames) if frames else previous
+    table = table.reindex(index=list(fingerprints), columns=METRIC_COLUMNS + ["fingerprint"])
+    table = table.astype({col: float for col in METRIC_COLUMNS})
+    table.index.name = "ticker"
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = (table["return_1y"] - risk_free_rate) / table["volatility_1y"]
+    table["sharpe_1y"] = sharpe.where(table["volatility_1y"] > 0)
+    table["holdings_count"] = store.index["holdings_rows"].reindex(table.index).astype(float)
+    if rows or len(table) != len(previous):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table.to_parquet(path)
+    return table
+
+
+# --------------------------------------------------------------------------- #
+# screening
+# --------------------------------------------------------------------------- #
+
+def parse_screen(expression: str) -> list[tuple[str, str, float]]:
+    """
+    Parses ``"sharpe_1y > 0.5, volatility_1y < 15%"`` into ``(column, operator, value)``
+    predicates; ``%`` divides the value by 100.
+
+    Raises:
+        ValueError: For a malformed predicate or an unknown column.
+    """
+    predicates = []
+    for part in _SEPARATOR_RE.split(expression):
+        if not part.strip():
+            continue
+        match = _PREDICATE_RE.match(part)
+        if match is None:
+            raise ValueError(f"Cannot read '{part.strip()}'; use e.g. 'sharpe_1y > 0.5'.")
+        column, op, value, percent = match.groups()
+        if column not in METRIC_COLUMNS:
+            raise ValueError(f"Unknown metric '{column}'; choose from {', '.join(METRIC_COLUMNS)}.")
+        predicates.append((column, op, float(value) / 100 if percent else float(value)))
+    return predicates
+
+
+class Screener:
+    """
+    Multi-predicate filter and sort over a metrics table.
+
+    Every metric is held as one float array, so a screen is a handful of vectorised
+    comparisons AND-ed together and a sort is one argsort, whatever the size of the
+    universe. Funds with a missing value never pass a predicate on that metric.
+    """
+    def __init__(self, metrics: pd.DataFrame):
+        self.tickers = metrics.index.to_numpy(dtype=object)
+        self.columns = {col: metrics[col].to_numpy(dtype=float) for col in METRIC_COLUMNS if col in metrics.columns}
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def mask(self, predicates: list[tuple[str, str, float]]) -> np.ndarray:
+        mask = np.ones(len(self.tickers), dtype=bool)
+        for column, op, value in predicates:
+            values = self.columns[column]
+            mask &= _OPERATORS[op](values, value) & ~np.isnan(values)
+        return mask
+
+    def screen(self, expression: str = "", sort_by: str | None = None, descending: bool = True) -> list[str]:
+        """Tickers passing *expression*, ordered by *sort_by* (missing values last) or as stored."""
+        ids = np.flatnonzero(self.mask(parse_screen(expression)))
+        if sort_by is not None:
+            values = self.columns[sort_by][ids]
+            keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+            ids = ids[np.argsort(keys, kind="stable")]
+        return self.tickers[ids].tolist()
+
+    def frame(self, tickers: list[str]) -> pd.DataFrame:
+        index = pd.Index(self.tickers)
+        pos = index.get_indexer(tickers)
+        pos = pos[pos >= 0]
+        return pd.DataFrame({col: values[pos] for col, values in self.columns.items()}, index=index[pos])
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import re
+import threading
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+from .. import config
+
+MASTER_DIR = config.CACHE_DIR / "security_master"
+
+# holdings sheet column -> master field
+IDENTIFIER_COLUMNS = {"isin": "ISIN", "ticker": "Issuer Ticker", "name": "Name"}
+ATTRIBUTE_COLUMNS = {"sector": "Sector", "country": "Location", "currency": "Market Currency", "asset_class": "Asset Class"}
+MISSING_IDENTIFIERS = {"", "-", "NAN", "NONE", "N/A"}
+
+_NAME_NOISE_RE = re.compile(r"\b(CLASS|CL|SERIES|SER)\s+[A-Z0-9]\b|\b(REG|ORD|SHS|NON VOTING|NV|PREF|ADR|GDR)\b")
+_NAME_PUNCT_RE = re.compile(r"[^A-Z0-9 ]+")
+
+
+def normalize_name(name) -> str | None:
+    """Upper-cased issuer name without punctuation and share line suffixes ('CLASS A', 'REG', ...)."""
+    if name is None or pd.isna(name):
+        return None
+    norm = _NAME_PUNCT_RE.sub(" ", str(name).upper())
+    norm = " ".join(_NAME_NOISE_RE.sub(" ", norm).split())
+    return norm or None
+
+
+def _normalize_identifier(value) -> str | None:
+    if value is None or pd.isna(value):
+        return None
+    value = str(value).strip().upper()
+    return None if value in MISSING_IDENTIFIERS else value
+
+
+class SecurityMaster:
+    """
+    Persistent mapping of holdings identifiers to canonical integer security ids.
+
+    A holding is resolved by ISIN, then issuer ticker, then normalised issuer name; the
+    first hit wins and every other identifier on the row becomes an alias of that id.
+    Sector, country, currency and asset class are stored once per security as small
+    integer codes into shared category tables, so fund holdings only need to carry the
+    security id and their numeric columns.
+    """
+    def __init__(self):
+        self.names: list[str | None] = []
+        self.tickers: list[str | None] = []
+        self.isins: list[str | None] = []
+        self.attribute_codes: dict[str, list[int]] = {dim: [] for dim in ATTRIBUTE_COLUMNS}
+        self.categories: dict[str, list[str]] = {dim: [] for dim in ATTRIBUTE_COLUMNS}
+        self._category_index: dict[str, dict[str, int]] = {dim: {} for dim in ATTRIBUTE_COLUMNS}
+        self._aliases: dict[str, dict[str, int]] = {kind: {} for kind in IDENTIFIER_COLUMNS}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # ------------------------------------------------------------------ #
+    # resolution
+    # ------------------------------------------------------------------ #
+
+    def _category_code(self, dim: str, label) -> int:
+        if label is None or pd.isna(label) or str(label).strip() in ("", "-"):
+            return -1
+        label = str(label).strip()
+        code = self._category_index[dim].get(label)
+        if code is None:
+            code = self._category_index[dim][label] = len(self.categories[dim])
+            self.categories[dim].append(label)
+        return code
+
+    def _resolve(self, isin, ticker, name, attributes: dict) -> int:
+        keys = {"isin": _normalize_identifier(isin), "ticker": _normalize_identifier(ticker), "name": normalize_name(name)}
+        if not any(keys.values()):
+            return -1
+
+        security_id = next((self._aliases[kind][key] for kind, key in keys.items() if key and key in self._aliases[kind]), None)
+        if security_id is None:
+            security_id = len(self.names)
+            self.names.append(None if name is None or pd.isna(name) else str(name))
+            self.tickers.append(keys["ticker"])
+            self.isins.append(keys["isin"])
+            for dim in ATTRIBUTE_COLUMNS:
+                self.attribute_codes[dim].append(-1)
+
+        for kind, key in keys.items():
+            if key:
+                self._aliases[kind].setdefault(key, security_id)
+        # fill attributes the first fund did not provide
+        for dim, label in attributes.items():
+            if self.attribute_codes[dim][security_id] < 0:
+                self.attribute_codes[dim][security_id] = self._category_code(dim, label)
+        if self.tickers[security_id] is None:
+            self.tickers[security_id] = keys["ticker"]
+        if self.isins[security_id] is None:
+            self.isins[security_id] = keys["isin"]
+        return security_id
+
+    def resolve_frame(self, holdings: pd.DataFrame) -> np.ndarray:
+        """Security id for every row of a holdings sheet (-1 where the row has no identifier)."""
+        columns = {**IDENTIFIER_COLUMNS, **ATTRIBUTE_COLUMNS}
+        keys = pd.DataFrame({field: holdings[col] if col in holdings.columns else None for field, col in columns.items()},
+                            index=holdings.index)
+        # resolve every distinct identifier combination once
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(keys.astype(object).fillna("")))
+        with self._lock:
+            unique_ids = np.array([
+                self._resolve(row[0] or None, row[1] or None, row[2] or None,
+                              {dim: value or None for dim, value in zip(ATTRIBUTE_COLUMNS, row[3:])})
+                for row in uniques
+            ], dtype=np.int32)
+        return unique_ids[codes] if len(unique_ids) else np.full(len(holdings), -1, dtype=np.int32)
+
+    # ------------------------------------------------------------------ #
+    # dictionary encoding of holdings sheets
+    # ------------------------------------------------------------------ #
+
+    def encode_holdings(self, holdings: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compact form of a holdings sheet: an int32 ``security_id`` column plus the numeric
+        columns. Identifier and attribute strings are kept once in the master; remaining
+        text columns become categoricals.
+        """
+        if holdings is None or holdings.empty or "security_id" in holdings.columns:
+            return holdings
+        encoded = pd.DataFrame({"security_id": self.resolve_frame(holdings)}, index=holdings.index)
+        master_columns = set(IDENTIFIER_COLUMNS.values()) | set(ATTRIBUTE_COLUMNS.values())
+        for col in holdings.columns:
+            if col in master_columns:
+                continue
+            series = holdings[col]
+            if pd.api.types.is_numeric_dtype(series):
+                encoded[col] = series
+                continue
+            numeric = pd.to_numeric(series.astype(str).str.replace(",", "", regex=False), errors="coerce")
+            encoded[col] = numeric if numeric.notna().sum() == series.notna().sum() else series.astype("category")
+        return encoded.reset_index(drop=True)
+
+    def security_frame(self, security_ids) -> pd.DataFrame:
+        """Identifier and attribute columns (holdings sheet names) for the given ids."""
+        ids = np.asarray(security_ids, dtype=np.int64)
+        valid = ids >= 0
+        safe_ids = np.where(valid, ids, 0)
+
+        def _take(values: list) -> np.ndarray:
+            if not values:
+                return np.full(len(ids), None, dtype=object)
+            return np.where(valid, np.asarray(values, dtype=object)[safe_ids], None)
+
+        frame = pd.DataFrame({
+            IDENTIFIER_COLUMNS["ticker"]: _take(self.tickers),
+            IDENTIFIER_COLUMNS["name"]: _take(self.names),
+            IDENTIFIER_COLUMNS["isin"]: _take(self.isins),
+        })
+        for dim, col in ATTRIBUTE_COLUMNS.items():
+            codes = np.asarray(self.attribute_codes[dim], dtype=np.int32)[safe_ids] if len(self) else np.full(len(ids), -1)
+            codes = np.where(valid, codes, -1)
+            frame[col] = pd.Categorical.from_codes(codes, categories=self.categories[dim]) if self.categories[dim] \
+                else pd.Categorical([None] * len(ids))
+        return frame
+
+    def decode_holdings(self, encoded: pd.DataFrame) -> pd.DataFrame:
+        """Inverse of :meth:`encode_holdings`, e.g. for writing self-contained files."""
+        if encoded is None or encoded.empty or "security_id" not in encoded.columns:
+            return encoded
+        decoded = self.security_frame(encoded["security_id"].to_numpy())
+        for col in encoded.columns.drop("security_id"):
+            decoded[col] = encoded[col].to_numpy()
+        return decoded
+
+    # ------------------------------------------------------------------ #
+    # persistence
+    # ------------------------------------------------------------------ #
+
+    def save(self, directory: Path = MASTER_DIR) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            securities = self.security_frame(np.arange(len(self)))
+            aliases = pd.DataFrame(
+                [(kind, key, sid) for kind, mapping in self._aliases.items() for key, sid in mapping.items()],
+                columns=["kind", "key", "security_id"],
+            )
+        securities.to_parquet(directory / "securities.parquet", index=False)
+        aliases.to_parquet(directory / "aliases.parquet", index=False)
+
+    @classmethod
+    def load(cls, directory: Path = MASTER_DIR) -> "SecurityMaster":
+        """Loads the persisted master, or returns an empty one if none was saved yet."""
+        master = cls()
+        sec_p, alias_p = directory / "securities.parquet", directory / "aliases.parquet"
+        if not sec_p.exists() or not alias_p.exists():
+            return master
+        securities = pd.read_parquet(sec_p)
+        master.tickers = securities[IDENTIFIER_COLUMNS["ticker"]].astype(object).where(securities[IDENTIFIER_COLUMNS["ticker"]].notna(), None).tolist()
+        master.names = securities[IDENTIFIER_COLUMNS["name"]].astype(object).where(securities[IDENTIFIER_COLUMNS["name"]].notna(), None).tolist()
+        master.isins = securities[IDENTIFIER_COLUMNS["isin"]].astype(object).where(securities[IDENTIFIER_COLUMNS["isin"]].notna(), None).tolist()
+        for dim, col in ATTRIBUTE_COLUMNS.items():
+            labels = securities[col].astype("category")
+            master.categories[dim] = [str(c) for c in labels.cat.categories]
+            master._category_index[dim] = {label: code for code, label in enumerate(master.categories[dim])}
+            master.attribute_codes[dim] = labels.cat.codes.astype(int).tolist()
+        for kind, key, sid in pd.read_parquet(alias_p).itertuples(index=False):
+            master._aliases[kind][key] = int(sid)
+        return master
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+from .backtester import rebalance_markers, rebalanced_returns
+
+TRADING_DAYS = 252
+METHODS = ("bootstrap", "parametric")
+PATH_COLUMNS = ["terminal_wealth", "annual_return", "volatility", "max_drawdown", "sharpe"]
+CHUNK_BYTES = 64 * 2 ** 20    # simulated asset returns held in memory per chunk
+SUMMARY_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _sample_paths(returns: np.ndarray, n_paths: int, horizon: int, method: str, block_size: int,
+                  rng: np.random.Generator) -> np.ndarray:
+    """``n_paths x horizon x assets`` simulated daily asset returns."""
+    n_days, n_assets = returns.shape
+    if method == "parametric":
+        # joint normal with the historical mean and covariance of the daily returns
+        mean = returns.mean(axis=0)
+        cov = np.cov(returns, rowvar=False).reshape(n_assets, n_assets)
+        return rng.multivariate_normal(mean, cov, size=(n_paths, horizon), method="eigh")
+    # moving block bootstrap: whole blocks of consecutive days keep the cross-asset
+    # correlation and part of the serial dependence (volatility clustering)
+    block_size = max(1, min(block_size, n_days))
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, n_days - block_size + 1, size=(n_paths, n_blocks))
+    rows = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :horizon]
+    return returns[rows]
+
+
+def path_statistics(portfolio_returns: np.ndarray, risk_free_rate: float = 0.0) -> np.ndarray:
+    """``PATH_COLUMNS`` of every row of a ``paths x days`` array of portfolio returns."""
+    horizon = portfolio_returns.shape[1]
+    wealth = np.cumprod(1 + portfolio_returns, axis=1)
+    terminal = wealth[:, -1]
+    # the starting value of 1 counts as a peak
+    peaks = np.maximum(np.maximum.accumulate(wealth, axis=1), 1.0)
+    max_drawdown = (wealth / peaks - 1).min(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annual_return = terminal ** (TRADING_DAYS / horizon) - 1
+        volatility = portfolio_returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+        sharpe = np.where(volatility > 0, (annual_return - risk_free_rate) / volatility, np.nan)
+    return np.column_stack([terminal, annual_return, volatility, max_drawdown, sharpe])
+
+
+def _simulate_chunk(task: dict) -> np.ndarray:
+    """Simulates one chunk of paths. Must stay a top-level function for pickling."""
+    rng = np.random.default_rng(task["seed"])
+    sampled = _sample_paths(task["returns"], task["n_paths"], task["horizon"], task["method"], task["block_size"], rng)
+    portfolio_returns = rebalanced_returns(sampled, task["weights"], task["markers"])
+    return path_statistics(portfolio_returns, task["risk_free_rate"])
+
+
+class PortfolioSimulator:
+    """
+    Distribution of outcomes of a portfolio over simulated return histories.
+
+    Paths of daily asset returns are drawn from ``asset_returns``, either by block
+    bootstrap of the realised days or from a joint normal fitted to them, and run
+    through the same rebalancing as :class:`PortfolioBacktester` on the business days
+    following the last realised date. Paths are simulated in chunks whose size is
+    capped by ``CHUNK_BYTES``, so memory stays bounded for any number of paths, and
+    chunks can be spread over worker processes. Every chunk has its own seed derived
+    from *seed*, so results do not depend on the number of workers.
+    """
+    def __init__(self, portfolio_weights: pd.Series, asset_returns: pd.DataFrame, rebalancing_period: str,
+                 risk_free_rate: float = 0.0, method: str = "bootstrap", horizon: int | None = None,
+                 block_size: int = 20, seed: int | None = None):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}")
+        if asset_returns.empty:
+            raise ValueError("No asset returns to simulate from.")
+        self.asset_returns = asset_returns[portfolio_weights.index]
+        self.portfolio_weights = portfolio_weights
+        self.rebalancing_period = rebalancing_period
+        self.risk_free_rate = risk_free_rate
+        self.method = method
+        self.horizon = horizon or len(asset_returns)
+        self.block_size = block_size
+        self.seed = seed
+        self.dates = pd.bdate_range(asset_returns.index[-1] + pd.offsets.BDay(), periods=self.horizon, name="date")
+        self.markers = rebalance_markers(self.dates, rebalancing_period)
+
+    def chunk_size(self) -> int:
+        return max(1, CHUNK_BYTES // (self.horizon * max(len(self.portfolio_weights), 1) * 8))
+
+    def _tasks(self, n_paths: int) -> list[dict]:
+        size = self.chunk_size()
+        counts = [min(size, n_paths - start) for start in range(0, n_paths, size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(counts))
+        returns = self.asset_returns.to_numpy(dtype=float)
+        weights = self.portfolio_weights.to_numpy(dtype=float)
+        return [{"returns": returns, "weights": weights, "markers": self.markers, "horizon": self.horizon,
+                 "method": self.method, "block_size": self.block_size, "risk_free_rate": self.risk_free_rate,
+                 "n_paths": count, "seed": seed} for count, seed in zip(counts, seeds)]
+
+    def run(self, n_paths: int = 10_000, workers: int | None = 1) -> pd.DataFrame:
+        """
+        One row of ``PATH_COLUMNS`` per simulated path. *workers* > 1 (or None for one
+        per CPU) runs the chunks in a process pool.
+        """
+        tasks = self._tasks(n_paths)
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                chunks = list(pool.map(_simulate_chunk, tasks))
+        else:
+            chunks = [_simulate_chunk(task) for task in tasks]
+        values = np.concatenate(chunks) if chunks else np.zeros((0, len(PATH_COLUMNS)))
+        return pd.DataFrame(values, columns=PATH_COLUMNS).rename_axis("path")
+
+    @staticmethod
+    def summarize(paths: pd.DataFrame, percentiles=SUMMARY_PERCENTILES) -> pd.DataFrame:
+        """Mean and *percentiles* of every column of :meth:`run`'s result."""
+        summary = {"mean": paths.mean()}
+        summary.update({f"p{p}": paths.quantile(p / 100) for p in percentiles})
+        return pd.DataFrame(summary).T
@@ -0,0 +1,149 @@
+from __future__ import annotations
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+from .. import config
+from .backtester import rebalance_markers, rebalanced_returns
+from .returns_panel import ReturnsPanel, new_generation, publish_generation
+
+STRESS_COLUMNS = ["start", "end", "days", "return", "max_drawdown", "worst_day", "coverage"]
+
+
+def _slug(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name.lower()).strip("_")
+
+
+class StressTester:
+    """
+    Replays named historical windows (``config.STRESS_SCENARIOS``) against portfolios.
+
+    For every scenario the rows of the returns panel inside the window are copied
+    once into their own memory-mapped ``days x funds`` array, together with which
+    funds already reported when the window opened. :meth:`update` redoes this only
+    when the panel was rebuilt since. A stress run then gathers the portfolios' fund
+    columns from each scenario array and rebalances all portfolios together, the same
+    way :class:`PortfolioBacktester` does, so hundreds of portfolios cost one pass over
+    each window. Like the panel, every rebuild is written to a new generation
+    directory, so a tester opened earlier keeps reading its own files. Funds without
+    history at the start of a window count as cash (zero return) there; ``coverage``
+    is the share of the weight that does have history.
+    """
+    def __init__(self, directory: Path, scenarios: dict[str, tuple[str, str]] | None = None):
+        self.directory = Path(directory)
+        self.scenarios = dict(config.STRESS_SCENARIOS if scenarios is None else scenarios)
+        self.tickers: list[str] = []
+        self.panel_version: int | None = None
+        self.generation = ""
+        self._column: dict[str, int] = {}
+        self._windows: dict[str, dict] = {}    # scenario -> dates, returns, covered
+        self._load()
+
+    @classmethod
+    def for_panel(cls, panel: ReturnsPanel, scenarios: dict[str, tuple[str, str]] | None = None) -> "StressTester":
+        return cls(panel.directory / "stress", scenarios)
+
+    def _load(self) -> None:
+        meta_p = self.directory / "meta.json"
+        if not meta_p.exists():
+            return
+        meta = json.loads(meta_p.read_text())
+        if meta["scenarios"] != {name: list(window) for name, window in self.scenarios.items()}:
+            return    # built for other windows, :meth:`update` rebuilds
+        self.tickers = meta["tickers"]
+        self.panel_version = meta["panel_version"]
+        self.generation = meta.get("generation", "")
+        files = self.directory / self.generation
+        self._column = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._windows = {}
+        for name in meta["available"]:
+            slug = _slug(name)
+            self._windows[name] = {
+                "dates": pd.DatetimeIndex(np.load(files / f"{slug}_dates.npy"), name="date"),
+                "returns": np.load(files / f"{slug}_returns.npy", mmap_mode="r"),
+                "covered": np.load(files / f"{slug}_covered.npy"),
+            }
+
+    @property
+    def available(self) -> list[str]:
+        """Scenarios the panel has at least two days of data for."""
+        return list(self._windows)
+
+    def is_stale(self, panel: ReturnsPanel) -> bool:
+        return self.panel_version != panel.version or self.tickers != panel.tickers
+
+    def update(self, panel: ReturnsPanel) -> bool:
+        """
+        Cuts the scenario windows out of *panel* (which should be synced first); True
+        if it had to. This tester then reads the new windows, so call it only on one
+        that no running job holds; those open a new tester with :meth:`for_panel`.
+        """
+        if not self.is_stale(panel):
+            return False
+        build = new_generation(self.directory)
+        available = []
+        for name, (start, end) in self.scenarios.items():
+            first = int(panel.dates.searchsorted(pd.Timestamp(start)))
+            last = int(panel.dates.searchsorted(pd.Timestamp(end), side="right"))
+            if last - first < 2:
+                continue
+            slug = _slug(name)
+            covered = panel.first_valid <= first
+            for suffix, array in (("returns", np.asfortranarray(panel.columns(panel.tickers, first, last)[0])),
+                                  ("dates", panel.dates[first:last].as_unit("ns").to_numpy()), ("covered", covered)):
+                np.save(build / f"{slug}_{suffix}.npy", array)
+            available.append(name)
+        meta = {"tickers": panel.tickers, "panel_version": panel.version, "available": available,
+                "scenarios": {name: list(window) for name, window in self.scenarios.items()},
+                "built_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        legacy = [path.name for path in self.directory.glob("*.npy")]
+        publish_generation(self.directory, build, meta, keep=[self.generation], legacy_files=legacy)
+        self._load()
+        return True
+
+    def run(self, weights: pd.DataFrame | pd.Series, rebalancing_period: str = "m") -> pd.DataFrame:
+        """
+        ``STRESS_COLUMNS`` of every portfolio (row of *weights*, ``portfolios x funds``;
+        a Series is one portfolio) in every available scenario, indexed by
+        (portfolio, scenario), or by scenario for a Series.
+        """
+        single = isinstance(weights, pd.Series)
+        frame = weights.to_frame("Portfolio").T if single else weights
+        frame = frame.fillna(0.0)
+        cols = np.array([self._column.get(ticker, -1) for ticker in frame.columns], dtype=np.intp)
+        known = cols >= 0
+        w = frame.to_numpy(dtype=float)
+        gross = np.abs(w).sum(axis=1)
+
+        blocks = []
+        for name, window in self._windows.items():
+            dates = window["dates"]
+            returns = np.zeros((len(dates), len(cols)))
+            returns[:, known] = window["returns"][:, cols[known]]
+            covered = np.zeros(len(cols), dtype=bool)
+            covered[known] = window["covered"][cols[known]]
+
+            portfolio_returns = rebalanced_returns(returns, w, rebalance_markers(dates, rebalancing_period))
+            wealth = np.cumprod(1 + portfolio_returns, axis=1)
+            peaks = np.maximum(np.maximum.accumulate(wealth, axis=1), 1.0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                coverage = np.where(gross > 0, (np.abs(w) * covered).sum(axis=1) / gross, np.nan)
+            # a portfolio none of whose funds existed yet has no result rather than a flat one
+            untested = ~(coverage > 0)
+            block = pd.DataFrame({
+                "portfolio": frame.index, "scenario": name, "start": dates[0], "end": dates[-1], "days": len(dates),
+                "return": wealth[:, -1] - 1, "max_drawdown": (wealth / peaks - 1).min(axis=1),
+                "worst_day": portfolio_returns.min(axis=1), "coverage": coverage,
+            })
+            block.loc[untested, ["return", "max_drawdown", "worst_day"]] = np.nan
+            blocks.append(block)
+
+        if not blocks:
+            result = pd.DataFrame(columns=["portfolio", "scenario"] + STRESS_COLUMNS)
+        else:
+            result = pd.concat(blocks, ignore_index=True)
+        order = pd.MultiIndex.from_product([frame.index, list(self._windows)], names=["portfolio", "scenario"])
+        result = result.set_index(["portfolio", "scenario"]).reindex(order)
+        return result.droplevel("portfolio") if single else result
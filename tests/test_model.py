@@ -0,0 +1,32 @@
+from etf_portfolio_app.portfolio.combined_holdings import calculate_portfolio_weights
+from etf_portfolio_app.portfolio.model import PortfolioModel
+
+
+def _position(ticker: str, **amount) -> dict:
+    return {"name": ticker, "ticker": ticker, "currency": "USD", "hedging": "Unhedged",
+            "distribution": "Accumulating", "link": "", **amount}
+
+
+def test_removing_last_share_position_switches_back_to_weights():
+    model = PortfolioModel()
+    model.add(_position("AAA", shares=10))
+    model.remove(0)
+    assert not model.is_share_based
+    assert model.columns == []
+
+    model.add(_position("BBB", weight=60))
+    model.add(_position("CCC", weight=40))
+    assert not model.is_share_based
+    assert "shares" not in model.frame().columns
+    weights, total = calculate_portfolio_weights(model.frame(), {})
+    assert weights == {"BBB": 0.6, "CCC": 0.4}
+    assert total is None
+
+
+def test_remove_drops_columns_without_values():
+    model = PortfolioModel()
+    model.add(_position("AAA", weight=50, provider="iShares"))
+    model.add(_position("BBB", weight=50))
+    model.remove(0)
+    assert "provider" not in model.columns
+    assert model.record(0) == _position("BBB", weight=50)
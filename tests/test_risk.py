@@ -0,0 +1,12 @@
+import numpy as np
+
+from etf_portfolio_app.portfolio.risk import RISK_COLUMNS, _window_risk
+
+
+def test_historical_var_uses_exact_tail_count():
+    # 100 days at 95%: the worst 5 days are -10%..-6%, the 6th worst is -5%
+    window = np.concatenate([-np.arange(1, 11) / 100, np.full(90, 0.01)])[:, None]
+    risk = dict(zip(RISK_COLUMNS, _window_risk(window, 0.0, 0.95)[:, 0]))
+    worst = np.arange(6, 11) / 100
+    assert np.isclose(risk["var_hist"], 0.06)
+    assert np.isclose(risk["cvar_hist"], worst.mean())
@@ -0,0 +1,249 @@
+from __future__ import annotations
+import math
+import tkinter as tk
+
+import customtkinter as ctk
+import numpy as np
+import pandas as pd
+
+from ..portfolio.downsample import downsample, visible_slice
+
+BG_COLOR = "#2B2B2B"
+AXIS_COLOR = "#5A5D60"
+TEXT_COLOR = "#DCE4EE"
+PALETTE = ["#2FA572", "#3B8ED0", "#E0A526", "#D9534F", "#A070D0", "#5BC0DE", "#E07BB0", "#8FBF4A"]
+NS_PER_DAY = 86_400e9
+REDRAW_DELAY_MS = 30
+
+
+def _nice_ticks(lo: float, hi: float, max_ticks: int = 6) -> np.ndarray:
+    if not np.isfinite(lo) or not np.isfinite(hi) or hi <= lo:
+        return np.array([lo])
+    raw_step = (hi - lo) / max_ticks
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    return np.arange(math.ceil(lo / step) * step, hi + step * 1e-9, step)
+
+
+class _CanvasChart(ctk.CTkFrame):
+    """A tk canvas that redraws itself (debounced) whenever it is resized."""
+    def __init__(self, master, height: int, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.canvas = tk.Canvas(self, height=height, background=BG_COLOR, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda e: self.request_redraw())
+        self._redraw_id: str | None = None
+        self._message: str | None = "No data."
+
+    def request_redraw(self) -> None:
+        if self._redraw_id is not None:
+            self.after_cancel(self._redraw_id)
+        self._redraw_id = self.after(REDRAW_DELAY_MS, self._redraw)
+
+    def show_message(self, text: str) -> None:
+        self._message = text
+        self.request_redraw()
+
+    def _redraw(self) -> None:
+        self._redraw_id = None
+        self.canvas.delete("all")
+        if self._message is not None:
+            self.canvas.create_text(self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2,
+                                    text=self._message, fill=TEXT_COLOR)
+            return
+        self._draw(self.canvas.winfo_width(), self.canvas.winfo_height())
+
+    def _draw(self, width: int, height: int) -> None:
+        raise NotImplementedError
+
+
+class LineChart(_CanvasChart):
+    """
+    Time-series chart drawn straight onto a canvas.
+
+    The full series are kept as numpy arrays; each redraw takes only the visible date
+    range and reduces it with LTTB to about one point per horizontal pixel, so a
+    decades-long daily history costs the same to draw as a short one. Mouse wheel
+    zooms around the cursor, dragging pans and a double click resets the view.
+    """
+    MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 64, 16, 34, 28
+
+    def __init__(self, master, height: int = 320, **kwargs):
+        super().__init__(master, height, **kwargs)
+        self.title = ""
+        self.log_y = False
+        self._series: list[tuple[str, np.ndarray, np.ndarray]] = []
+        self._extent: tuple[float, float] = (0.0, 1.0)
+        self._view: tuple[float, float] = (0.0, 1.0)
+        self._drag_from: tuple[int, tuple[float, float]] | None = None
+
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(seq, self._on_wheel)
+        self.canvas.bind("<ButtonPress-1>", self._on_press)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<Double-1>", lambda e: self.reset_zoom())
+
+    def set_series(self, series: dict[str, pd.Series], title: str = "", log_y: bool = False) -> None:
+        """Replaces the plotted lines; *series* maps a legend label to a date-indexed Series."""
+        self.title, self.log_y = title, log_y
+        self._series = []
+        for label, values in series.items():
+            values = values.dropna().sort_index()
+            if values.empty:
+                continue
+            x = pd.DatetimeIndex(values.index).as_unit("ns").asi8 / NS_PER_DAY
+            y = values.to_numpy(dtype=float)
+            if log_y:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    y = np.log10(np.where(y > 0, y, np.nan))
+            self._series.append((str(label), x, y))
+        if not self._series:
+            self.show_message("No data to plot.")
+            return
+        self._extent = (min(x[0] for _, x, _ in self._series), max(x[-1] for _, x, _ in self._series))
+        self._message = None
+        self.reset_zoom()
+
+    def reset_zoom(self) -> None:
+        self._view = self._extent
+        self.request_redraw()
+
+    def _set_view(self, lo: float, hi: float) -> None:
+        span = min(hi - lo, self._extent[1] - self._extent[0])
+        lo = min(max(lo, self._extent[0]), self._extent[1] - span)
+        self._view = (lo, lo + max(span, 1.0))    # never zoom in past one day
+        self.request_redraw()
+
+    # ------------------------------------------------------------------ #
+    # interaction
+    # ------------------------------------------------------------------ #
+
+    def _x_at(self, px: float) -> float:
+        plot_w = max(self.canvas.winfo_width() - self.MARGIN_LEFT - self.MARGIN_RIGHT, 1)
+        frac = min(max((px - self.MARGIN_LEFT) / plot_w, 0.0), 1.0)
+        return self._view[0] + frac * (self._view[1] - self._view[0])
+
+    def _on_wheel(self, event) -> str:
+        if self._series:
+            zoom_in = getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0
+            factor = 0.8 if zoom_in else 1.25
+            anchor = self._x_at(event.x)
+            lo, hi = self._view
+            self._set_view(anchor - (anchor - lo) * factor, anchor + (hi - anchor) * factor)
+        return "break"    # keep the enclosing scrollable frame from scrolling too
+
+    def _on_press(self, event) -> None:
+        self._drag_from = (event.x, self._view)
+
+    def _on_drag(self, event) -> None:
+        if self._drag_from is None or not self._series:
+            return
+        start_px, (lo, hi) = self._drag_from
+        plot_w = max(self.canvas.winfo_width() - self.MARGIN_LEFT - self.MARGIN_RIGHT, 1)
+        shift = (start_px - event.x) / plot_w * (hi - lo)
+        self._set_view(lo + shift, hi + shift)
+
+    # ------------------------------------------------------------------ #
+    # drawing
+    # ------------------------------------------------------------------ #
+
+    def _draw(self, width: int, height: int) -> None:
+        left, right = self.MARGIN_LEFT, width - self.MARGIN_RIGHT
+        top, bottom = self.MARGIN_TOP, height - self.MARGIN_BOTTOM
+        plot_w = max(right - left, 3)
+        x_lo, x_hi = self._view
+
+        lines, y_lo, y_hi = [], np.inf, -np.inf
+        for label, x, y in self._series:
+            window = visible_slice(x, x_lo, x_hi)
+            if window.stop - window.start < 1:
+                continue
+            y_window = y[window]
+            if np.isfinite(y_window).any():
+                y_lo, y_hi = min(y_lo, np.nanmin(y_window)), max(y_hi, np.nanmax(y_window))
+            lines.append((label, *downsample(x[window], y_window, plot_w)))
+        if not np.isfinite(y_lo):
+            self.canvas.create_text(width / 2, height / 2, text="No data in range.", fill=TEXT_COLOR)
+            return
+        pad = (y_hi - y_lo) * 0.05 or 0.5
+        y_lo, y_hi = y_lo - pad, y_hi + pad
+
+        def to_px(xs, ys):
+            px = left + (xs - x_lo) / (x_hi - x_lo) * (right - left)
+            py = bottom - (ys - y_lo) / (y_hi - y_lo) * (bottom - top)
+            return np.column_stack((px, py)).ravel().tolist()
+
+        # drawn back to front: grid, lines, margin masks, then axes and text on top
+        y_ticks = _nice_ticks(y_lo, y_hi)
+        y_tick_px = bottom - (y_ticks - y_lo) / (y_hi - y_lo) * (bottom - top)
+        for py in y_tick_px:
+            self.canvas.create_line(left, py, right, py, fill=AXIS_COLOR, dash=(2, 4))
+        for i, (_, xs, ys) in enumerate(lines):
+            if len(xs) >= 2:
+                self.canvas.create_line(*to_px(xs, ys), fill=PALETTE[i % len(PALETTE)], width=1.5)
+        self.canvas.create_rectangle(0, 0, left - 1, height, fill=BG_COLOR, outline="")
+        self.canvas.create_rectangle(right + 1, 0, width, height, fill=BG_COLOR, outline="")
+        self.canvas.create_rectangle(left, 0, right, top - 1, fill=BG_COLOR, outline="")
+        self.canvas.create_rectangle(left, bottom + 1, right, height, fill=BG_COLOR, outline="")
+        self.canvas.create_rectangle(left, top, right, bottom, outline=AXIS_COLOR)
+
+        for tick, py in zip(y_ticks, y_tick_px):
+            value = 10 ** tick if self.log_y else tick
+            self.canvas.create_text(left - 6, py, text=f"{value:,.2f}", anchor="e", fill=TEXT_COLOR, font=("TkDefaultFont", 9))
+        span_days = x_hi - x_lo
+        date_fmt = "%Y" if span_days > 5 * 365 else ("%Y-%m" if span_days > 180 else "%Y-%m-%d")
+        for tick in np.linspace(x_lo, x_hi, 6):
+            px = left + (tick - x_lo) / (x_hi - x_lo) * (right - left)
+            label = pd.Timestamp(int(tick * NS_PER_DAY)).strftime(date_fmt)
+            self.canvas.create_text(px, bottom + 6, text=label, anchor="n", fill=TEXT_COLOR, font=("TkDefaultFont", 9))
+
+        self.canvas.create_text(left, 8, text=self.title, anchor="nw", fill=TEXT_COLOR, font=("TkDefaultFont", 11, "bold"))
+        legend_x = right
+        for i, (label, _, _) in reversed(list(enumerate(lines))):
+            text_id = self.canvas.create_text(legend_x, 10, text=label, anchor="ne", fill=PALETTE[i % len(PALETTE)], font=("TkDefaultFont", 10))
+            legend_x = self.canvas.bbox(text_id)[0] - 14
+
+
+class PieChart(_CanvasChart):
+    """Donut chart of a handful of weights with a legend, drawn on a canvas."""
+    def __init__(self, master, height: int = 300, **kwargs):
+        super().__init__(master, height, **kwargs)
+        self.title = ""
+        self._labels: list[str] = []
+        self._values = np.empty(0)
+
+    def set_data(self, labels: list[str], values, title: str = "") -> None:
+        values = np.asarray(values, dtype=float)
+        keep = np.isfinite(values) & (values > 0)
+        self._labels = [str(label) for label, k in zip(labels, keep) if k]
+        self._values = values[keep]
+        self.title = title
+        if not len(self._values):
+            self.show_message("No weights to plot.")
+            return
+        self._message = None
+        self.request_redraw()
+
+    def _draw(self, width: int, height: int) -> None:
+        self.canvas.create_text(10, 8, text=self.title, anchor="nw", fill=TEXT_COLOR, font=("TkDefaultFont", 11, "bold"))
+        size = max(min(height - 50, width / 2 - 20), 20)
+        x0, y0 = 20, 36
+        fractions = self._values / self._values.sum()
+        start = 90.0
+        for i, fraction in enumerate(fractions):
+            extent = -360.0 * fraction
+            color = PALETTE[i % len(PALETTE)]
+            if fraction >= 0.9999:
+                self.canvas.create_oval(x0, y0, x0 + size, y0 + size, fill=color, outline=BG_COLOR)
+            else:
+                self.canvas.create_arc(x0, y0, x0 + size, y0 + size, start=start, extent=extent, fill=color, outline=BG_COLOR, style=tk.PIESLICE)
+            start += extent
+            legend_y = y0 + 4 + i * 18
+            if legend_y < height - 10:
+                self.canvas.create_rectangle(x0 + size + 24, legend_y, x0 + size + 34, legend_y + 10, fill=color, outline="")
+                self.canvas.create_text(x0 + size + 40, legend_y + 5, text=f"{self._labels[i]}  {fraction * 100:.1f}%",
+                                        anchor="w", fill=TEXT_COLOR, font=("TkDefaultFont", 10))
+        hole = size * 0.3
+        cx, cy = x0 + size / 2, y0 + size / 2
+        self.canvas.create_oval(cx - hole, cy - hole, cx + hole, cy + hole, fill=BG_COLOR, outline=BG_COLOR)
+        self.canvas.create_text(cx, cy, text="Funds", fill=TEXT_COLOR, font=("TkDefaultFont", 12))
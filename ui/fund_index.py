@@ -0,0 +1,118 @@
+from __future__ import annotations
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+NGRAM = 3
+
+
+def _ngrams(text: str, n: int = NGRAM) -> set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class FundSearchIndex:
+    """
+    Trigram index over fund display names and their tickers.
+
+    Built once per universe load. A query of three or more characters intersects
+    the posting lists of its trigrams and verifies the few remaining candidates;
+    shorter queries fall back to one vectorised substring scan. Results are ids into
+    the alphabetically sorted name list, so they come back already sorted.
+    """
+    def __init__(self, display_names: list[str], disp2tkrs: dict[str, list[str]], display_map: dict[str, str]):
+        self.names = sorted(display_names)
+        tickers = [disp2tkrs.get(name, []) for name in self.names]
+        # name and tickers in one string; the separator keeps matches from spanning fields
+        self._text = pd.Series([name.lower() + "\x1f" + "\x1f".join(tkrs) for name, tkrs in zip(self.names, tickers)], dtype=object)
+        self._full_names = pd.Series([str(display_map.get(name, name)).lower() for name in self.names], dtype=object)
+        self._provider_ids: dict[str, np.ndarray] = {}
+
+        postings: dict[str, list[int]] = defaultdict(list)
+        for idx, text in enumerate(self._text):
+            for gram in _ngrams(text):
+                postings[gram].append(idx)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def provider_ids(self, provider: str | None) -> np.ndarray | None:
+        """Ids of funds whose full name starts with *provider*; None means no provider filter."""
+        provider = (provider or "").lower()
+        if provider in ("", "all", "n/a"):
+            return None
+        if provider not in self._provider_ids:
+            mask = self._full_names.str.startswith(provider).to_numpy(dtype=bool)
+            self._provider_ids[provider] = np.flatnonzero(mask).astype(np.int32)
+        return self._provider_ids[provider]
+
+    def search(self, query: str, provider: str | None = None) -> list[str]:
+        """Display names containing *query* in the name or a ticker, restricted to *provider*."""
+        query = query.lower().strip()
+        scope = self.provider_ids(provider)
+        if not query:
+            ids = scope if scope is not None else np.arange(len(self.names))
+        elif len(query) < NGRAM:
+            candidates = scope if scope is not None else np.arange(len(self.names))
+            ids = candidates[self._text.iloc[candidates].str.contains(query, regex=False).to_numpy(dtype=bool)]
+        else:
+            ids = None
+            # rarest grams first keeps the intersections small
+            for gram in sorted(_ngrams(query), key=lambda g: len(self._postings.get(g, ()))):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return []
+                ids = posting if ids is None else np.intersect1d(ids, posting, assume_unique=True)
+                if not len(ids):
+                    return []
+            if scope is not None:
+                ids = np.intersect1d(ids, scope, assume_unique=True)
+            ids = [i for i in ids if query in self._text.iat[i]]
+        return [self.names[i] for i in ids]
+
+
+def _is_missing_label(label: str) -> bool:
+    return not label or label.lower() == "nan"
+
+
+class FundVariantIndex:
+    """
+    Share-class variants of every fund, grouped once per universe load.
+
+    Maps fund name -> "currency – hedging" label -> distribution -> row position in
+    the universe frame, so populating the dropdowns and resolving the selected
+    variant are dictionary lookups instead of masks over the whole frame.
+    """
+    SEPARATOR = " – "
+
+    def __init__(self, fund_data: pd.DataFrame):
+        self.fund_data = fund_data
+        self._variants: dict[str, dict[str, dict[str, int]]] = {}
+        if fund_data.empty or "name" not in fund_data.columns:
+            return
+        n = len(fund_data)
+        columns = [fund_data[col].astype(str).to_numpy() if col in fund_data.columns else np.full(n, "nan", dtype=object)
+                   for col in ("currency", "hedging", "distribution")]
+        for pos, (name, cur, hed, dist) in enumerate(zip(fund_data["name"].to_numpy(), *columns)):
+            if not isinstance(name, str):
+                continue
+            # first row wins, matching the previous mask-and-take-first lookup
+            self._variants.setdefault(name, {}).setdefault(f"{cur}{self.SEPARATOR}{hed}", {}).setdefault(dist, pos)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._variants
+
+    def currency_options(self, name: str) -> list[str]:
+        """Sorted "currency – hedging" labels of *name*."""
+        return sorted(label for label in self._variants.get(name, {})
+                      if label.lower().replace(" ", "") != "nan–nan")
+
+    def distribution_options(self, name: str, currency_label: str) -> list[str]:
+        """Sorted distribution policies available for one currency/hedging variant."""
+        return sorted(dist for dist in self._variants.get(name, {}).get(currency_label, {}) if not _is_missing_label(dist))
+
+    def row(self, name: str, currency_label: str, distribution: str) -> pd.DataFrame:
+        """One-row frame of the selected variant; empty if it is not in the universe."""
+        pos = self._variants.get(name, {}).get(currency_label, {}).get(distribution)
+        return self.fund_data.iloc[[]] if pos is None else self.fund_data.iloc[[pos]]
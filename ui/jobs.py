@@ -0,0 +1,127 @@
+from __future__ import annotations
+import itertools
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it was cancelled or superseded."""
+
+
+class JobContext:
+    """Handed to every job function for progress reporting and cooperative cancellation."""
+    def __init__(self, key: str, generation: int, events: queue.Queue):
+        self.key = key
+        self.generation = generation
+        self._events = events
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(self.key)
+
+    def progress(self, fraction: float, message: str = "") -> None:
+        """Reports progress (0..1). Also a cancellation point."""
+        self.check_cancelled()
+        self._events.put(("progress", self.key, self.generation, (fraction, message)))
+
+
+@dataclass
+class _Job:
+    context: JobContext
+    on_done: Callable[[Any], None] | None
+    on_error: Callable[[Exception], None] | None
+    on_progress: Callable[[float, str], None] | None
+    on_cancelled: Callable[[], None] | None
+
+
+class JobScheduler:
+    """
+    Runs analytics off the Tk main thread.
+
+    Jobs are keyed: submitting a job under a key that is still running cancels the
+    older one, and any result it produces afterwards is discarded. Workers never touch
+    widgets; all callbacks are delivered from one queue drained by ``after`` on the
+    Tk thread.
+    """
+    def __init__(self, widget: tk.Misc, max_workers: int = 2, poll_ms: int = 50):
+        self._widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analytics")
+        self._events: queue.Queue = queue.Queue()
+        self._jobs: dict[str, _Job] = {}
+        self._generations = itertools.count(1)
+        self._poll_ms = poll_ms
+        self._closed = False
+        self._widget.after(self._poll_ms, self._drain)
+
+    def submit(self, key: str, fn: Callable[[JobContext], Any], *,
+               on_done: Callable[[Any], None] | None = None,
+               on_error: Callable[[Exception], None] | None = None,
+               on_progress: Callable[[float, str], None] | None = None,
+               on_cancelled: Callable[[], None] | None = None) -> JobContext:
+        """Schedules ``fn(context)`` on the worker pool, superseding a running job with the same key."""
+        self.cancel(key)
+        context = JobContext(key, next(self._generations), self._events)
+        self._jobs[key] = _Job(context, on_done, on_error, on_progress, on_cancelled)
+        self._executor.submit(self._run, context, fn)
+        return context
+
+    def cancel(self, key: str) -> bool:
+        job = self._jobs.get(key)
+        if job is None:
+            return False
+        job.context.cancel()
+        return True
+
+    def is_running(self, key: str) -> bool:
+        return key in self._jobs
+
+    def _run(self, context: JobContext, fn: Callable[[JobContext], Any]) -> None:
+        try:
+            result = fn(context)
+            context.check_cancelled()
+            self._events.put(("done", context.key, context.generation, result))
+        except JobCancelled:
+            self._events.put(("cancelled", context.key, context.generation, None))
+        except Exception as e:
+            self._events.put(("error", context.key, context.generation, e))
+
+    def _drain(self) -> None:
+        """The single point where job events reach the UI."""
+        if self._closed:
+            return
+        while True:
+            try:
+                kind, key, generation, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            job = self._jobs.get(key)
+            if job is None or job.context.generation != generation:
+                continue    # superseded job
+            if kind == "progress":
+                if job.on_progress and not job.context.cancelled:
+                    job.on_progress(*payload)
+                continue
+            del self._jobs[key]
+            callback = {"done": job.on_done, "error": job.on_error, "cancelled": job.on_cancelled}[kind]
+            if callback is not None:
+                callback(payload) if kind != "cancelled" else callback()
+        self._widget.after(self._poll_ms, self._drain)
+
+    def shutdown(self) -> None:
+        self._closed = True
+        for job in self._jobs.values():
+            job.context.cancel()
+        self._jobs.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,35 +1,52 @@
 from __future__ import annotations
 import pandas as pd
-import numpy as np
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog
 from collections import defaultdict
 from tkinter import messagebox, ttk
 from pathlib import Path
-import matplotlib
-matplotlib.use("TkAgg")
-import json
+from typing import Callable, Iterable
 import threading
 import time
-import webbrowser
 from ..ishares import universe
-from ..ishares.fetch import IsharesSession
-from ..ishares.parse import FundSheets
-from ..portfolio.combined_holdings import calculate_combined_holdings, calculate_portfolio_weights
-from ..portfolio.backtester import PortfolioBacktester
+from ..ishares.download import download_fund_details
+from ..ishares.store import DEFAULT_STORE_DIR, FundDataStore, LazyFundData
+from ..portfolio.combined_holdings import calculate_portfolio_weights, calculate_position_amounts
+from ..portfolio.lookthrough import LookThroughEngine
+from ..portfolio.security_master import SecurityMaster
+from ..portfolio.model import PortfolioModel, read_portfolio_csv, SAVED_COLUMNS, RESET as PORTFOLIO_RESET
+from ..portfolio.exposure_cube import ExposureCube, CUBE_DIMENSIONS
+from ..portfolio.backtester import PortfolioBacktester, prepare_backtest_inputs
+from ..portfolio.returns_panel import ReturnsPanel
+from ..portfolio.risk import risk_statistics
+from ..portfolio.comparison import PortfolioComparison
+from ..portfolio.backtest_cache import BacktestCache, cached_risk_free_rate
+from ..portfolio.stress import StressTester
+from ..portfolio.benchmark import BenchmarkAnalyzer, relative_statistics
+from ..portfolio.screener import Screener, build_metrics_table, METRIC_COLUMNS
 from ..portfolio.optimize import PortfolioOptimizer
+from .jobs import JobScheduler, JobContext
+from .virtual_table import VirtualTable
+from .fund_index import FundSearchIndex, FundVariantIndex
+from .chart_panel import LineChart, PieChart
 from .. import config
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("green")
 
-Path("data/raw").mkdir(parents=True, exist_ok=True)
-ctk.set_appearance_mode("dark"); ctk.set_default_color_theme("green") 
+EXPOSURE_DIMENSION_LABELS = {"sector": "Sector", "country": "Country", "currency": "Currency", "asset_class": "Asset Class"}
+EXPOSURE_DIMENSION_KEYS = {label: dim for dim, label in EXPOSURE_DIMENSION_LABELS.items()}
+ANALYTICS_JOB = "analytics"
+METRICS_JOB = "metrics"
+SEARCH_DEBOUNCE_MS = 150
+SCREEN_PENDING_COLOR = "orange"
+BENCHMARK_CLOSEST_FUNDS = 5
 
 class FundSelectorApp(ctk.CTk):
     def __init__(self):
         super().__init__()
+        config.ensure_data_dirs()
         self.title("ETF Portfolio Builder")
         self.geometry("1500x850")
         self.minsize(1300, 750)
@@ -38,20 +55,38 @@ class FundSelectorApp(ctk.CTk):
         self.table_header_font = ctk.CTkFont(size=13, weight="bold")
         self.table_row_font = ctk.CTkFont(size=12)
         
-        self.portfolio: list[pd.DataFrame] = [] 
+        self.portfolio = PortfolioModel()
+        self.portfolio.subscribe(self._on_portfolio_changed)
         self.fund_data: pd.DataFrame = pd.DataFrame() 
-        self.detailed_fund_data: dict[str, dict[str, pd.DataFrame]] = {}
-        self.last_data_pull_info: dict | None = None 
+        self.security_master: SecurityMaster = SecurityMaster()    # loaded from disk after the window is up
+        self.fund_store = FundDataStore(DEFAULT_STORE_DIR)    # only the index is read here, frames load on first access
+        self.detailed_fund_data: LazyFundData = self.fund_store.mapping()
+        self.latest_prices: pd.DataFrame = self.fund_store.latest_prices()
+        self.returns_panels: dict[str, ReturnsPanel] = {}    # per portfolio currency, synced on the worker pool before each run
+        self.stress_testers: dict[str, StressTester] = {}    # per portfolio currency, matching returns_panels
+        self.screeners: dict[str, Screener] = {}    # per portfolio currency, built on the worker pool after each data refresh
+        self.backtest_cache = BacktestCache.for_store(self.fund_store)
+        self.lookthrough: LookThroughEngine | None = None
+        self.exposure_cube: ExposureCube | None = None
+        self.exposure_filters: dict[str, str] = {}
+        self.last_data_pull_info: dict | None = self.fund_store.meta.get("last_data_pull")
         self.display_map: dict[str, str] = {}
         self.full_to_disp: dict[str, str] = {}
         self.tkr2disp: dict[str, str] = {}
         self.disp2tkrs: defaultdict[str, list[str]] = defaultdict(list)
         self.all_disp_names: list[str] = []
+        self.fund_search_index: FundSearchIndex | None = None
+        self.fund_variants: FundVariantIndex | None = None
+        self._listbox_names: list[str] = []
+        self._search_after_id: str | None = None
         self.cur_trace_id: str | None = None
         self.dist_trace_id: str | None = None
         self.is_loading_data: bool = False 
         self.is_downloading_details: bool = False
         self.portfolio_currency_var = tk.StringVar(value=config.PORTFOLIO_CURRENCIES[0])
+        self.jobs = JobScheduler(self)
+        self._panel_sync_lock = threading.Lock()    # serializes returns panel and stress window rebuilds
+        self._metrics_lock = threading.Lock()    # serializes screener metrics table rebuilds
 
         # --- Main UI Structure ---
         top_bar_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -105,7 +140,18 @@ class FundSelectorApp(ctk.CTk):
         self.search_var  = tk.StringVar()
         self.search_entry = ctk.CTkEntry(filter_frame, textvariable=self.search_var, placeholder_text="Search fund name or ticker …")
         self.search_entry.grid(row=0, column=1, sticky="ew")
-        self.search_entry.bind("<KeyRelease>", self.update_fund_list_display)
+        self.search_entry.bind("<KeyRelease>", self._schedule_fund_search)
+
+        self.screen_sort_var = tk.StringVar(value="Sort: Name")
+        self.screen_sort_dd = ctk.CTkOptionMenu(filter_frame, variable=self.screen_sort_var, values=["Sort: Name"] + METRIC_COLUMNS,
+                                                command=lambda _: self.update_fund_list_display(), width=180)
+        self.screen_sort_dd.grid(row=1, column=0, sticky="w", padx=(0,10), pady=(5,0))
+
+        self.screen_var = tk.StringVar()
+        self.screen_entry = ctk.CTkEntry(filter_frame, textvariable=self.screen_var, placeholder_text="Screen, e.g. sharpe_1y > 0.5, volatility_1y < 15%")
+        self.screen_entry.grid(row=1, column=1, sticky="ew", pady=(5,0))
+        self.screen_entry.bind("<KeyRelease>", self._schedule_fund_search)
+        self._screen_border_color = self.screen_entry.cget("border_color")
         
         left_panel = ctk.CTkFrame(tab_frame)
         left_panel.grid(row=1, column=0, sticky="nsew", padx=(10,5), pady=(0,10))
@@ -158,15 +204,19 @@ class FundSelectorApp(ctk.CTk):
         top_holdings_frame = ctk.CTkFrame(scrollable_dashboard_frame)
         top_holdings_frame.grid(row=1, column=0, sticky="new", padx=10, pady=10)
         top_holdings_frame.grid_columnconfigure(0, weight=1) 
-        ctk.CTkLabel(top_holdings_frame, text="Top Consolidated Holdings", font=ctk.CTkFont(weight="bold", size=16)).grid(row=0, column=0, columnspan=2, sticky="w", pady=(0,5))
-        holdings_cols = ("ticker", "name", "sector", "weight")
-        self.top_holdings_treeview = ttk.Treeview(top_holdings_frame, columns=holdings_cols, show="headings", height=18) 
-        self.top_holdings_treeview.heading("ticker", text="Ticker"); self.top_holdings_treeview.column("ticker", width=120, anchor=tk.W, stretch=tk.NO)
-        self.top_holdings_treeview.heading("name", text="Name"); self.top_holdings_treeview.column("name", width=350, anchor=tk.W, stretch=tk.YES)
-        self.top_holdings_treeview.heading("sector", text="Sector"); self.top_holdings_treeview.column("sector", width=200, anchor=tk.W, stretch=tk.NO)
-        self.top_holdings_treeview.heading("weight", text="Weight (%)"); self.top_holdings_treeview.column("weight", width=100, anchor=tk.E, stretch=tk.NO)
-        self.top_holdings_treeview.grid(row=1, column=0, sticky="nsew", pady=(0,5))
-        holdings_scrollbar = ctk.CTkScrollbar(top_holdings_frame, command=self.top_holdings_treeview.yview); holdings_scrollbar.grid(row=1, column=1, sticky="ns", pady=(0,5)); self.top_holdings_treeview.configure(yscrollcommand=holdings_scrollbar.set)
+        ctk.CTkLabel(top_holdings_frame, text="Consolidated Holdings", font=ctk.CTkFont(weight="bold", size=16)).grid(row=0, column=0, sticky="w", pady=(0,5))
+        self.holdings_filter_var = tk.StringVar()
+        holdings_filter_entry = ctk.CTkEntry(top_holdings_frame, textvariable=self.holdings_filter_var, placeholder_text="Filter ticker, name or sector …", width=260)
+        holdings_filter_entry.grid(row=0, column=1, sticky="e", pady=(0,5))
+        holdings_filter_entry.bind("<KeyRelease>", lambda e: self.top_holdings_table.set_filter(self.holdings_filter_var.get()))
+        self.top_holdings_table = VirtualTable(
+            top_holdings_frame,
+            columns=[("ticker", "Ticker", 120, tk.W, tk.NO), ("name", "Name", 350, tk.W, tk.YES),
+                     ("sector", "Sector", 200, tk.W, tk.NO), ("weight", "Weight (%)", 100, tk.E, tk.NO)],
+            height=18, formatters={"weight": lambda v: f"{v:.2f}"},
+        )
+        self.top_holdings_table.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(0,5))
+        self.top_holdings_table.sort_by("weight", ascending=False)
         
         style = ttk.Style()
         bg_color = "#2B2B2B"; text_color = "#DCE4EE"; selected_color = "#2A8C55"; header_bg_color = "#343638"
@@ -185,8 +235,20 @@ class FundSelectorApp(ctk.CTk):
         self.rebalancing_period_var = tk.StringVar(value=list(config.REBALANCING_PERIODS.keys())[0])
         rebalance_dd = ctk.CTkOptionMenu(backtest_controls_frame, variable=self.rebalancing_period_var, values=list(config.REBALANCING_PERIODS.keys()))
         rebalance_dd.pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(backtest_controls_frame, text="Benchmark:").pack(side=tk.LEFT, padx=(10,0))
+        self.benchmark_var = tk.StringVar()
+        ctk.CTkEntry(backtest_controls_frame, textvariable=self.benchmark_var, placeholder_text="ticker", width=90).pack(side=tk.LEFT, padx=5)
         run_backtest_btn = ctk.CTkButton(backtest_controls_frame, text="Run Backtest & Optimize", command=self._run_optimization)
         run_backtest_btn.pack(side=tk.LEFT, padx=5)
+        compare_btn = ctk.CTkButton(backtest_controls_frame, text="Compare Portfolios…", command=self._run_comparison)
+        compare_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_analytics_btn = ctk.CTkButton(backtest_controls_frame, text="Cancel", width=80, state="disabled", command=lambda: self.jobs.cancel(ANALYTICS_JOB))
+        self.cancel_analytics_btn.pack(side=tk.LEFT, padx=5)
+        self.analytics_progress = ctk.CTkProgressBar(backtest_controls_frame, mode="determinate", width=200)
+        self.analytics_progress.set(0)
+        self.analytics_progress.pack(side=tk.LEFT, padx=(15,5))
+        self.analytics_status_label = ctk.CTkLabel(backtest_controls_frame, text="", anchor="w")
+        self.analytics_status_label.pack(side=tk.LEFT, padx=5)
         
         # --- New Weights Comparison Table ---
         weights_frame = ctk.CTkFrame(backtester_frame)
@@ -205,57 +267,250 @@ class FundSelectorApp(ctk.CTk):
         stats_frame.grid(row=3, column=0, sticky="nsew", padx=5, pady=5)
         stats_frame.grid_columnconfigure(0, weight=1)
         
-        stats_cols = ("period", "ret_orig", "std_orig", "sharpe_orig", "ret_opt", "std_opt", "sharpe_opt")
-        self.stats_treeview = ttk.Treeview(stats_frame, columns=stats_cols, show="headings", height=11)
-        self.stats_treeview.heading("period", text="Period"); self.stats_treeview.column("period", width=120, anchor=tk.W)
-        self.stats_treeview.heading("ret_orig", text="Return (Orig)"); self.stats_treeview.column("ret_orig", width=120, anchor=tk.E)
-        self.stats_treeview.heading("std_orig", text="Std. Dev. (Orig)"); self.stats_treeview.column("std_orig", width=120, anchor=tk.E)
-        self.stats_treeview.heading("sharpe_orig", text="Sharpe (Orig)"); self.stats_treeview.column("sharpe_orig", width=120, anchor=tk.E)
-        self.stats_treeview.heading("ret_opt", text="Return (Opt)"); self.stats_treeview.column("ret_opt", width=120, anchor=tk.E)
-        self.stats_treeview.heading("std_opt", text="Std. Dev. (Opt)"); self.stats_treeview.column("std_opt", width=120, anchor=tk.E)
-        self.stats_treeview.heading("sharpe_opt", text="Sharpe (Opt)"); self.stats_treeview.column("sharpe_opt", width=120, anchor=tk.E)
-        self.stats_treeview.grid(row=0, column=0, sticky="ew")
+        self.stats_table = VirtualTable(
+            stats_frame,
+            columns=[("period", "Period", 120, tk.W, tk.YES), ("ret_orig", "Return (Orig)", 120, tk.E, tk.YES),
+                     ("std_orig", "Std. Dev. (Orig)", 120, tk.E, tk.YES), ("sharpe_orig", "Sharpe (Orig)", 120, tk.E, tk.YES),
+                     ("ret_opt", "Return (Opt)", 120, tk.E, tk.YES), ("std_opt", "Std. Dev. (Opt)", 120, tk.E, tk.YES),
+                     ("sharpe_opt", "Sharpe (Opt)", 120, tk.E, tk.YES)],
+            height=11, sortable=False,
+        )
+        self.stats_table.grid(row=0, column=0, sticky="ew")
+
+        self.risk_table = VirtualTable(
+            stats_frame,
+            columns=[("period", "Period", 120, tk.W, tk.YES), ("portfolio", "Portfolio", 90, tk.W, tk.YES),
+                     ("var_hist", "VaR 95%", 80, tk.E, tk.YES), ("cvar_hist", "CVaR 95%", 80, tk.E, tk.YES),
+                     ("var_param", "VaR (Normal)", 90, tk.E, tk.YES), ("cvar_param", "CVaR (Normal)", 90, tk.E, tk.YES),
+                     ("max_drawdown", "Max Drawdown", 100, tk.E, tk.YES), ("drawdown_days", "DD Days", 70, tk.E, tk.YES),
+                     ("sortino", "Sortino", 70, tk.E, tk.YES), ("calmar", "Calmar", 70, tk.E, tk.YES)],
+            height=11, sortable=False,
+        )
+        self.risk_table.grid(row=1, column=0, sticky="ew", pady=(5,0))
+
+        self.stress_table = VirtualTable(
+            stats_frame,
+            columns=[("scenario", "Stress Scenario", 180, tk.W, tk.YES), ("portfolio", "Portfolio", 90, tk.W, tk.YES),
+                     ("window", "Window", 180, tk.W, tk.YES), ("return", "Return", 90, tk.E, tk.YES),
+                     ("max_drawdown", "Max Drawdown", 100, tk.E, tk.YES), ("worst_day", "Worst Day", 90, tk.E, tk.YES),
+                     ("coverage", "Weight with History", 130, tk.E, tk.YES)],
+            height=6, sortable=False,
+        )
+        self.stress_table.grid(row=2, column=0, sticky="ew", pady=(5,0))
+
+        pct = lambda v: f"{v * 100:.2f}%" if pd.notna(v) else "–"
+        ratio = lambda v: f"{v:.2f}" if pd.notna(v) else "–"
+        self.benchmark_table = VirtualTable(
+            stats_frame,
+            columns=[("name", "Portfolio / Fund", 150, tk.W, tk.YES), ("benchmark", "Relative To", 120, tk.W, tk.YES),
+                     ("tracking_error", "Tracking Error", 110, tk.E, tk.YES), ("beta", "Beta", 70, tk.E, tk.YES),
+                     ("alpha", "Alpha", 80, tk.E, tk.YES), ("information_ratio", "Info. Ratio", 90, tk.E, tk.YES),
+                     ("correlation", "Corr.", 70, tk.E, tk.YES), ("up_capture", "Up Capture", 90, tk.E, tk.YES),
+                     ("down_capture", "Down Capture", 100, tk.E, tk.YES)],
+            height=8, sortable=False,
+            formatters={"tracking_error": pct, "alpha": pct, "up_capture": pct, "down_capture": pct,
+                        "beta": ratio, "information_ratio": ratio, "correlation": ratio},
+        )
+        self.benchmark_table.grid(row=3, column=0, sticky="ew", pady=(5,0))
+
+        self.performance_chart = LineChart(backtester_frame, height=340)
+        self.performance_chart.grid(row=4, column=0, sticky="ew", padx=5, pady=5)
+        self.performance_chart.show_message("Run a backtest to see the performance chart (wheel: zoom, drag: pan, double-click: reset).")
+
+        comparison_frame = ctk.CTkFrame(backtester_frame)
+        comparison_frame.grid(row=5, column=0, sticky="ew", padx=5, pady=5)
+        comparison_frame.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(comparison_frame, text="Portfolio Comparison", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, sticky="w", pady=(0,5))
+        self.comparison_table = VirtualTable(
+            comparison_frame,
+            columns=[("rank", "#", 40, tk.E, tk.NO), ("portfolio", "Portfolio", 180, tk.W, tk.YES),
+                     ("return", "Return", 90, tk.E, tk.YES), ("annual_return", "Ann. Return", 90, tk.E, tk.YES),
+                     ("std_dev", "Std. Dev.", 90, tk.E, tk.YES), ("sharpe", "Sharpe", 70, tk.E, tk.YES),
+                     ("sortino", "Sortino", 70, tk.E, tk.YES), ("calmar", "Calmar", 70, tk.E, tk.YES),
+                     ("max_drawdown", "Max Drawdown", 100, tk.E, tk.YES), ("cvar_hist", "CVaR 95%", 80, tk.E, tk.YES)],
+            height=8,
+            formatters={"return": pct, "annual_return": pct, "std_dev": pct, "max_drawdown": pct, "cvar_hist": pct,
+                        "sharpe": ratio, "sortino": ratio, "calmar": ratio},
+        )
+        self.comparison_table.grid(row=1, column=0, sticky="ew")
         
+        exposure_frame = ctk.CTkFrame(scrollable_dashboard_frame)
+        exposure_frame.grid(row=3, column=0, sticky="new", padx=10, pady=10)
+        exposure_frame.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(exposure_frame, text="Look-Through Exposure", font=ctk.CTkFont(weight="bold", size=16)).grid(row=0, column=0, sticky="w", pady=(0,5), padx=5)
+        exposure_controls_frame = ctk.CTkFrame(exposure_frame, fg_color="transparent")
+        exposure_controls_frame.grid(row=1, column=0, sticky="ew", padx=5)
+        ctk.CTkLabel(exposure_controls_frame, text="Group by:").pack(side=tk.LEFT)
+        self.exposure_by_var = tk.StringVar(value=EXPOSURE_DIMENSION_LABELS[CUBE_DIMENSIONS[0]])
+        ctk.CTkOptionMenu(exposure_controls_frame, variable=self.exposure_by_var, values=list(EXPOSURE_DIMENSION_LABELS.values()), command=lambda _: self._update_exposure_display()).pack(side=tk.LEFT, padx=5)
+        ctk.CTkButton(exposure_controls_frame, text="Reset Drill-Down", width=130, command=self._reset_exposure_drilldown).pack(side=tk.LEFT, padx=5)
+        self.exposure_path_label = ctk.CTkLabel(exposure_controls_frame, text="All holdings", anchor="w")
+        self.exposure_path_label.pack(side=tk.LEFT, padx=10)
+        exposure_cols = ("group", "weight")
+        self.exposure_treeview = ttk.Treeview(exposure_frame, columns=exposure_cols, show="headings", height=10)
+        self.exposure_treeview.heading("group", text="Group"); self.exposure_treeview.column("group", width=350, anchor=tk.W, stretch=tk.YES)
+        self.exposure_treeview.heading("weight", text="Weight (%)"); self.exposure_treeview.column("weight", width=100, anchor=tk.E, stretch=tk.NO)
+        self.exposure_treeview.grid(row=2, column=0, sticky="nsew", pady=5, padx=5)
+        self.exposure_treeview.bind("<Double-1>", self._on_exposure_drilldown)
+
         pie_chart_frame = ctk.CTkFrame(scrollable_dashboard_frame)
         pie_chart_frame.grid(row=4, column=0, sticky="new", padx=10, pady=10)
         ctk.CTkLabel(pie_chart_frame, text="Portfolio Allocation", font=ctk.CTkFont(weight="bold", size=16)).pack(anchor="w", pady=(0,5))
-        self.allocation_chart_btn = ctk.CTkButton(pie_chart_frame, text="Show Allocation Chart (External)", command=self._generate_allocation_chart); self.allocation_chart_btn.pack(pady=5, anchor="w")
+        self.allocation_chart_btn = ctk.CTkButton(pie_chart_frame, text="Show Allocation Chart", command=self._generate_allocation_chart); self.allocation_chart_btn.pack(pady=5, anchor="w")
+        self.allocation_chart = PieChart(pie_chart_frame, height=280)
+        self.allocation_chart.pack(fill="x", expand=True, pady=(0,5))
         
         self._update_top_holdings_display()
 
     def _run_optimization(self):
-        asset_returns, portfolio_weights = self._prepare_backtest_data()
+        if self._has_backtest_data():
+            self._sync_returns_panel(self._start_optimization)
+
+    def _start_optimization(self, panel: ReturnsPanel, tester: StressTester):
+        asset_returns, portfolio_weights = self._prepare_backtest_data(panel)
         if asset_returns is None or portfolio_weights is None: return
 
         rebalance_period_name = self.rebalancing_period_var.get()
         rebalance_code = config.REBALANCING_PERIODS[rebalance_period_name]
-        portfolio_currency = self.portfolio_currency_var.get()
+        portfolio_currency = panel.currency
+        cache = self.backtest_cache
+        benchmark_ticker = self._benchmark_ticker(panel)
+        if benchmark_ticker is None: return
+
+        def job(ctx: JobContext):
+            ctx.progress(0.05, "Fetching risk-free rate…")
+            risk_free_rate = cached_risk_free_rate(portfolio_currency)
+            key = BacktestCache.key(portfolio_weights, panel, rebalance_code, kind="optimize")
+            cached = cache.get(key, risk_free_rate)
+            if cached is not None:
+                meta, frames = cached
+                performance = {f"{col} Portfolio": (1 + frames["returns"][col]).cumprod() for col in ("Original", "Optimized")}
+                stress = tester.run(frames["weights"].T.rename(index=str.title), rebalance_code)
+                relative = self._benchmark_analysis(panel, frames["returns"], benchmark_ticker, risk_free_rate, performance)
+                return (frames["weights"]["optimized"], meta["statistics"]["Original"], meta["statistics"]["Optimized"],
+                        frames["risk"].set_index(["portfolio", "period"]), stress, relative, performance)
 
-        try:
             original_backtester = PortfolioBacktester(
                 portfolio_weights=portfolio_weights, asset_returns=asset_returns,
-                rebalancing_period=rebalance_code, portfolio_currency=portfolio_currency
+                rebalancing_period=rebalance_code, portfolio_currency=portfolio_currency,
+                risk_free_rate=risk_free_rate
             )
+            ctx.progress(0.2, "Running backtest…")
             original_stats = original_backtester.calculate_statistics()
 
+            ctx.progress(0.3, "Optimizing weights…")
             optimizer = PortfolioOptimizer(original_backtester)
-            bounds = [(0, 1) for _ in range(len(portfolio_weights))]
-            constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-            optimized_weights = optimizer.optimize_portfolio(bounds=bounds, constraints=[constraints])
+            optimized_weights = optimizer.maximize_sharpe(callback=lambda _: ctx.check_cancelled())
 
+            ctx.progress(0.8, "Running optimized backtest…")
             optimized_backtester = PortfolioBacktester(
                 portfolio_weights=optimized_weights, asset_returns=asset_returns,
-                rebalancing_period=rebalance_code, portfolio_currency=portfolio_currency
+                rebalancing_period=rebalance_code, portfolio_currency=portfolio_currency,
+                risk_free_rate=original_backtester.risk_free_rate
             )
             optimized_stats = optimized_backtester.calculate_statistics()
-            
+            returns = pd.DataFrame({"Original": original_backtester.portfolio_return_series,
+                                    "Optimized": optimized_backtester.portfolio_return_series})
+            risk = risk_statistics(returns, risk_free_rate)
+            stress = tester.run(pd.DataFrame({"Original": portfolio_weights, "Optimized": optimized_weights}).T, rebalance_code)
+            cache.put(key, {"risk_free_rate": risk_free_rate, "statistics": {"Original": original_stats, "Optimized": optimized_stats}},
+                      {"weights": pd.DataFrame({"original": portfolio_weights, "optimized": optimized_weights}),
+                       "returns": returns, "risk": risk.reset_index()}, panel, portfolio_weights.index)
+
+            performance = {
+                "Original Portfolio": (1 + original_backtester.portfolio_return_series).cumprod(),
+                "Optimized Portfolio": (1 + optimized_backtester.portfolio_return_series).cumprod(),
+            }
+            relative = self._benchmark_analysis(panel, returns, benchmark_ticker, risk_free_rate, performance)
+            return optimized_weights, original_stats, optimized_stats, risk, stress, relative, performance
+
+        def on_done(result):
+            optimized_weights, original_stats, optimized_stats, risk, stress, relative, performance = result
+            self._finish_analytics_job("Optimization finished.")
             self._display_weights_comparison(portfolio_weights, optimized_weights)
             self._display_comparison_statistics(original_stats, optimized_stats)
-            self._plot_comparison_chart(original_backtester, optimized_backtester, rebalance_period_name)
+            self._display_risk_statistics(risk)
+            self._display_stress_results(stress)
+            self.benchmark_table.set_data(relative, keep_position=False)
+            self.performance_chart.set_series(performance, f"Original vs. Optimized Performance (Rebalanced {rebalance_period_name})", log_y=True)
 
-        except Exception as e:
+        def on_error(e: Exception):
+            self._finish_analytics_job("Optimization failed.")
             messagebox.showerror("Optimization Error", f"An error occurred during optimization:\n{e}", parent=self)
 
+        self._submit_analytics_job(job, on_done, on_error)
+
+    def _run_comparison(self):
+        paths = filedialog.askopenfilenames(title="Select Portfolios to Compare", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not paths:
+            return
+        portfolios, unreadable = {}, {}
+        for path in paths:
+            name = Path(path).stem
+            if name in portfolios:
+                name = f"{name}_{len(portfolios)}"
+            try:
+                portfolios[name] = read_portfolio_csv(path)
+            except Exception as e:
+                unreadable[name] = str(e)
+        if not portfolios:
+            messagebox.showwarning("No Portfolios", "None of the selected files could be read.", parent=self)
+            return
+
+        # one selection from the shared panel serves every portfolio
+        self._sync_returns_panel(lambda panel, _: self._start_comparison(panel, portfolios, unreadable))
+
+    def _start_comparison(self, panel: ReturnsPanel, portfolios: dict[str, pd.DataFrame], unreadable: dict[str, str]):
+        rebalance_period_name = self.rebalancing_period_var.get()
+        rebalance_code = config.REBALANCING_PERIODS[rebalance_period_name]
+        portfolio_currency = panel.currency
+
+        def job(ctx: JobContext):
+            ctx.progress(0.1, "Fetching risk-free rate…")
+            risk_free_rate = cached_risk_free_rate(portfolio_currency)
+            ctx.progress(0.4, f"Backtesting {len(portfolios)} portfolios…")
+            comparison = PortfolioComparison(portfolios, self.detailed_fund_data, panel, rebalance_code,
+                                             self.latest_prices, risk_free_rate)
+            ctx.check_cancelled()
+            return comparison.ranking(), comparison.cumulative_performance(), comparison.skipped
+
+        def on_done(result):
+            ranking, performance, skipped = result
+            self._finish_analytics_job("Comparison finished.")
+            self.comparison_table.set_data(ranking.reset_index()[self.comparison_table.keys], keep_position=False)
+            # the legend has room for the leaders only
+            shown = ranking.index[:8]
+            self.performance_chart.set_series({name: performance[name] for name in shown},
+                                              f"Top {len(shown)} of {len(ranking)} Portfolios by Sharpe (Rebalanced {rebalance_period_name})", log_y=True)
+            problems = {**unreadable, **skipped}
+            if problems:
+                details = "\n".join(f"{name}: {error}" for name, error in problems.items())
+                messagebox.showwarning("Portfolios Skipped", f"Not compared (download their fund details first):\n{details}", parent=self)
+
+        def on_error(e: Exception):
+            self._finish_analytics_job("Comparison failed.")
+            messagebox.showerror("Comparison Error", f"Could not compare the portfolios:\n{e}", parent=self)
+
+        self._submit_analytics_job(job, on_done, on_error)
+
+    def _submit_analytics_job(self, job, on_done, on_error):
+        """Runs *job* on the worker pool. A new analytics request supersedes the running one."""
+        self.analytics_progress.set(0)
+        self.analytics_status_label.configure(text="Starting…")
+        self.cancel_analytics_btn.configure(state="normal")
+        self.jobs.submit(ANALYTICS_JOB, job, on_done=on_done, on_error=on_error,
+                         on_progress=self._on_analytics_progress,
+                         on_cancelled=lambda: self._finish_analytics_job("Cancelled."))
+
+    def _on_analytics_progress(self, fraction: float, message: str):
+        self.analytics_progress.set(fraction)
+        self.analytics_status_label.configure(text=message)
+
+    def _finish_analytics_job(self, message: str):
+        self.analytics_progress.set(1.0 if message.endswith("finished.") else 0)
+        self.analytics_status_label.configure(text=message)
+        self.cancel_analytics_btn.configure(state="disabled")
+
     def _display_weights_comparison(self, original_weights: pd.Series, optimized_weights: pd.Series):
         """Displays a side-by-side comparison of portfolio weights."""
         for item in self.weights_treeview.get_children():
@@ -270,50 +525,17 @@ class FundSelectorApp(ctk.CTk):
 
     def _display_comparison_statistics(self, original_stats: dict, optimized_stats: dict):
         """Displays a side-by-side comparison of performance stats."""
-        for item in self.stats_treeview.get_children():
-            self.stats_treeview.delete(item)
-
+        rows = []
         for period_name in original_stats.keys():
             orig = original_stats[period_name]
             opt = optimized_stats[period_name]
 
             if pd.notna(orig['return']):
-                orig_ret_str = f"{orig['return'] * 100:.2f}%"
-                orig_std_str = f"{orig['std_dev'] * 100:.2f}%"
-                orig_sharpe_str = f"{orig['sharpe']:.2f}"
-                opt_ret_str = f"{opt['return'] * 100:.2f}%"
-                opt_std_str = f"{opt['std_dev'] * 100:.2f}%"
-                opt_sharpe_str = f"{opt['sharpe']:.2f}"
-                
-                self.stats_treeview.insert("", tk.END, values=(
-                    period_name, orig_ret_str, orig_std_str, orig_sharpe_str,
-                    opt_ret_str, opt_std_str, opt_sharpe_str
+                rows.append((
+                    period_name, f"{orig['return'] * 100:.2f}%", f"{orig['std_dev'] * 100:.2f}%", f"{orig['sharpe']:.2f}",
+                    f"{opt['return'] * 100:.2f}%", f"{opt['std_dev'] * 100:.2f}%", f"{opt['sharpe']:.2f}"
                 ))
-
-    def _plot_comparison_chart(self, original_bt: PortfolioBacktester, optimized_bt: PortfolioBacktester, rebalance_period: str):
-        """Generates and shows a Plotly chart comparing two backtest results."""
-        try:
-            import plotly.graph_objects as go
-            
-            orig_perf = (1 + original_bt.portfolio_return_series).cumprod()
-            opt_perf = (1 + optimized_bt.portfolio_return_series).cumprod()
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=orig_perf.index, y=orig_perf, mode='lines', name='Original Portfolio'))
-            fig.add_trace(go.Scatter(x=opt_perf.index, y=opt_perf, mode='lines', name='Optimized Portfolio'))
-            
-            fig.update_layout(
-                title=f"Original vs. Optimized Performance (Rebalanced {rebalance_period})",
-                xaxis_title="Date", yaxis_title="Cumulative Growth", yaxis_type="log"
-            )
-            chart_path = config.TEMP_DIR / "temp_comparison_chart.html"
-            fig.write_html(str(chart_path))
-            webbrowser.open(chart_path.resolve().as_uri())
-
-        except ImportError:
-            messagebox.showerror("Plotly Missing", "'plotly' library required. Please install it.", parent=self)
-        except Exception as e:
-            messagebox.showerror("Chart Error", f"Could not generate comparison chart: {e}", parent=self)
+        self.stats_table.set_data(pd.DataFrame(rows, columns=self.stats_table.keys), keep_position=False)
 
     def _apply_appearance_mode(self, color_tuple_or_str):
         if isinstance(color_tuple_or_str, (list, tuple)): 
@@ -323,20 +545,19 @@ class FundSelectorApp(ctk.CTk):
     def _update_dashboard_displays(self): 
         print("Refreshing dashboard displays...")
         self._update_top_holdings_display()
+        self._update_exposure_display()
 
     def _update_top_holdings_display(self):
-        for item in self.top_holdings_treeview.get_children(): self.top_holdings_treeview.delete(item)
-
         if not self.portfolio or not self.detailed_fund_data:
-            self.top_holdings_treeview.insert("", tk.END, values=("Portfolio is empty.", "", "", ""))
+            self.top_holdings_table.set_message("Portfolio is empty.")
             self.portfolio_total_value_label.configure(text="Total Portfolio Value: N/A")
             return
             
         try:
-            active_portfolio_df = pd.concat(self.portfolio, ignore_index=True)
+            active_portfolio_df = self.portfolio.frame()
             
             # --- Calculate Total Value and Update Label ---
-            _, total_value = calculate_portfolio_weights(active_portfolio_df, self.detailed_fund_data)
+            _, total_value = calculate_portfolio_weights(active_portfolio_df, self.detailed_fund_data, self.latest_prices)
             if total_value is not None:
                 currency_symbol = self.portfolio_currency_var.get()
                 self.portfolio_total_value_label.configure(text=f"Total Portfolio Value: {total_value:,.2f} {currency_symbol}")
@@ -344,35 +565,125 @@ class FundSelectorApp(ctk.CTk):
                 self.portfolio_total_value_label.configure(text="Total Portfolio Value: N/A (Weight-based)")
 
             # --- Continue with Holdings Display ---
-            valid_tickers = [p_df.iloc[0]['ticker'] for p_df in self.portfolio if p_df.iloc[0]['ticker'] in self.detailed_fund_data and self.detailed_fund_data[p_df.iloc[0]['ticker']].get("holdings") is not None and not self.detailed_fund_data[p_df.iloc[0]['ticker']]["holdings"].empty]
-            if not valid_tickers: self.top_holdings_treeview.insert("", tk.END, values=("No detailed holdings for portfolio funds.", "", "", "")); return
-            filtered_portfolio_list = [p_df for p_df in self.portfolio if p_df.iloc[0]['ticker'] in valid_tickers]
-            if not filtered_portfolio_list: self.top_holdings_treeview.insert("", tk.END, values=("No valid funds for holdings calculation.", "", "", "")); return
-            active_portfolio_df_filtered = pd.concat(filtered_portfolio_list, ignore_index=True)
-            relevant_detailed_data = {t: data for t, data in self.detailed_fund_data.items() if t in active_portfolio_df_filtered['ticker'].unique()}
-            combined_df = calculate_combined_holdings(active_portfolio_df_filtered, relevant_detailed_data) 
-            if combined_df.empty: self.top_holdings_treeview.insert("", tk.END, values=("No combined holdings data.", "", "", ""))
+            if self.lookthrough is None: self._rebuild_lookthrough()
+            if not self.lookthrough.positions.any(): self.top_holdings_table.set_message("No detailed holdings for portfolio funds."); return
+            holdings = self.lookthrough.live_holdings(top_n=config.TOP_N_HOLDINGS, normalize=self.portfolio.is_share_based)
+            if holdings.empty: self.top_holdings_table.set_message("No combined holdings data.")
             else:
-                weight_col_name = "Weight"
-                if weight_col_name not in combined_df.columns: self.top_holdings_treeview.insert("", tk.END, values=(f"Weight col '{weight_col_name}' missing.", "", "", "")); return
-                top_N_holdings = combined_df.nlargest(config.TOP_N_HOLDINGS, weight_col_name)
-                for _, row in top_N_holdings.iterrows():
-                    ticker = str(row.get('Issuer Ticker', 'N/A')); name = str(row.get('Name', 'N/A')); sector = str(row.get('Sector', 'N/A'))
-                    weight_val = row.get(weight_col_name, 0.0)
-                    weight_str = f"{weight_val:.2f}"
-                    self.top_holdings_treeview.insert("", tk.END, values=(ticker, name, sector, weight_str))
+                self.top_holdings_table.set_data({
+                    "ticker": holdings["Issuer Ticker"], "name": holdings["Name"],
+                    "sector": holdings["Sector"].astype(object), "weight": holdings["Weight"],
+                })
         except Exception as e:
             print(f"Error updating top holdings display: {e}")
-            self.top_holdings_treeview.insert("", tk.END, values=(f"Error: {str(e)[:50]}", "See console for details", "", ""))
+            self.top_holdings_table.set_message(f"Error: {str(e)[:50]} (see console for details)")
+
+    def _update_exposure_display(self):
+        for item in self.exposure_treeview.get_children(): self.exposure_treeview.delete(item)
+        by = EXPOSURE_DIMENSION_KEYS[self.exposure_by_var.get()]
+        path = " > ".join(f"{EXPOSURE_DIMENSION_LABELS[dim]}: {label}" for dim, label in self.exposure_filters.items())
+        self.exposure_path_label.configure(text=path or "All holdings")
+        if self.exposure_cube is None or not self.portfolio:
+            return
+        for label, weight in self.exposure_cube.exposure(by, self.exposure_filters, normalize=self.portfolio.is_share_based).items():
+            self.exposure_treeview.insert("", tk.END, values=(label, f"{weight:.2f}"))
+
+    def _on_exposure_drilldown(self, event=None):
+        selection = self.exposure_treeview.selection()
+        if not selection:
+            return
+        by = EXPOSURE_DIMENSION_KEYS[self.exposure_by_var.get()]
+        self.exposure_filters[by] = self.exposure_treeview.item(selection[0], "values")[0]
+        remaining = [dim for dim in CUBE_DIMENSIONS if dim not in self.exposure_filters]
+        if remaining:
+            self.exposure_by_var.set(EXPOSURE_DIMENSION_LABELS[remaining[0]])
+        self._update_exposure_display()
+
+    def _reset_exposure_drilldown(self):
+        self.exposure_filters = {}
+        self._update_exposure_display()
+
+    def _position_amounts(self, ticker: str | None = None) -> dict[str, float]:
+        """Amount held per ticker (market value or weight fraction), optionally for one ticker only."""
+        if not self.portfolio:
+            return {}
+        portfolio_df = self.portfolio.frame()
+        if ticker is not None:
+            portfolio_df = portfolio_df[portfolio_df["ticker"] == ticker]
+        return calculate_position_amounts(portfolio_df, self.detailed_fund_data, self.latest_prices, dropna=True).to_dict()
+
+    def _refresh_latest_prices(self, tickers: list[str] | None = None):
+        """Rebuilds the latest-NAV index from the store index, or only the rows of *tickers* after a partial download."""
+        if tickers is None:
+            self.latest_prices = self.fund_store.latest_prices()
+            return
+        fresh = self.fund_store.latest_prices(tickers)
+        self.latest_prices = pd.concat([self.latest_prices.drop(index=tickers, errors="ignore"), fresh])
+
+    def _portfolio_fund_data(self, tickers: Iterable[str] | None = None) -> dict:
+        """Detailed data of the stored funds among *tickers* (default: the portfolio's)."""
+        tickers = self.portfolio.tickers if tickers is None else tickers
+        return {ticker: self.detailed_fund_data[ticker] for ticker in dict.fromkeys(tickers) if ticker in self.detailed_fund_data}
+
+    def _rebuild_lookthrough(self):
+        """Re-encodes the holdings of the portfolio's funds. Call whenever detailed data changes."""
+        fund_data = self._portfolio_fund_data()
+        self.lookthrough = LookThroughEngine(fund_data, positions=self._position_amounts(), master=self.security_master)
+        self.exposure_cube = ExposureCube(self.lookthrough)
+        # the engine keeps its own sparse copy, the raw holdings are read again only on the next rebuild
+        self.detailed_fund_data.release(("holdings",), tickers=fund_data)
+
+    def _extend_lookthrough(self, tickers: Iterable[str]):
+        """Encodes the holdings of funds that joined the portfolio, leaving the others as they are."""
+        fund_data = self._portfolio_fund_data(tickers)
+        if self.lookthrough.add_funds(fund_data):
+            self.exposure_cube = ExposureCube(self.lookthrough)
+        self.detailed_fund_data.release(("holdings",), tickers=fund_data)
+
+    def _open_fund_store(self, store: FundDataStore):
+        self.fund_store = store
+        self.detailed_fund_data = store.mapping(self.security_master)
+        self.last_data_pull_info = store.meta.get("last_data_pull")
+        self.returns_panels = {}
+        self.stress_testers = {}
+        self.backtest_cache = BacktestCache.for_store(store)
+        self._refresh_latest_prices()
+        self._refresh_screeners()
+        self.lookthrough, self.exposure_cube = None, None
+
+    def _save_security_master(self):
+        try:
+            self.security_master.save()
+        except Exception as e:
+            print(f"Could not save security master: {e}")
+
+    def _on_portfolio_changed(self, kind: str, ticker: str | None):
+        """Listener on the portfolio model."""
+        self.mode_seg.configure(state="disabled" if self.portfolio else "normal")
+        self._on_position_changed(None if kind == PORTFOLIO_RESET else ticker)
 
+    def _on_position_changed(self, ticker: str | None = None):
+        """Applies a portfolio change to the live look-through state (all positions if *ticker* is None)."""
+        if self.lookthrough is None:
+            return
+        if ticker is None:
+            positions = self._position_amounts()
+            self._extend_lookthrough(positions)
+            self.lookthrough.reset_positions(positions)
+        else:
+            amount = self._position_amounts(ticker).get(ticker, 0.0)
+            if amount and ticker not in self.lookthrough.fund_index:
+                self._extend_lookthrough([ticker])
+            self.lookthrough.set_position(ticker, amount)
+        self._update_top_holdings_display()
+        self._update_exposure_display()
 
     def _generate_allocation_chart(self):
         if not self.portfolio or not self.detailed_fund_data:
             messagebox.showwarning("Empty Portfolio", "Cannot generate chart for empty portfolio.", parent=self)
             return
         try:
-            portfolio_df = pd.concat(self.portfolio, ignore_index=True)
-            weights_dict, _ = calculate_portfolio_weights(portfolio_df, self.detailed_fund_data)
+            weights_dict, _ = calculate_portfolio_weights(self.portfolio.frame(), self.detailed_fund_data, self.latest_prices)
             
             if not weights_dict:
                 messagebox.showwarning("Chart Error", "Could not calculate portfolio weights for the chart.")
@@ -381,107 +692,186 @@ class FundSelectorApp(ctk.CTk):
             names = list(weights_dict.keys())
             values = [v * 100 for v in weights_dict.values()] # Convert to percentage for display
             chart_title = f"Portfolio Allocation by Value ({self.portfolio_currency_var.get()})"
-            
-            import plotly.graph_objects as go
-            fig = go.Figure(data=[go.Pie(labels=names, values=values, hole=.3, textinfo='label+percent')])
-            fig.update_layout(title_text=chart_title, annotations=[dict(text='Funds', x=0.5, y=0.5, font_size=20, showarrow=False)])
-            chart_path = config.TEMP_DIR / "temp_allocation_chart.html"
-            fig.write_html(str(chart_path))
-            webbrowser.open(chart_path.resolve().as_uri())
-            messagebox.showinfo("Chart Generated", f"Chart opened in browser.\nFile: {chart_path}", parent=self)
-        except ImportError:
-            messagebox.showerror("Plotly Missing", "'plotly' library required. Please install it.", parent=self)
+            self.allocation_chart.set_data(names, values, chart_title)
         except Exception as e:
             messagebox.showerror("Chart Error", f"Could not generate chart: {e}", parent=self)
 
-    def _prepare_backtest_data(self) -> tuple[pd.DataFrame, pd.Series] | tuple[None, None]:
+    def _sync_returns_panel(self, then: Callable[[ReturnsPanel, StressTester], None]):
+        """
+        Brings the returns panel and stress windows of the portfolio currency up to date
+        on the worker pool, then calls ``then(panel, tester)`` on the Tk thread. Runs in
+        the analytics slot, so it shows progress and can be cancelled like any job.
+        """
+        currency, store, cache = self.portfolio_currency_var.get(), self.fund_store, self.backtest_cache
+        panel, tester = self.returns_panels.get(currency), self.stress_testers.get(currency)
+
+        def job(ctx: JobContext):
+            # rebuilds run one at a time; each starts from what the previous one published
+            with self._panel_sync_lock:
+                ctx.progress(0.05, "Updating returns panel…")
+                current = panel
+                if current is None or current.is_stale(store):
+                    current = ReturnsPanel.for_store(store, currency)
+                # a new panel only if funds were downloaded or loaded since; running jobs keep the old one
+                synced = current.synced(store)
+                if synced is not current:
+                    cache.prune(synced)
+                current_tester = tester
+                if current_tester is None or current_tester.is_stale(synced):
+                    ctx.progress(0.5, "Updating stress scenarios…")
+                    current_tester = StressTester.for_panel(synced)
+                    current_tester.update(synced)
+                return synced, current_tester
+
+        def on_done(result):
+            synced, synced_tester = result
+            self._finish_analytics_job("Returns up to date.")
+            if store is not self.fund_store:
+                return
+            self.returns_panels[currency], self.stress_testers[currency] = synced, synced_tester
+            then(synced, synced_tester)
+
+        def on_error(e: Exception):
+            self._finish_analytics_job("Updating returns failed.")
+            messagebox.showerror("Returns Error", f"Could not update the fund returns:\n{e}", parent=self)
+
+        self._submit_analytics_job(job, on_done, on_error)
+
+    def _has_backtest_data(self) -> bool:
         if not self.portfolio or not self.detailed_fund_data:
             messagebox.showwarning("Missing Data", "Portfolio and detailed fund data are required for backtesting.")
-            return None, None
-        
-        all_returns_series = []
-        valid_tickers_for_backtest = []
-        inception_date = []
-        
-        for fund_df in self.portfolio:
-            ticker = fund_df.iloc[0]['ticker']
-            if ticker in self.detailed_fund_data and self.detailed_fund_data[ticker].get("historical") is not None:
-                hist_data = self.detailed_fund_data[ticker]["historical"]
-                if 'ccy_adj_return' in hist_data.columns and hist_data['ccy_adj_return'].notna().any():
-                    return_series = hist_data['ccy_adj_return'].rename(ticker)
-                    inception_date.append(return_series.index.min())
-                    all_returns_series.append(return_series)
-                    valid_tickers_for_backtest.append(ticker)
-        
-        if not all_returns_series:
-            messagebox.showwarning("Missing Data", "No currency-adjusted return data available for funds in the portfolio.")
-            return None, None
-            
-        asset_returns_df = pd.concat(all_returns_series, axis=1)
-        
-        latest_start_date = max(inception_date)
-        asset_returns_df = asset_returns_df.loc[latest_start_date:]
-        asset_returns_df.fillna(0, inplace=True)
+            return False
+        return True
 
-        if asset_returns_df.empty:
-            messagebox.showwarning("Date Range Error", "No common date range found for all assets in the portfolio.")
+    def _prepare_backtest_data(self, panel: ReturnsPanel) -> tuple[pd.DataFrame, pd.Series] | tuple[None, None]:
+        if not self._has_backtest_data():
+            return None, None
+        try:
+            return prepare_backtest_inputs(self.portfolio.frame(), self.detailed_fund_data, self.latest_prices, panel=panel)
+        except ValueError as e:
+            messagebox.showwarning("Missing Data", str(e))
             return None, None
-            
-        portfolio_df = pd.concat(self.portfolio, ignore_index=True)
-        valid_portfolio_df = portfolio_df[portfolio_df['ticker'].isin(valid_tickers_for_backtest)]
-        weights_dict, total_weight = calculate_portfolio_weights(valid_portfolio_df, self.detailed_fund_data)
-        weights_series = pd.Series(weights_dict)
-        
-        aligned_returns_df, aligned_weights_series = asset_returns_df.align(weights_series, axis=1, join='inner')
-
-        return aligned_returns_df, aligned_weights_series
 
     def _run_backtest(self):
-        asset_returns, portfolio_weights = self._prepare_backtest_data()
+        if self._has_backtest_data():
+            self._sync_returns_panel(self._start_backtest)
+
+    def _start_backtest(self, panel: ReturnsPanel, tester: StressTester):
+        asset_returns, portfolio_weights = self._prepare_backtest_data(panel)
         if asset_returns is None or portfolio_weights is None: return
 
         rebalance_period_name = self.rebalancing_period_var.get()
         rebalance_code = config.REBALANCING_PERIODS[rebalance_period_name]
-        portfolio_currency = self.portfolio_currency_var.get()
+        portfolio_currency = panel.currency
+        cache = self.backtest_cache
+        benchmark_ticker = self._benchmark_ticker(panel)
+        if benchmark_ticker is None: return
+
+        def job(ctx: JobContext):
+            ctx.progress(0.1, "Fetching risk-free rate…")
+            risk_free_rate = cached_risk_free_rate(portfolio_currency)
+            key = BacktestCache.key(portfolio_weights, panel, rebalance_code)
+            cached = cache.get(key, risk_free_rate)
+            stress = tester.run(portfolio_weights.to_frame("Portfolio").T, rebalance_code)
+            if cached is not None:
+                meta, frames = cached
+                performance = {"Portfolio Performance": (1 + frames["returns"]["Portfolio"]).cumprod()}
+                relative = self._benchmark_analysis(panel, frames["returns"], benchmark_ticker, risk_free_rate, performance)
+                return meta["statistics"]["Portfolio"], frames["risk"].set_index(["portfolio", "period"]), stress, relative, performance
 
-        try:
             backtester = PortfolioBacktester(
                 portfolio_weights=portfolio_weights,
                 asset_returns=asset_returns,
                 rebalancing_period=rebalance_code,
-                portfolio_currency=portfolio_currency
+                portfolio_currency=portfolio_currency,
+                risk_free_rate=risk_free_rate
             )
-            
+            ctx.progress(0.5, "Running backtest…")
             statistics = backtester.calculate_statistics()
-            self._display_backtest_statistics(statistics)
+            returns = backtester.portfolio_return_series.to_frame("Portfolio")
+            risk = risk_statistics(returns, risk_free_rate)
+            cache.put(key, {"risk_free_rate": risk_free_rate, "statistics": {"Portfolio": statistics}}, {"returns": returns, "risk": risk.reset_index()}, panel, portfolio_weights.index)
 
-            cumulative_performance = (1 + backtester.portfolio_return_series).cumprod()
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=cumulative_performance.index, y=cumulative_performance, mode='lines', name='Portfolio Performance'))
-            fig.update_layout(
-                title=f"Portfolio Performance (Rebalanced {rebalance_period_name})",
-                xaxis_title="Date", yaxis_title="Cumulative Growth", yaxis_type="log"
-            )
-            chart_path = config.TEMP_DIR / "temp_backtest_chart.html"
-            fig.write_html(str(chart_path))
-            webbrowser.open(chart_path.resolve().as_uri())
+            performance = {"Portfolio Performance": (1 + backtester.portfolio_return_series).cumprod()}
+            relative = self._benchmark_analysis(panel, returns, benchmark_ticker, risk_free_rate, performance)
+            return statistics, risk, stress, relative, performance
 
-        except Exception as e:
+        def on_done(result):
+            statistics, risk, stress, relative, performance = result
+            self._finish_analytics_job("Backtest finished.")
+            self._display_backtest_statistics(statistics)
+            self._display_risk_statistics(risk)
+            self._display_stress_results(stress)
+            self.benchmark_table.set_data(relative, keep_position=False)
+            self.performance_chart.set_series(performance,
+                                              f"Portfolio Performance (Rebalanced {rebalance_period_name})", log_y=True)
+
+        def on_error(e: Exception):
+            self._finish_analytics_job("Backtest failed.")
             messagebox.showerror("Backtest Error", f"An error occurred while running the backtest:\n{e}", parent=self)
 
+        self._submit_analytics_job(job, on_done, on_error)
+
     def _display_backtest_statistics(self, statistics: dict):
         """Displays performance stats in the UI table."""
-        for item in self.stats_treeview.get_children():
-            self.stats_treeview.delete(item)
-
+        rows = []
         for period_name, stats in statistics.items():
             if pd.notna(stats['return']):
-                return_str = f"{stats['return'] * 100:.2f}%"
-                std_dev_str = f"{stats['std_dev'] * 100:.2f}%"
-                sharpe_str = f"{stats['sharpe']:.2f}"
-                self.stats_treeview.insert("", tk.END, values=(period_name, return_str, std_dev_str, sharpe_str))
-
+                rows.append((period_name, f"{stats['return'] * 100:.2f}%", f"{stats['std_dev'] * 100:.2f}%", f"{stats['sharpe']:.2f}", "", "", ""))
+        self.stats_table.set_data(pd.DataFrame(rows, columns=self.stats_table.keys), keep_position=False)
+
+    def _display_risk_statistics(self, risk: pd.DataFrame):
+        """Displays the risk statistics of one or more portfolios, indexed by (portfolio, period)."""
+        rows = []
+        for period_name in dict.fromkeys(risk.index.get_level_values("period")):
+            for portfolio_name, stats in risk.xs(period_name, level="period").iterrows():
+                if pd.isna(stats["max_drawdown"]):
+                    continue
+                rows.append((period_name, portfolio_name,
+                             *(f"{stats[col] * 100:.2f}%" for col in ("var_hist", "cvar_hist", "var_param", "cvar_param", "max_drawdown")),
+                             f"{stats['drawdown_days']:.0f}", f"{stats['sortino']:.2f}", f"{stats['calmar']:.2f}"))
+        self.risk_table.set_data(pd.DataFrame(rows, columns=self.risk_table.keys), keep_position=False)
+
+    def _benchmark_ticker(self, panel: ReturnsPanel) -> str | None:
+        """The entered benchmark ticker as stored ("" for none), or None after warning that it has no data."""
+        ticker = self.benchmark_var.get().strip()
+        if not ticker:
+            return ""
+        for candidate in (ticker, ticker.upper()):
+            if candidate in panel:
+                return candidate
+        messagebox.showwarning("Unknown Benchmark", f"No {panel.currency} return data for benchmark '{ticker}'. Download its details first.", parent=self)
+        return None
+
+    @staticmethod
+    def _benchmark_analysis(panel: ReturnsPanel, returns: pd.DataFrame, benchmark_ticker: str, risk_free_rate: float,
+                            performance: dict[str, pd.Series]) -> pd.DataFrame:
+        """
+        Relative statistics of the backtested portfolios against *benchmark_ticker* (if
+        any; its performance is added to *performance*), followed by the funds tracking
+        the first portfolio most closely.
+        """
+        analyzer = BenchmarkAnalyzer(panel)
+        tables = []
+        if benchmark_ticker:
+            benchmark = analyzer.fund_returns(benchmark_ticker)
+            tables.append(relative_statistics(returns, benchmark, risk_free_rate).assign(benchmark=benchmark_ticker))
+            performance[f"Benchmark ({benchmark_ticker})"] = (1 + benchmark.reindex(returns.index).fillna(0.0)).cumprod()
+        first = returns.columns[0]
+        closest = analyzer.rank(returns[first], n=BENCHMARK_CLOSEST_FUNDS, risk_free_rate=risk_free_rate)
+        tables.append(closest.assign(benchmark=first))
+        return pd.concat(tables).rename_axis("name").reset_index()
+
+    def _display_stress_results(self, stress: pd.DataFrame):
+        """Displays stress results indexed by (portfolio, scenario), grouped by scenario."""
+        pct = lambda v: f"{v * 100:.2f}%" if pd.notna(v) else "no data"
+        rows = []
+        for scenario in dict.fromkeys(stress.index.get_level_values("scenario")):
+            for portfolio_name, result in stress.xs(scenario, level="scenario").iterrows():
+                window = f"{result['start']:%d-%m-%Y} – {result['end']:%d-%m-%Y}"
+                rows.append((scenario, portfolio_name, window, pct(result["return"]), pct(result["max_drawdown"]),
+                             pct(result["worst_day"]), pct(result["coverage"])))
+        self.stress_table.set_data(pd.DataFrame(rows, columns=self.stress_table.keys), keep_position=False)
 
     def _update_data_display_textbox(self):
         self.data_display_textbox.configure(state="normal")
@@ -490,14 +880,13 @@ class FundSelectorApp(ctk.CTk):
             self.data_display_textbox.insert("1.0", "No detailed fund data loaded.")
         else:
             summary = f"Detailed data for {len(self.detailed_fund_data)} fund(s):\n\n"
-            for ticker, data_dict in self.detailed_fund_data.items():
+            # straight from the store index, so no frame has to be read for the overview
+            for ticker, info in self.fund_store.index.iterrows():
                 summary += f"- {ticker}:\n"
-                holdings_data = data_dict.get("holdings")
-                historical_data = data_dict.get("historical")
-                summary += f"  Holdings: {len(holdings_data) if holdings_data is not None else 0} records\n"
-                summary += f"  Historical: {len(historical_data) if historical_data is not None else 0} records"
-                if historical_data is not None and not historical_data.empty and isinstance(historical_data.index, pd.DatetimeIndex): 
-                    summary += f", from {historical_data.index.min().strftime('%Y-%m-%d')} to {historical_data.index.max().strftime('%Y-%m-%d')}\n"
+                summary += f"  Holdings: {info['holdings_rows']} records\n"
+                summary += f"  Historical: {info['historical_rows']} records"
+                if pd.notna(info["first_date"]) and pd.notna(info["last_date"]):
+                    summary += f", from {info['first_date'].strftime('%Y-%m-%d')} to {info['last_date'].strftime('%Y-%m-%d')}\n"
                 else: 
                     summary += "\n"
                 summary += "\n"
@@ -519,6 +908,9 @@ class FundSelectorApp(ctk.CTk):
     def initial_load_fund_data(self):
         if self.is_loading_data: 
             return 
+        if not len(self.security_master):
+            self.security_master = SecurityMaster.load()
+            self.detailed_fund_data.master = self.security_master
         self.is_loading_data = True
         self.update_btn.configure(state="disabled")
         self.fund_universe_progress.configure(mode="indeterminate")
@@ -631,6 +1023,8 @@ class FundSelectorApp(ctk.CTk):
         if df.empty or not all(col in df.columns for col in ["name", "ticker", "link"]): 
             print("Fund data incomplete.")
             self.display_map, self.full_to_disp, self.tkr2disp, self.disp2tkrs, self.all_disp_names = {}, {}, {}, defaultdict(list), []
+            self.fund_search_index = None
+            self.fund_variants = None
             self.provider_dd.configure(values=["N/A"])
             self.provider_var.set("N/A")
             self._update_fund_listbox_display([])
@@ -656,6 +1050,8 @@ class FundSelectorApp(ctk.CTk):
         if not cur_prov or cur_prov.lower() not in [opt.lower() for opt in prov_opts]: 
             self.provider_var.set("iShares" if "ishares" in unique_providers else (prov_opts[0] if prov_opts else "N/A"))
         self.all_disp_names = sorted(self.display_map.keys())
+        self.fund_search_index = FundSearchIndex(self.all_disp_names, self.disp2tkrs, self.display_map)
+        self.fund_variants = FundVariantIndex(df)
         self.update_fund_list_display() 
         if not self.fund_listbox.curselection(): 
             self._clear_fund_options()
@@ -664,30 +1060,18 @@ class FundSelectorApp(ctk.CTk):
         self.search_var.set("")
         self.update_fund_list_display()
 
-    def _is_fund_visible_by_provider(self, disp_name: str) -> bool: 
-        sel_prov = self.provider_var.get().lower()
-        if sel_prov in ["all", "", "n/a"]: 
-            return True
-        full_name = self.display_map.get(disp_name)
-        return bool(full_name and str(full_name).lower().startswith(sel_prov))
-
     def _update_fund_listbox_display(self, names_to_disp: list[str] | None = None):
         cur_sel_txt = self.fund_listbox.get(self.fund_listbox.curselection()) if self.fund_listbox.curselection() else None
-        self.fund_listbox.delete(0, "end") 
         if names_to_disp is None: 
-            query = self.search_var.get().lower().strip()
-            candidates = [dn for dn in self.all_disp_names if self._is_fund_visible_by_provider(dn)]
-            if not query: 
-                names_to_disp = candidates
-            else: 
-                hits_name = {n for n in candidates if query in n.lower()}
-                hits_ticker = {self.tkr2disp[t] for t in self.tkr2disp if query in t and self.tkr2disp[t] in candidates}
-                names_to_disp = sorted(list(hits_name.union(hits_ticker)))
-        for name in names_to_disp: 
-            self.fund_listbox.insert("end", name)
+            if self.fund_search_index is None:
+                names_to_disp = []
+            else:
+                names_to_disp = self._apply_screen(self.fund_search_index.search(self.search_var.get(), self.provider_var.get()))
+        self._sync_fund_listbox(names_to_disp)
         if cur_sel_txt and names_to_disp and cur_sel_txt in names_to_disp:
             try: 
                 idx = names_to_disp.index(cur_sel_txt)
+                self.fund_listbox.selection_clear(0, "end")
                 self.fund_listbox.selection_set(idx)
                 self.fund_listbox.see(idx)
                 self.on_fund_select() 
@@ -698,9 +1082,114 @@ class FundSelectorApp(ctk.CTk):
         elif not names_to_disp: 
             self._clear_fund_options()
 
+    def _refresh_screeners(self):
+        """Drops the metrics tables after the stored data changed and rebuilds the current currency's."""
+        self.screeners = {}
+        self._build_screener(self.portfolio_currency_var.get())
+
+    def _build_screener(self, currency: str):
+        """Computes the metrics table of *currency* on the worker pool; the search re-runs once it is ready."""
+        store = self.fund_store
+
+        def job(ctx: JobContext):
+            # the table is written next to the returns panel, one build at a time
+            with self._metrics_lock:
+                ctx.check_cancelled()
+                return Screener(build_metrics_table(store, currency))
+
+        def on_done(screener: Screener):
+            if store is self.fund_store:
+                self.screeners[currency] = screener
+                self.update_fund_list_display()
+
+        def on_error(e: Exception):
+            print(f"Could not build the fund metrics for {currency}: {e}")
+
+        self.jobs.submit(f"{METRICS_JOB}-{currency}", job, on_done=on_done, on_error=on_error)
+
+    def _current_screener(self) -> Screener | None:
+        """The screener of the portfolio currency, or None while its metrics table is being built."""
+        currency = self.portfolio_currency_var.get()
+        if currency not in self.screeners and not self.jobs.is_running(f"{METRICS_JOB}-{currency}"):
+            self._build_screener(currency)
+        return self.screeners.get(currency)
+
+    def _apply_screen(self, names: list[str]) -> list[str]:
+        """
+        Narrows the search result *names* to the funds passing the screen and orders them
+        by the chosen metric. Only funds with downloaded details have metrics, so an
+        active screen or sort hides all others.
+        """
+        expression = self.screen_var.get().strip()
+        sort_by = self.screen_sort_var.get()
+        sort_by = sort_by if sort_by in METRIC_COLUMNS else None
+        if not expression and sort_by is None:
+            self.screen_entry.configure(border_color=self._screen_border_color)
+            return names
+        screener = self._current_screener()
+        if screener is None:
+            self.screen_entry.configure(border_color=SCREEN_PENDING_COLOR)    # applied once the metrics are ready
+            return names
+        try:
+            tickers = screener.screen(expression, sort_by=sort_by)
+        except ValueError:
+            self.screen_entry.configure(border_color="red")
+            return names
+        self.screen_entry.configure(border_color=self._screen_border_color)
+        screened = dict.fromkeys(self.tkr2disp[t.lower()] for t in tickers if t.lower() in self.tkr2disp)
+        if sort_by is None:
+            return [name for name in names if name in screened]
+        wanted = set(names)
+        return [name for name in screened if name in wanted]
+
+    def _sync_fund_listbox(self, names: list[str]):
+        """
+        Brings the listbox to *names* with as few Tk calls as possible. For two sorted
+        lists (the usual narrowing/widening of a search) only the runs that differ are
+        deleted or inserted; otherwise the contents are replaced in one call each.
+        """
+        old = self._listbox_names
+        if old == names:
+            return
+        is_sorted = lambda seq: all(a <= b for a, b in zip(seq, seq[1:]))
+        if not (is_sorted(old) and is_sorted(names)):
+            self.fund_listbox.delete(0, "end")
+            if names:
+                self.fund_listbox.insert("end", *names)
+            self._listbox_names = list(names)
+            return
+
+        pos, i, j = 0, 0, 0
+        while i < len(old) or j < len(names):
+            if i < len(old) and j < len(names) and old[i] == names[j]:
+                pos, i, j = pos + 1, i + 1, j + 1
+                continue
+            start = i
+            while i < len(old) and (j >= len(names) or old[i] < names[j]):
+                i += 1
+            if i > start:
+                self.fund_listbox.delete(pos, pos + (i - start) - 1)
+            start = j
+            while j < len(names) and (i >= len(old) or names[j] < old[i]):
+                j += 1
+            if j > start:
+                self.fund_listbox.insert(pos, *names[start:j])
+                pos += j - start
+        self._listbox_names = list(names)
+
     def update_fund_list_display(self, event=None): 
         self._update_fund_listbox_display() 
 
+    def _schedule_fund_search(self, event=None):
+        """Debounces keystrokes so the search runs once typing pauses."""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._run_scheduled_fund_search)
+
+    def _run_scheduled_fund_search(self):
+        self._search_after_id = None
+        self.update_fund_list_display()
+
     def _clear_fund_options(self): 
         self._safe_remove_trace(self.cur_trace_id, self.currency_var)
         self._safe_remove_trace(self.dist_trace_id, self.dist_var)
@@ -726,18 +1215,16 @@ class FundSelectorApp(ctk.CTk):
         except (tk.TclError, KeyError): 
             self._clear_fund_options()
             return
-        fund_rows = self.fund_data[self.fund_data["name"] == full_fund_name]
-        if fund_rows.empty: 
+        if self.fund_variants is None or full_fund_name not in self.fund_variants: 
             self._clear_fund_options()
             return
         self.add_btn.configure(state="normal")
-        self._set_currency_dropdown(fund_rows)
-        self._on_currency_changed(fund_rows) 
+        self._set_currency_dropdown(full_fund_name)
+        self._on_currency_changed(full_fund_name) 
 
-    def _set_currency_dropdown(self, fund_rows: pd.DataFrame): 
+    def _set_currency_dropdown(self, full_fund_name: str): 
         self._safe_remove_trace(self.cur_trace_id, self.currency_var) 
-        opts = (fund_rows["currency"].astype(str) + " – " + fund_rows["hedging"].astype(str)).unique().tolist() if "currency" in fund_rows.columns and "hedging" in fund_rows.columns else []
-        opts = sorted([o for o in opts if o and o.lower().replace(" ", "") != "nan–nan"]) 
+        opts = self.fund_variants.currency_options(full_fund_name)
         if opts: 
             self.currency_dd.configure(values=opts, state="normal")
             self.currency_var.set(opts[0]) 
@@ -745,12 +1232,10 @@ class FundSelectorApp(ctk.CTk):
             self.currency_var.set("")
             self.currency_dd.configure(values=["-"], state="disabled")
             self.currency_dd.set("-") 
-        self.cur_trace_id = self.currency_var.trace_add("write", lambda *_: self._on_currency_changed(fund_rows))
+        self.cur_trace_id = self.currency_var.trace_add("write", lambda *_: self._on_currency_changed(full_fund_name))
 
-    def _set_distribution_dropdown(self, cur_filt_rows: pd.DataFrame): 
+    def _set_distribution_dropdown(self, opts: list[str]): 
         self._safe_remove_trace(self.dist_trace_id, self.dist_var) 
-        opts = sorted(cur_filt_rows["distribution"].astype(str).dropna().unique().tolist()) if "distribution" in cur_filt_rows.columns else []
-        opts = [o for o in opts if o and o.lower() != "nan"] 
         if opts: 
             self.dist_dd.configure(values=opts, state="normal")
             cur_dist = self.dist_var.get()
@@ -760,19 +1245,12 @@ class FundSelectorApp(ctk.CTk):
             self.dist_dd.configure(values=["-"], state="disabled")
             self.dist_dd.set("-") 
         
-    def _on_currency_changed(self, all_rows_fund: pd.DataFrame): 
+    def _on_currency_changed(self, full_fund_name: str): 
         sel_cur_hed = self.currency_var.get()
-        empty_df_cols = all_rows_fund.columns if not all_rows_fund.empty else ['distribution']
-        if not sel_cur_hed or " – " not in sel_cur_hed: 
-            self._set_distribution_dropdown(pd.DataFrame(columns=empty_df_cols))
-            return
-        try: 
-            cur, hed = sel_cur_hed.split(" – ", 1)
-        except ValueError: 
-            self._set_distribution_dropdown(pd.DataFrame(columns=empty_df_cols))
+        if not sel_cur_hed or " – " not in sel_cur_hed or self.fund_variants is None: 
+            self._set_distribution_dropdown([])
             return
-        mask = (all_rows_fund["currency"].astype(str) == cur) & (all_rows_fund["hedging"].astype(str) == hed)
-        self._set_distribution_dropdown(all_rows_fund[mask])
+        self._set_distribution_dropdown(self.fund_variants.distribution_options(full_fund_name, sel_cur_hed))
         
     def add_to_portfolio(self): 
         sel_idx = self.fund_listbox.curselection()
@@ -795,11 +1273,7 @@ class FundSelectorApp(ctk.CTk):
             messagebox.showerror("Input Error", "Invalid currency/hedging.")
             return
         
-        mask = ( (self.fund_data["name"] == full_fund_name) & 
-                 (self.fund_data["currency"].astype(str) == cur) & 
-                 (self.fund_data["hedging"].astype(str) == hed) & 
-                 (self.fund_data["distribution"].astype(str) == sel_dist) )
-        fund_var_row = self.fund_data[mask]
+        fund_var_row = self.fund_variants.row(full_fund_name, sel_cur_hed, sel_dist) if self.fund_variants is not None else self.fund_data.iloc[[]]
         if fund_var_row.empty: 
             messagebox.showerror("Data Error", "Selected fund variant not in universe.")
             return
@@ -830,10 +1304,8 @@ class FundSelectorApp(ctk.CTk):
             record["shares"] = val
             lbl_parts.append(f"{val:g} sh") 
         
-        self.portfolio.append(record)
         self.port_lb.insert("end", " | ".join(lbl_parts))
-        if len(self.portfolio) == 1: 
-            self.mode_seg.configure(state="disabled")
+        self.portfolio.add(record)
 
     def remove_selected(self): 
         sel_idx = self.port_lb.curselection()
@@ -842,11 +1314,9 @@ class FundSelectorApp(ctk.CTk):
             return
         try: 
             self.port_lb.delete(sel_idx[0])
-            self.portfolio.pop(sel_idx[0]) 
+            self.portfolio.remove(sel_idx[0]) 
         except Exception as e: 
             messagebox.showerror("Error", f"Could not remove: {e}")
-        if not self.portfolio: 
-            self.mode_seg.configure(state="normal") 
 
     def save_portfolio(self): 
         if not self.portfolio: 
@@ -863,9 +1333,8 @@ class FundSelectorApp(ctk.CTk):
             fp = filedialog.asksaveasfilename(initialfile=def_fn, defaultextension=".csv", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
             if not fp: 
                 return
-            full_df = pd.concat(self.portfolio, ignore_index=True)
-            cols = ["name", "ticker", "currency", "hedging", "distribution", "link", "provider", "weight", "shares"]
-            exist_cols = [c for c in cols if c in full_df.columns]
+            full_df = self.portfolio.frame()
+            exist_cols = [c for c in SAVED_COLUMNS if c in full_df.columns]
             if not exist_cols: 
                 messagebox.showerror("Save Error", "No columns to save.")
                 return
@@ -879,19 +1348,9 @@ class FundSelectorApp(ctk.CTk):
         if not fp: 
             return
         try:
-            ld_df = pd.read_csv(fp)
-            req_cols = ["name", "ticker", "currency", "hedging", "distribution", "link"] 
-            has_amt = "weight" in ld_df.columns or "shares" in ld_df.columns
-            miss_cols = [c for c in req_cols if c not in ld_df.columns]
-            if miss_cols or not has_amt: 
-                messagebox.showerror("Load Error", f"File missing: {', '.join(miss_cols) if miss_cols else 'weight/shares'}.")
-                return
-            self.portfolio.clear()
+            ld_df = read_portfolio_csv(fp)
             self.port_lb.delete(0, tk.END)
             for _, row in ld_df.iterrows():
-                item_data = {c: [row[c]] for c in ld_df.columns if c in row and pd.notna(row[c])}
-                item_df = pd.DataFrame(item_data)
-                self.portfolio.append(item_df)
                 tkr = str(row.get("ticker", "N/A"))
                 cur = str(row.get("currency", "N/A"))
                 hed = str(row.get("hedging", ""))
@@ -902,7 +1361,7 @@ class FundSelectorApp(ctk.CTk):
                 elif "shares" in row and pd.notna(row["shares"]): 
                     lbl_parts.append(f"{float(row['shares']):g} sh")
                 self.port_lb.insert("end", " | ".join(lbl_parts))
-            self.mode_seg.configure(state="disabled" if self.portfolio else "normal")
+            self.portfolio.replace(ld_df)
             messagebox.showinfo("Loaded", f"Portfolio loaded from:\n{fp}")
         except Exception as e: 
             messagebox.showerror("Load Error", f"Failed to load: {str(e)}")
@@ -925,72 +1384,25 @@ class FundSelectorApp(ctk.CTk):
         """Worker function to download detailed data. Runs in a separate thread."""
         print("Starting detailed data download...")
         portfolio_currency = self.portfolio_currency_var.get() # Get selected currency
-        downloaded_tickers = []
+        fund_records = self.portfolio.records()
+        if not fund_records:
+            self.is_downloading_details = False
+            self.after(0, lambda: messagebox.showinfo("No Funds", "Portfolio is empty. Add funds to download details."))
+            self.after(0, self._finalize_detailed_download_ui)
+            return
         try:
-            SessionClass = IsharesSession
-            SheetsClass = FundSheets
-            with SessionClass(chrome_binary=config.BRAVE_BROWSER_PATH, chromedriver_path=config.CHROMEDRIVER_PATH) as sess:
-                num_funds = len(self.portfolio)
-                if num_funds == 0:
-                    print("No funds in portfolio to download details for.")
-                    self.after(0, lambda: messagebox.showinfo("No Funds", "Portfolio is empty. Add funds to download details."))
-                    return # Exit early if portfolio is empty
-
-                for i, fund_record_df in enumerate(self.portfolio):
-                    if not self.is_downloading_details:
-                        print("Download cancelled.")
-                        break 
-                    if fund_record_df.empty:
-                        continue
-                    fund_record = fund_record_df.iloc[0]
-                    
-                    fund_link = fund_record.get("link")
-                    fund_ticker = fund_record.get("ticker", f"unk_{i}")
-                    fund_currency = fund_record.get("currency") # Get the fund's specific currency
-
-                    if not fund_link or fund_link == "N/A" or not isinstance(fund_link, str) or not fund_link.startswith("http"):
-                        print(f"Skipping {fund_ticker}: Invalid or missing link ('{fund_link}').")
-                        # Schedule UI update for progress from main thread
-                        self.after(0, lambda p=(i+1)/num_funds, ft=fund_ticker: 
-                            (self.detailed_data_progress.set(p) if self.detailed_data_progress.winfo_ismapped() else None,
-                            print(f"Progress update for skipped {ft}: {p*100:.1f}%"))
-                        )
-                        continue
-                    
-                    try:
-                        print(f"Downloading data for {fund_ticker} (Link: {fund_link})...")
-                        xls_main_link = sess.xls_link_from_product_page(fund_link)
-                        xls_path = sess.download_xls(xls_main_link, overwrite=True) 
-                        
-                        # Pass both the fund's currency and the target portfolio currency
-                        sheets = SheetsClass(
-                            xls_path, 
-                            fund_currency=fund_currency, 
-                            portfolio_currency=portfolio_currency
-                        )
-                        
-                        self.detailed_fund_data[fund_ticker] = {
-                            "holdings": sheets.holdings.copy() if sheets.holdings is not None else pd.DataFrame(),
-                            "historical": sheets.historical.copy() if sheets.historical is not None else pd.DataFrame(),
-                            "distributions": sheets.distributions.copy() if sheets.distributions is not None else pd.DataFrame(),
-                            "source_xls": str(xls_path) 
-                        }
-                        downloaded_tickers.append(fund_ticker)
-                        print(f"Successfully processed data for {fund_ticker}")
-                    except Exception as e:
-                        print(f"Error downloading/parsing data for {fund_ticker} (Link: {fund_link}): {e}")
-                        # Schedule messagebox from main thread
-                        self.after(0, lambda ft=fund_ticker, em=str(e): messagebox.showerror("Download Error", f"Error for {ft}:\n{em}"))
-                    
-                    # Update progress bar (via self.after for thread safety)
-                    progress_val = (i + 1) / num_funds
-                    self.after(0, lambda p=progress_val, ft=fund_ticker: 
-                        (self.detailed_data_progress.set(p) if self.detailed_data_progress.winfo_ismapped() else None,
-                        print(f"Progress update for {ft}: {p*100:.1f}%"))
-                    )
-
+            downloaded = download_fund_details(
+                fund_records, portfolio_currency, master=self.security_master,
+                # progress and errors are marshalled to the Tk thread
+                on_progress=lambda p, ft: self.after(0, lambda: self.detailed_data_progress.set(p) if self.detailed_data_progress.winfo_ismapped() else None),
+                on_error=lambda ft, e: self.after(0, lambda em=str(e): messagebox.showerror("Download Error", f"Error for {ft}:\n{em}")),
+                should_stop=lambda: not self.is_downloading_details,
+                previous=self.detailed_fund_data,    # stored histories are only extended by the new dates
+            )
+            self.detailed_fund_data.update_many(downloaded)    # written through to the store
             if self.is_downloading_details : # Only update if not cancelled
-                self.last_data_pull_info = {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "tickers": downloaded_tickers}
+                self.last_data_pull_info = {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "tickers": list(downloaded)}
+                self.fund_store.set_last_data_pull(self.last_data_pull_info)
 
         except Exception as e:
             print(f"Major error during detailed data download session: {e}")
@@ -1005,6 +1417,10 @@ class FundSelectorApp(ctk.CTk):
             self.detailed_data_progress.set(1.0)
         self.after(500, lambda: self._hide_and_reset_progress(self.detailed_data_progress))
         self.download_details_btn.configure(state="normal")
+        self._refresh_latest_prices((self.last_data_pull_info or {}).get("tickers"))
+        self._refresh_screeners()
+        self._rebuild_lookthrough()
+        self._save_security_master()
         self._update_data_display_textbox() 
 
     def save_detailed_fund_data(self): 
@@ -1016,20 +1432,7 @@ class FundSelectorApp(ctk.CTk):
             return
         save_dir = Path(dir_path)
         try:
-            manifest = { "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"), "last_data_pull": self.last_data_pull_info, "tickers": list(self.detailed_fund_data.keys()) }
-            with open(save_dir / "manifest.json", "w") as f: 
-                json.dump(manifest, f, indent=4)
-            for tkr, data in self.detailed_fund_data.items():
-                if data.get("holdings") is not None and not data["holdings"].empty: 
-                    data["holdings"].to_parquet(save_dir / f"{tkr}_holdings.parquet", index=False)
-                if data.get("historical") is not None and not data["historical"].empty: 
-                    df_h = data["historical"]
-                    if isinstance(df_h.index, pd.DatetimeIndex) and df_h.index.name: 
-                        df_h.reset_index().to_parquet(save_dir / f"{tkr}_historical.parquet", index=False)
-                    else: 
-                        df_h.to_parquet(save_dir / f"{tkr}_historical.parquet", index=isinstance(df_h.index, pd.MultiIndex))
-                if data.get("distributions") is not None and not data["distributions"].empty: 
-                    data["distributions"].to_parquet(save_dir / f"{tkr}_distributions.parquet", index=False)
+            self.fund_store.export(save_dir)
             messagebox.showinfo("Data Saved", f"Detailed data saved to:\n{save_dir}", parent=self)
         except Exception as e: 
             messagebox.showerror("Save Error", f"Failed to save detailed data: {e}", parent=self)
@@ -1039,31 +1442,22 @@ class FundSelectorApp(ctk.CTk):
         if not dir_path: 
             return
         load_dir = Path(dir_path)
-        manifest_p = load_dir / "manifest.json"
-        if not manifest_p.exists(): 
-            messagebox.showerror("Load Error", "manifest.json not found.", parent=self)
+        if load_dir.resolve() == self.fund_store.root.resolve():
+            messagebox.showinfo("Data Loaded", "This is the fund data store the app already uses.", parent=self)
             return
         try:
-            with open(manifest_p, "r") as f: 
-                manifest = json.load(f)
-            loaded_data = {}
-            for tkr in manifest.get("tickers", []):
-                loaded_data[tkr] = {}
-                hld_p, hist_p, dist_p = load_dir/f"{tkr}_holdings.parquet", load_dir/f"{tkr}_historical.parquet", load_dir/f"{tkr}_distributions.parquet"
-                loaded_data[tkr]["holdings"] = pd.read_parquet(hld_p) if hld_p.exists() else pd.DataFrame()
-                if hist_p.exists(): 
-                    hist_df = pd.read_parquet(hist_p) 
-                    if "date" in hist_df.columns: 
-                        hist_df["date"] = pd.to_datetime(hist_df["date"])
-                        hist_df = hist_df.set_index("date")
-                    loaded_data[tkr]["historical"] = hist_df
-                else: 
-                    loaded_data[tkr]["historical"] = pd.DataFrame()
-                loaded_data[tkr]["distributions"] = pd.read_parquet(dist_p) if dist_p.exists() else pd.DataFrame()
-            self.detailed_fund_data = loaded_data
-            self.last_data_pull_info = manifest.get("last_data_pull") 
+            # the saved folder is only read: its funds are copied into the app's own store
+            if FundDataStore.is_store(load_dir):
+                imported = self.fund_store.import_store(FundDataStore(load_dir))
+            else:
+                imported = self.fund_store.import_legacy(load_dir)    # manifest-based save from an older version
+            self._open_fund_store(self.fund_store)
+            self._rebuild_lookthrough()
+            self._save_security_master()
             self._update_data_display_textbox()
-            messagebox.showinfo("Data Loaded", f"Detailed data loaded from:\n{load_dir}", parent=self)
+            messagebox.showinfo("Data Loaded", f"Detailed data of {len(imported)} fund(s) imported from:\n{load_dir}", parent=self)
+        except FileNotFoundError as e: 
+            messagebox.showerror("Load Error", str(e), parent=self)
         except Exception as e: 
             messagebox.showerror("Load Error", f"Failed to load detailed data: {e}", parent=self)
 
@@ -1079,5 +1473,6 @@ class FundSelectorApp(ctk.CTk):
                 self.dist_trace_id = None
 
     def on_close(self): 
+        self.jobs.shutdown()
         self.quit()
         self.destroy()
\ No newline at end of file
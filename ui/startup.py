@@ -0,0 +1,53 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+# modules that should only be imported once the feature needing them is used
+DEFERRED_MODULES = ("selenium", "bs4", "lxml", "yfinance", "pandas_datareader", "scipy", "requests")
+
+
+class StartupProfile:
+    """Wall-clock marks from process start-up to the first idle main loop."""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks: list[tuple[str, float]] = []
+
+    def mark(self, label: str) -> None:
+        self.marks.append((label, time.perf_counter()))
+
+    def report(self) -> str:
+        lines, previous = ["Startup profile:"], self.start
+        for label, at in self.marks:
+            lines.append(f"  {label:<32} {1000 * (at - previous):8.1f} ms")
+            previous = at
+        lines.append(f"  {'total':<32} {1000 * (previous - self.start):8.1f} ms")
+        eager = sorted(name for name in DEFERRED_MODULES if name in sys.modules)
+        lines.append(f"  heavy modules loaded at startup: {', '.join(eager) if eager else 'none'}")
+        return "\n".join(lines)
+
+
+def launch(profile: bool = False) -> None:
+    """Starts the desktop app; with *profile* a timing report is printed once the window is idle."""
+    timings = StartupProfile()
+    from .portfolio_app import FundSelectorApp
+    timings.mark("import ui.portfolio_app")
+    app = FundSelectorApp()
+    timings.mark("build main window")
+    if profile:
+        def _first_idle():
+            timings.mark("first idle main loop")
+            print(timings.report())
+        app.after_idle(_first_idle)
+    app.mainloop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="ETF Portfolio Builder")
+    parser.add_argument("--profile-startup", action="store_true", help="print a startup timing report")
+    args = parser.parse_args(argv)
+    launch(profile=args.profile_startup)
+
+
+if __name__ == "__main__":
+    main()
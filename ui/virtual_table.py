@@ -0,0 +1,219 @@
+from __future__ import annotations
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable
+
+import customtkinter as ctk
+import numpy as np
+import pandas as pd
+
+
+class VirtualTable(ctk.CTkFrame):
+    """
+    Treeview that only materialises the visible window of a columnar backing store.
+
+    The treeview holds a fixed pool of ``height`` items. Scrolling, sorting and
+    filtering work on numpy arrays and only rewrite the pool items whose text
+    changed, so refresh cost depends on the window size, not the list length.
+
+    *columns* is a list of ``(key, heading, width, anchor, stretch)`` tuples and
+    *formatters* maps a key to a function turning a raw value into display text.
+    """
+    def __init__(self, master, columns: list[tuple], height: int = 18,
+                 formatters: dict[str, Callable] | None = None, sortable: bool = True, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.keys = [c[0] for c in columns]
+        self.height = height
+        self.formatters = formatters or {}
+
+        self.tree = ttk.Treeview(self, columns=self.keys, show="headings", height=height, selectmode="browse")
+        for key, heading, width, anchor, stretch in columns:
+            self.tree.heading(key, text=heading, command=(lambda k=key: self._on_heading(k)) if sortable else "")
+            self.tree.column(key, width=width, anchor=anchor, stretch=stretch)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(seq, self._on_wheel)
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.height))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.height))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+        self._data: dict[str, np.ndarray] = {}
+        self._sort_keys: dict[str, np.ndarray] = {}
+        self._search_text: np.ndarray | None = None
+        self._n_rows = 0
+        self._order = np.empty(0, dtype=np.intp)    # visible position -> backing row
+        self._top = 0
+        self._sort: tuple[str, bool] | None = None
+        self._filter = ""
+        self._pool: list[str] = []
+        self._pool_values: list[tuple] = []
+        self._pool_rows: list[int] = []
+        self._message: str | None = None
+        self._selected_row: int | None = None
+
+    # ------------------------------------------------------------------ #
+    # data
+    # ------------------------------------------------------------------ #
+
+    def set_data(self, data: pd.DataFrame | dict, keep_position: bool = True) -> None:
+        """Replaces the backing arrays. *data* must provide every column key."""
+        self._selected_row = None
+        self._data = {key: np.asarray(data[key]) for key in self.keys}
+        self._n_rows = len(self._data[self.keys[0]]) if self.keys else 0
+        self._sort_keys.clear()
+        self._search_text = None
+        self._message = None
+        if not keep_position:
+            self._top = 0
+        self._apply_view()
+
+    def set_message(self, text: str) -> None:
+        """Shows a single informational row instead of data."""
+        self._data, self._n_rows, self._order, self._top = {}, 0, np.empty(0, dtype=np.intp), 0
+        self._selected_row = None
+        self._message = text
+        self._render()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def sort_by(self, key: str, ascending: bool = True) -> None:
+        self._sort = (key, ascending)
+        self._apply_view()
+
+    def set_filter(self, text: str) -> None:
+        """Keeps rows where any text column contains *text* (case-insensitive)."""
+        self._filter = text.strip().lower()
+        self._top = 0
+        self._apply_view()
+
+    def selected_row(self) -> int | None:
+        """Backing-array row index of the selected item."""
+        return self._selected_row
+
+    def _on_select(self, event=None) -> None:
+        selection = self.tree.selection()
+        if selection and selection[0] in self._pool:
+            row = self._pool_rows[self._pool.index(selection[0])]
+            self._selected_row = row if row >= 0 else None
+
+    def row_values(self, row: int) -> dict:
+        return {key: self._data[key][row] for key in self.keys}
+
+    def _sort_key(self, key: str) -> np.ndarray:
+        if key not in self._sort_keys:
+            column = self._data[key]
+            if column.dtype.kind in "biuf":
+                self._sort_keys[key] = column
+            else:
+                self._sort_keys[key] = pd.Series(column).astype(str).str.lower().to_numpy()
+        return self._sort_keys[key]
+
+    def _apply_view(self) -> None:
+        rows = np.arange(self._n_rows)
+        if self._filter and self._n_rows:
+            if self._search_text is None:
+                text_cols = [pd.Series(self._data[k]).astype(str).str.lower() for k in self.keys if self._data[k].dtype.kind not in "biuf"]
+                self._search_text = (text_cols[0].str.cat(text_cols[1:], sep="\x1f") if text_cols else pd.Series([""] * self._n_rows)).to_numpy()
+            rows = rows[pd.Series(self._search_text).str.contains(self._filter, regex=False).to_numpy()]
+        if self._sort is not None and len(rows):
+            key, ascending = self._sort
+            sort_key = self._sort_key(key)[rows]
+            order = np.argsort(sort_key, kind="stable")
+            if not ascending:
+                order = order[::-1]
+            rows = rows[order]
+        self._order = rows
+        self._top = max(0, min(self._top, len(rows) - self.height))
+        self._render()
+
+    # ------------------------------------------------------------------ #
+    # rendering
+    # ------------------------------------------------------------------ #
+
+    def _format_row(self, row: int) -> tuple:
+        return tuple(
+            self.formatters[key](self._data[key][row]) if key in self.formatters else ("-" if pd.isna(self._data[key][row]) else str(self._data[key][row]))
+            for key in self.keys
+        )
+
+    def _render(self) -> None:
+        if self._message is not None:
+            window = [(-1, (self._message,) + ("",) * (len(self.keys) - 1))]
+        else:
+            rows = self._order[self._top:self._top + self.height]
+            window = [(int(row), self._format_row(row)) for row in rows]
+
+        for slot, (row, values) in enumerate(window):
+            if slot >= len(self._pool):
+                self._pool.append(self.tree.insert("", tk.END, values=values))
+                self._pool_values.append(values)
+                self._pool_rows.append(row)
+                continue
+            if self._pool_values[slot] != values:
+                self.tree.item(self._pool[slot], values=values)
+                self._pool_values[slot] = values
+            self._pool_rows[slot] = row
+        if len(self._pool) > len(window):
+            self.tree.delete(*self._pool[len(window):])
+            del self._pool[len(window):], self._pool_values[len(window):], self._pool_rows[len(window):]
+
+        # the selection follows the backing row, not the recycled pool item
+        selected = [iid for iid, row in zip(self._pool, self._pool_rows) if row >= 0 and row == self._selected_row]
+        if tuple(selected) != tuple(self.tree.selection()):
+            self.tree.selection_set(selected)
+
+        total = len(self._order)
+        if total > self.height:
+            self.scrollbar.set(self._top / total, (self._top + self.height) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    # ------------------------------------------------------------------ #
+    # navigation
+    # ------------------------------------------------------------------ #
+
+    def scroll(self, delta_rows: int) -> None:
+        top = max(0, min(self._top + delta_rows, len(self._order) - self.height))
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _on_scrollbar(self, *args) -> None:
+        if args[0] == "moveto":
+            self._top = max(0, min(int(float(args[1]) * len(self._order)), len(self._order) - self.height))
+            self._render()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]) * (self.height if args[2] == "pages" else 1))
+
+    def _on_wheel(self, event) -> str:
+        if getattr(event, "num", None) == 4:
+            step = -3
+        elif getattr(event, "num", None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.scroll(step)
+        return "break"
+
+    def _move_selection(self, step: int) -> str:
+        selection = self.tree.selection()
+        slot = self._pool.index(selection[0]) if selection and selection[0] in self._pool else -1
+        target = slot + step
+        if target < 0 or target >= len(self._pool):
+            self.scroll(step)
+            target = max(0, min(target, len(self._pool) - 1))
+        if self._pool:
+            self.tree.selection_set(self._pool[target])
+        return "break"
+
+    def _on_heading(self, key: str) -> None:
+        ascending = not (self._sort is not None and self._sort[0] == key and self._sort[1])
+        self.sort_by(key, ascending)